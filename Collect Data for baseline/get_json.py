@@ -3,19 +3,183 @@ import spacy
 from spacy_langdetect import LanguageDetector
 from spacy.language import Language
 from multiprocessing import Pool
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, wait
+from collections import deque
+import langdetect
+import argparse
 import json
+import math
 import os
 
+# Components of the spaCy model that the language detector does not need:
+# it only looks at the text of the document and of its sentences
+DETECTOR_EXCLUDE = ["tok2vec", "tagger", "morphologizer", "parser", "attribute_ruler", "lemmatizer", "ner"]
+
+nlp_detect = None  # spaCy pipeline of a language pool worker, loaded by init_language_detector
+detect_batch_size = 256
+
 
 @Language.factory("language_detector")
 def get_lang_detector(nlp, name):
     return LanguageDetector()
 
 
-nlp_detect = spacy.load("ru_core_news_sm") # 1
-Language.factory("language_detector", func=get_lang_detector)
-nlp_detect.add_pipe('language_detector', last=True)
+def load_language_detector(model: str = "ru_core_news_sm", exclude: list = None):
+    """
+    Load a spaCy pipeline with the language detector. "blank:ru" gives
+    a pipeline without any model, which detects the same languages.
+    """
+    if model.startswith("blank:"):
+        nlp = spacy.blank(model[len("blank:"):])
+    else:
+        nlp = spacy.load(model, exclude=DETECTOR_EXCLUDE if exclude is None else exclude)
+    if not (nlp.has_pipe("parser") or nlp.has_pipe("senter") or nlp.has_pipe("sentencizer")):
+        nlp.add_pipe("sentencizer")  # the detector iterates over doc.sents
+    nlp.add_pipe("language_detector", last=True)
+    return nlp
+
+
+def init_language_detector(model: str, batch_size: int):
+    global nlp_detect, detect_batch_size
+    nlp_detect = load_language_detector(model)
+    detect_batch_size = batch_size
+
+
+def detect_languages(sentences: list) -> list:
+    return [doc._.language["language"] for doc in nlp_detect.pipe(sentences, batch_size=detect_batch_size)]
+
+
+class QuickLanguageFilter:
+    """
+    Fast path of the language filter based on character statistics:
+    the share of Cyrillic letters, letters that only Russian (ы, э, ё)
+    or only other Cyrillic languages use, then a naive Bayes score of
+    the character trigrams against the profiles of the Cyrillic languages
+    that langdetect knows. Clear cases are decided here, the others
+    (short or mixed sentences, close scores) are left to spaCy.
+    """
+    cyrillicLanguages = ("ru", "uk", "bg", "mk")
+    russianLetters = frozenset("ыэё")  # not used by uk, bg, mk
+    foreignLetters = frozenset("іїєґўјљњџѓќѕђћәғқңөұүһ")  # Ukrainian, Belarusian, South Slavic, Kazakh
+
+    __slots__ = ("min_letters", "accept_ratio", "reject_ratio", "margin", "profiles", "unseen")
+
+    def __init__(self, min_letters: int = 15, accept_ratio: float = 0.9, reject_ratio: float = 0.3,
+                 margin: float = 0.3):
+        self.min_letters = min_letters  # shorter sentences are always ambiguous
+        self.accept_ratio = accept_ratio  # share of Cyrillic letters needed to score a sentence as Cyrillic
+        self.reject_ratio = reject_ratio  # below this share the sentence is not Russian
+        self.margin = margin  # log-likelihood per trigram by which Russian must win or lose
+        self.profiles = {language: self.load_profile(language) for language in self.cyrillicLanguages}
+        # profiles are pruned to the frequent trigrams, the same penalty for the others keeps them comparable
+        self.unseen = min(min(profile.values()) for profile in self.profiles.values())
+
+    @staticmethod
+    def load_profile(language: str) -> dict:
+        """
+        Return {trigram: log probability} from the langdetect
+        profile of the language.
+        """
+        with open(os.path.join(os.path.dirname(langdetect.__file__), "profiles", language), encoding="utf-8") as f:
+            profile = json.load(f)
+        total = profile["n_words"][2] + len(profile["freq"])  # add-one smoothing
+        return {ngram: math.log((count + 1) / total) for ngram, count in profile["freq"].items() if len(ngram) == 3}
+
+    @staticmethod
+    def is_cyrillic(char: str) -> bool:
+        return "\u0400" <= char <= "\u04ff"
+
+    def classify(self, sentence: str):
+        """
+        Return "ru", "other", or None if the sentence is ambiguous.
+        """
+        letters = [char for char in sentence if char.isalpha()]
+        if len(letters) < self.min_letters:
+            return None
+        cyrillic_ratio = sum(1 for char in letters if self.is_cyrillic(char)) / len(letters)
+        if cyrillic_ratio < self.reject_ratio:
+            return "other"
+        if cyrillic_ratio < self.accept_ratio:
+            return None
+        text = " " + "".join(char if self.is_cyrillic(char) else " " for char in sentence.lower()) + " "
+        n_foreign = sum(1 for char in text if char in self.foreignLetters)
+        if n_foreign > 0:
+            return "other" if n_foreign > 1 else None
+        if any(char in self.russianLetters for char in text):
+            return "ru"
+        trigrams = [text[i:i + 3] for i in range(len(text) - 2) if text[i + 1] != " "]
+        if len(trigrams) <= 0:
+            return None
+        scores = {}
+        for language, profile in self.profiles.items():
+            scores[language] = sum(profile.get(trigram, self.unseen) for trigram in trigrams) / len(trigrams)
+        best_other = max(score for language, score in scores.items() if language != "ru")
+        if scores["ru"] - best_other >= self.margin:
+            return "ru"
+        if best_other - scores["ru"] >= self.margin:
+            return "other"
+        return None
+
+
+class LanguageFilter:
+    """
+    Keeps the Russian sentences of the hits. Sentences that the quick
+    filter cannot decide go to the pool of worker processes, which
+    is created once per run; each worker loads the spaCy pipeline once
+    and detects languages of whole batches of sentences with nlp.pipe.
+    """
+    __slots__ = ("processes", "batch_size", "pool", "quick_filter", "n_quick", "n_detected")
+
+    def __init__(self, processes: int = 24, model: str = "ru_core_news_sm", batch_size: int = 256,
+                 quick_filter: QuickLanguageFilter = None):
+        self.processes = processes
+        self.batch_size = batch_size
+        self.pool = Pool(processes, initializer=init_language_detector, initargs=(model, batch_size))
+        self.quick_filter = quick_filter  # None = every sentence goes to spaCy
+        self.n_quick = 0  # sentences decided by the quick filter
+        self.n_detected = 0  # sentences sent to spaCy
+
+    def detect(self, sentences: list) -> list:
+        """
+        Return the language of each sentence, spreading the
+        sentences evenly over the workers.
+        """
+        if len(sentences) <= 0:
+            return []
+        chunk_size = max(1, min(self.batch_size, -(-len(sentences) // self.processes)))
+        chunks = [sentences[i:i + chunk_size] for i in range(0, len(sentences), chunk_size)]
+        return [language for languages in self.pool.map(detect_languages, chunks) for language in languages]
+
+    def languages(self, sentences: list) -> list:
+        """
+        Return the language of each sentence ("other" for the
+        non-Russian ones rejected by the quick filter).
+        """
+        if self.quick_filter is None:
+            languages = [None] * len(sentences)
+        else:
+            languages = [self.quick_filter.classify(sentence) for sentence in sentences]
+        ambiguous = [idx for idx, language in enumerate(languages) if language is None]
+        for idx, language in zip(ambiguous, self.detect([sentences[idx] for idx in ambiguous])):
+            languages[idx] = language
+        self.n_quick += len(sentences) - len(ambiguous)
+        self.n_detected += len(ambiguous)
+        return languages
+
+    def clean_hits(self, hits: list):
+        sentences = [f_get_sentences(hit) for hit in hits]
+        clean_hits = [sentence for sentence, language in zip(sentences, self.languages(sentences)) if language == "ru"]
+        return clean_hits, len(clean_hits)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
 
 def do_elastic_query(elastic_instance, es_query: dict, query_size: int = 3000):
@@ -34,7 +198,157 @@ def get_elastic_query_hits(elastic_instance, es_query: dict):
         index="oscar.sentences",
         body=es_query
     )
-    return es_result["hits"]["total"]["value"]
+    return total_hits(es_result)
+
+
+def total_hits(es_result: dict) -> int:
+    """
+    Return the number of hits of a search response: an object
+    on Elasticsearch 7, a number on Elasticsearch 6.
+    """
+    total = es_result["hits"]["total"]
+    return total["value"] if isinstance(total, dict) else total
+
+
+def version_query(es_query: dict, es_version: int = 7) -> dict:
+    """
+    Return the query for the Elasticsearch version. Elasticsearch 6
+    has no "fields" option (7.10 and newer), the sentences come
+    from the source there.
+    """
+    if es_version >= 7 or "fields" not in es_query:
+        return es_query
+    es_query = {key: value for key, value in es_query.items() if key != "fields"}
+    es_query["_source"] = ["sentence"]
+    return es_query
+
+
+def count_elastic_queries(elastic_instance, es_queries: list, batch_size: int = 100, max_count: int = 1000,
+                          es_version: int = 7) -> list:
+    """
+    Return the number of hits of each query, sending batch_size queries
+    per _msearch request. Hits are only counted up to max_count, which
+    is all the pair thresholds need (Elasticsearch 6 counts them all);
+    a failed query counts as 0.
+    """
+    counts = []
+    for start in range(0, len(es_queries), batch_size):
+        body = []
+        for es_query in es_queries[start:start + batch_size]:
+            count_query = {key: value for key, value in es_query.items() if key not in ("fields", "_source")}
+            count_query["size"] = 0
+            if es_version >= 7:
+                count_query["track_total_hits"] = max_count
+            body += [{"index": "oscar.sentences"}, count_query]
+        es_result = elastic_instance.msearch(body=body)
+        for response in es_result["responses"]:
+            if "error" in response:
+                print(f"Count query failed: {response['error']}")
+                counts.append(0)
+            else:
+                counts.append(total_hits(response))
+    return counts
+
+
+class PagedSearch:
+    """
+    Hits of a query fetched page by page, at most budget of them: with
+    search_after and a point in time on Elasticsearch 7 (7.12 or newer),
+    with scroll on Elasticsearch 6. With paginate=False the hits come
+    in one page of a plain search, at most 10000 (max_result_window).
+    The first page is always a plain search: pairs wait for their turn
+    after it, so the point in time or the scroll context is only opened
+    with the second page, and the hits of the first page are skipped.
+    """
+    __slots__ = ("es", "query", "budget", "page_size", "paginate", "es_version", "index", "keep_alive",
+                 "pit_id", "scroll_id", "search_after", "first_ids", "n_fetched", "done")
+
+    def __init__(self, es_instance, es_query: dict, budget: int = 10000, page_size: int = 1000,
+                 paginate: bool = True, es_version: int = 7, index: str = "oscar.sentences", keep_alive: str = "2m"):
+        self.es = es_instance
+        self.query = dict(version_query(es_query, es_version))
+        self.budget = budget
+        self.page_size = page_size
+        self.paginate = paginate
+        self.es_version = es_version
+        self.index = index
+        self.keep_alive = keep_alive  # extended with every page
+        self.pit_id = None
+        self.scroll_id = None
+        self.search_after = None
+        self.first_ids = None  # IDs of the hits of the first page
+        self.n_fetched = 0
+        self.done = False
+
+    def next_page(self) -> list:
+        """
+        Return the next page of hits, an empty list after the last one.
+        """
+        if self.done or self.n_fetched >= self.budget:
+            self.close()
+            return []
+        if self.first_ids is None:
+            size = min(self.page_size, self.budget) if self.paginate else min(self.budget, 10000)
+            hits = self.first_page(size)
+            self.first_ids = {hit["_id"] for hit in hits}
+            last_page = not self.paginate or len(hits) < size
+        else:
+            hits = []
+            last_page = False
+            while len(hits) <= 0 and not last_page:
+                page = self.scroll_page() if self.es_version < 7 else self.pit_page()
+                last_page = len(page) < self.page_size
+                hits = [hit for hit in page if hit["_id"] not in self.first_ids]
+        hits = hits[:self.budget - self.n_fetched]
+        self.n_fetched += len(hits)
+        if last_page:
+            self.close()
+        return hits
+
+    def first_page(self, size: int) -> list:
+        body = dict(self.query)
+        body["size"] = size
+        return self.es.search(index=self.index, body=body)["hits"]["hits"]
+
+    def pit_page(self) -> list:
+        if self.pit_id is None:
+            self.pit_id = self.es.open_point_in_time(index=self.index, keep_alive=self.keep_alive)["id"]
+        body = dict(self.query)
+        body["size"] = self.page_size
+        body["sort"] = [{"_shard_doc": "asc"}]
+        body["pit"] = {"id": self.pit_id, "keep_alive": self.keep_alive}
+        if self.search_after is not None:
+            body["search_after"] = self.search_after
+        es_result = self.es.search(body=body)
+        self.pit_id = es_result.get("pit_id", self.pit_id)
+        hits = es_result["hits"]["hits"]
+        if len(hits) > 0:
+            self.search_after = hits[-1]["sort"]
+        return hits
+
+    def scroll_page(self) -> list:
+        if self.scroll_id is None:
+            body = dict(self.query)
+            body["size"] = self.page_size
+            body["sort"] = ["_doc"]
+            es_result = self.es.search(index=self.index, body=body, scroll=self.keep_alive)
+        else:
+            es_result = self.es.scroll(scroll_id=self.scroll_id, scroll=self.keep_alive)
+        self.scroll_id = es_result.get("_scroll_id")
+        return es_result["hits"]["hits"]
+
+    def close(self):
+        """
+        Release the point in time or the scroll context. Not to be
+        called while another thread is fetching a page.
+        """
+        self.done = True
+        if self.pit_id is not None:
+            self.es.close_point_in_time(body={"id": self.pit_id})
+            self.pit_id = None
+        if self.scroll_id is not None:
+            self.es.clear_scroll(scroll_id=self.scroll_id)
+            self.scroll_id = None
 
 
 def make_wildcard_query_for_object_pair(object_pair: tuple, query_size: int = 1, min_words: int = 3, max_words:int = 20):
@@ -88,23 +402,116 @@ def make_string_query_for_object_pair(object_pair: tuple, query_size: int = 1, m
     return " ".join(common_object_list), " ".join(object1_list), " ".join(object2_list), elastic_query
 
 
-def make_aspect_queries(es_exist_query: dict, es_instance, q_res_list: list, ob1: str, ob2: str, c_ob: str, is_string: bool = False):
-    if not is_string:
-        add_empty_query_wildcard(es_exist_query)
-    comparison_pril = [
+# Stems of comparative adjectives, the aspects of the comparisons
+COMPARISON_PRIL = [
     'лучш', 'легч', 'хорош', 'велик', 'сильн', 'мил', 'известн', 'красив', 'чист','свеж',
     'хуж', 'слаб', 'плох', 'бедн', 'опасн', 'ужасн', 'сложн', 'противн', 'скучн', 'вредн'
-    ]
-    for pril in comparison_pril:
-        if is_string:
-            es_exist_query["query"]["query_string"]["query"] += " AND " + pril
-        else:
-            es_exist_query["query"]["bool"]["must"][-1]["wildcard"]["sentence"]["value"] = pril + "*"
-        hits, a_num_hits = clean_hits(do_elastic_query(es_instance, es_exist_query, query_size = 3000))
-        if a_num_hits > 0:
-            for a_hit in hits:
-                q_res_list.append([ob1, ob2, c_ob, pril, a_hit])
-            #print(f"\nObject1: {ob1}\nObject2: {ob2}\nCommon object: {c_ob}\nAspect: {pril}\nHits: {a_num_hits}")
+]
+
+
+def make_stem_query(pril: str, is_string: bool = False) -> dict:
+    """
+    Return the query of the sentences with a comparative adjective
+    stem, named after the stem.
+    """
+    if is_string:
+        return {"query_string": {"query": pril, "default_field": "sentence", "_name": pril}}
+    return {"wildcard": {"sentence": {"value": pril + "*", "boost": 1.0, "rewrite": "constant_score", "_name": pril}}}
+
+
+def make_aspect_query(es_exist_query: dict, is_string: bool = False) -> dict:
+    """
+    Return the pair query restricted to the sentences with at least one
+    comparative adjective stem. Each stem is a named query, so every hit
+    tells which stems it contains (matched_queries).
+    """
+    aspect_query = {key: value for key, value in es_exist_query.items() if key != "query"}
+    aspect_query["query"] = {
+        "bool": {
+            "must": [es_exist_query["query"]],
+            "should": [make_stem_query(pril, is_string) for pril in COMPARISON_PRIL],
+            "minimum_should_match": 1
+        }
+    }
+    return aspect_query
+
+
+def split_aspect_hits(hits: list) -> list:
+    """
+    Return (aspect, hits) pairs in the order of COMPARISON_PRIL.
+    A hit that matched several stems goes to the first of them only.
+    """
+    aspect_hits = {pril: [] for pril in COMPARISON_PRIL}
+    for hit in hits:
+        matched = hit.get("matched_queries", [])
+        for pril in COMPARISON_PRIL:
+            if pril in matched:
+                aspect_hits[pril].append(hit)
+                break
+    return [(pril, aspect_hits[pril]) for pril in COMPARISON_PRIL if len(aspect_hits[pril]) > 0]
+
+
+class AspectCoverage:
+    """
+    Hits of the aspect query of a pair, counted by aspect. The hits of
+    a pair are capped by its budget, so the stems that are frequent in
+    the pair can take all of it. The aspects left with fewer than
+    min_hits hits are then topped up with a search per stem, all in
+    one _msearch request, skipping the hits already fetched.
+    """
+    __slots__ = ("pair_query", "is_string", "min_hits", "es_version", "seen_ids", "n_matched", "n_hits")
+
+    def __init__(self, pair_query: dict, is_string: bool = False, min_hits: int = 500, es_version: int = 7):
+        self.pair_query = pair_query  # without the stems
+        self.is_string = is_string
+        self.min_hits = min_hits
+        self.es_version = es_version
+        self.seen_ids = set()
+        self.n_matched = {pril: 0 for pril in COMPARISON_PRIL}  # hits containing the stem
+        self.n_hits = {pril: 0 for pril in COMPARISON_PRIL}  # hits written under the stem
+
+    def split(self, hits: list) -> list:
+        """
+        Return (aspect, hits) pairs as split_aspect_hits does, and count them.
+        """
+        for hit in hits:
+            self.seen_ids.add(hit["_id"])
+            for pril in hit.get("matched_queries", []):
+                if pril in self.n_matched:
+                    self.n_matched[pril] += 1
+        aspect_hits = split_aspect_hits(hits)
+        for pril, hits in aspect_hits:
+            self.n_hits[pril] += len(hits)
+        return aspect_hits
+
+    def top_up(self, es_instance, index: str = "oscar.sentences") -> list:
+        """
+        Return (aspect, hits) pairs with the new hits of the aspects
+        that have fewer than min_hits hits.
+        """
+        aspects = [pril for pril in COMPARISON_PRIL if self.n_hits[pril] < self.min_hits]
+        if len(aspects) <= 0:
+            return []
+        body = []
+        for pril in aspects:
+            stem_query = {key: value for key, value in self.pair_query.items() if key != "query"}
+            stem_query["query"] = {"bool": {"must": [self.pair_query["query"], make_stem_query(pril, self.is_string)]}}
+            # the hits already fetched that contain the stem come back as well
+            stem_query["size"] = min(10000, self.n_matched[pril] + self.min_hits - self.n_hits[pril])
+            body += [{"index": index}, version_query(stem_query, self.es_version)]
+        es_result = es_instance.msearch(body=body)
+        aspect_hits = []
+        for pril, response in zip(aspects, es_result["responses"]):
+            if "error" in response:
+                print(f"Aspect query failed: {response['error']}")
+                continue
+            hits = [hit for hit in response["hits"]["hits"] if hit["_id"] not in self.seen_ids]
+            hits = hits[:self.min_hits - self.n_hits[pril]]
+            self.seen_ids.update(hit["_id"] for hit in hits)
+            self.n_hits[pril] += len(hits)
+            if len(hits) > 0:
+                aspect_hits.append((pril, hits))
+        return aspect_hits
 
 
 def add_query_wildcards(wildcard_object_list: list, wildcard_query: dict):
@@ -121,110 +528,162 @@ def add_query_wildcards(wildcard_object_list: list, wildcard_query: dict):
         wildcard_query["query"]["bool"]["must"].append(object_append)
 
 
-def add_empty_query_wildcard(wildcard_query: dict):
-    object_append = {
-        "wildcard": {
-            "sentence": {
-                "value" : "",
-                "boost": 1.0,
-                "rewrite": "constant_score"
-            }
-        }
-    }
-    wildcard_query["query"]["bool"]["must"].append(object_append)
-
-
 def add_query_strings(string_object_list: list, string_query: dict):
     if string_query["query"]["query_string"]["query"] != "":
         string_query["query"]["query_string"]["query"] += " AND "
     string_query["query"]["query_string"]["query"] += " AND ".join(string_object_list)
 
 
-def f_detect_language(hit):
-    return nlp_detect(hit)._.language
-
-
 def f_get_sentences(hit):
-    return hit["fields"]["sentence"][0]
-
-
-def clean_hits(hits: dict):
-    clean_hits = []
-    amount_hits = 0
-    
-    with Pool(24) as clean_p:
-        hits_list = clean_p.map(f_get_sentences, hits)
-    with Pool(24) as detect_p: 
-        detect = detect_p.map(f_detect_language, hits_list)
-    for idx in range(len(hits_list)):
-        if detect[idx]["language"] == "ru":
-            clean_hits.append(hits_list[idx])
-            amount_hits += 1
-    return clean_hits, amount_hits
-
-
-# Create Dataset directory
-if not os.path.exists("Dataset"):
-    os.makedirs("Dataset")
-
-# Establish elastic connection
-es = Elasticsearch("http://localhost:10008", request_timeout = 100, max_retries = 2)
-
-
-
-# Opening JSON file
-f = open("finish_dataset.json")
-
-# returns JSON object as a dictionary
-object_data = json.load(f)
-
-# Closing file
-f.close()
-for key in object_data:
+    if "fields" in hit:
+        return hit["fields"]["sentence"][0]
+    return hit["_source"]["sentence"]  # Elasticsearch 6
+
+
+def main(args):
+    # Create Dataset directory
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+
+    # Establish elastic connection, with a connection for each concurrent search
+    es = Elasticsearch(args.elastic_url, request_timeout = 100, max_retries = 2, maxsize = args.concurrency)
+
+    # Opening JSON file
+    with open(args.objects, encoding="utf-8") as f:
+        # returns JSON object as a dictionary
+        object_data = json.load(f)
+
+    quick_filter = None
+    if not args.no_quick_filter:
+        quick_filter = QuickLanguageFilter(args.quick_min_letters, args.quick_accept_ratio, margin=args.quick_margin)
+    # the language pool is forked before the executor starts its threads
+    with LanguageFilter(args.processes, args.spacy_model, args.batch_size, quick_filter) as language_filter, \
+            ThreadPoolExecutor(args.concurrency) as executor:
+        for key in object_data:
+            search_category(es, key, object_data[key], language_filter, executor, args.output_dir, args.concurrency,
+                            args.msearch_batch, args.pair_budget, args.paginate, args.page_size, args.es_version,
+                            args.aspect_min_hits)
+        print(f"Language: {language_filter.n_quick} sentences decided by character statistics, "
+              f"{language_filter.n_detected} by spaCy")
+
+
+def search_category(es, key: str, all_obj_list: list, language_filter: LanguageFilter, executor: ThreadPoolExecutor,
+                    output_dir: str = "Dataset", concurrency: int = 8, msearch_batch: int = 100,
+                    pair_budget: int = 10000, paginate: bool = False, page_size: int = 1000, es_version: int = 7,
+                    aspect_min_hits: int = 500):
+    """
+    Search sentences for all pairs of objects of a category
+    and write them to <output_dir>/<category>.json.
+    The hits of all pairs are counted with _msearch first. Then the
+    first pages of the frequent pairs are fetched by the executor, at
+    most 2 * concurrency pairs ahead, while the main thread filters
+    them by language and writes them in the order of the pairs.
+    Pairs whose aspect query used up the budget get a follow-up search
+    for the aspects with fewer than aspect_min_hits hits.
+    """
     if key == "Методологии разработки":
         is_query_string = True
     else:
         is_query_string = False
     print(f"Currently searching for {key} Category")
     filename = key + ".json"
-    filepath = os.path.join("Dataset", filename)
-    all_obj_list = object_data[key]
+    filepath = os.path.join(output_dir, filename)
     possible_pairs = [(a, b) for idx, a in enumerate(all_obj_list) for b in all_obj_list[idx + 1:]]
-    query_results = []
+    pair_queries = []
     for ob_p in possible_pairs:
-        
+
         # Check if object1 is part of object2 or object2 is part of object1
         check_common_object_list = [x for x in ob_p[0].split() if x in ob_p[1].split()]
         check_object1_list = [x for x in ob_p[0].split() if x not in ob_p[1].split() and x not in check_common_object_list]
         check_object2_list = [x for x in ob_p[1].split() if x not in ob_p[0].split() and x not in check_common_object_list]
         if len(check_object1_list) == 0 or len(check_object2_list) == 0:
             continue
-        asp = ""
         if key == "Методологии разработки":
-            com_obj, obj1, obj2, query_body = make_string_query_for_object_pair(ob_p)
+            pair_queries.append(make_string_query_for_object_pair(ob_p))
         else:
-            com_obj, obj1, obj2, query_body = make_wildcard_query_for_object_pair(ob_p)
-        num_hits = get_elastic_query_hits(elastic_instance = es, es_query = query_body)
-        if num_hits < 100:
-            continue
-        else:
-            if num_hits < 1000: # No Aspect query
-                #print("----------------------------------------------------------------------------------------------------")
-                #print(f"Unclean Hits: {num_hits}")
-                hits, num_hits = clean_hits(do_elastic_query(es, query_body, query_size = 1000))
-                #print(hits[0])
-                #print(f"\nObject1: {obj1}\nObject2: {obj2}\nCommon object: {com_obj}\nAspect: {asp}\nHits: {num_hits}")
-                for hit in hits:
-                    query_results.append([obj1, obj2, com_obj, asp, hit])
-            else: # Aspect query
-                #print(f"\nObject1: {obj1}\nObject2: {obj2}\nCommon object: {com_obj}\nAspect: {asp}\nHits: {num_hits}")
-                make_aspect_queries(query_body, es, query_results, obj1, obj2, com_obj, is_query_string)
-    json_object = {key : query_results}
-    with open(filepath, 'w', encoding='utf8') as json_file:
-        json.dump(json_object, json_file, ensure_ascii=False)
+            pair_queries.append(make_wildcard_query_for_object_pair(ob_p))
+    counts = count_elastic_queries(es, [pair_query[3] for pair_query in pair_queries], msearch_batch,
+                                   es_version=es_version)
+    frequent_pairs = [(pair_query, num_hits) for pair_query, num_hits in zip(pair_queries, counts) if num_hits >= 100]
+    print(f"{len(frequent_pairs)} of {len(pair_queries)} pairs have at least 100 hits")
+
+    fetching = deque()
+    next_pair = 0
+    n_results = 0
+
+    def write_hits(obj1: str, obj2: str, com_obj: str, aspect_hits: list):
+        nonlocal n_results
+        for asp, hits in aspect_hits:
+            hits, num_hits = language_filter.clean_hits(hits)
+            #print(f"\nObject1: {obj1}\nObject2: {obj2}\nCommon object: {com_obj}\nAspect: {asp}\nHits: {num_hits}")
+            for hit in hits:
+                json_file.write((", " if n_results > 0 else "")
+                                + json.dumps([obj1, obj2, com_obj, asp, hit], ensure_ascii=False))
+                n_results += 1
+
+    # written as it goes, in the format of json.dump({key: results}), and renamed once complete
+    with open(filepath + ".part", 'w', encoding='utf8') as json_file:
+        json_file.write("{" + json.dumps(key, ensure_ascii=False) + ": [")
+        try:
+            while next_pair < len(frequent_pairs) or len(fetching) > 0:
+                while next_pair < len(frequent_pairs) and len(fetching) < 2 * concurrency:
+                    (com_obj, obj1, obj2, query_body), num_hits = frequent_pairs[next_pair]
+                    coverage = None
+                    if num_hits >= 1000: # No Aspect query below
+                        coverage = AspectCoverage(query_body, is_query_string, aspect_min_hits, es_version)
+                        query_body = make_aspect_query(query_body, is_query_string)
+                    budget = pair_budget if coverage is not None else min(pair_budget, 1000)
+                    search = PagedSearch(es, query_body, budget, page_size, paginate, es_version)
+                    fetching.append(((obj1, obj2, com_obj), coverage, search, executor.submit(search.next_page)))
+                    next_pair += 1
+                (obj1, obj2, com_obj), coverage, search, future = fetching[0]
+                hits = future.result()
+                while len(hits) > 0:
+                    # the next page of the pair is fetched while this one is filtered
+                    next_page = executor.submit(search.next_page)
+                    fetching[0] = ((obj1, obj2, com_obj), coverage, search, next_page)
+                    write_hits(obj1, obj2, com_obj, [("", hits)] if coverage is None else coverage.split(hits))
+                    hits = next_page.result()
+                if coverage is not None and aspect_min_hits > 0 and search.n_fetched >= search.budget:
+                    write_hits(obj1, obj2, com_obj, coverage.top_up(es))
+                fetching.popleft()
+        finally:
+            for _, _, search, future in fetching:
+                # a page being fetched still uses the point in time or the scroll context
+                if not future.cancel():
+                    wait([future])
+                search.close()
+        json_file.write("]}")
+    os.replace(filepath + ".part", filepath)
     print(f"Finished searching for {key} Category")
 
 
-
-
-
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect sentences comparing pairs of objects from Elasticsearch.")
+    parser.add_argument("--objects", type=str, default="finish_dataset.json", help="categories and their objects")
+    parser.add_argument("--output_dir", type=str, default="Dataset")
+    parser.add_argument("--elastic_url", type=str, default="http://localhost:10008")
+    parser.add_argument("--concurrency", type=int, default=8, help="pairs whose hits are fetched at the same time")
+    parser.add_argument("--msearch_batch", type=int, default=100, help="count queries per _msearch request")
+    parser.add_argument("--pair_budget", type=int, default=10000,
+                        help="most hits fetched for a pair with 1000 hits or more (at most 10000 without --paginate)")
+    parser.add_argument("--paginate", action="store_true",
+                        help="fetch the hits in pages, with search_after and a point in time (scroll on Elasticsearch 6)")
+    parser.add_argument("--page_size", type=int, default=1000, help="hits per page with --paginate")
+    parser.add_argument("--es_version", type=int, choices=[6, 7], default=7,
+                        help="major version of Elasticsearch, 6 pages with scroll")
+    parser.add_argument("--aspect_min_hits", type=int, default=500,
+                        help="aspects of a pair that used up its budget are topped up to this many hits (0 = never)")
+    parser.add_argument("--processes", type=int, default=24, help="language detection processes")
+    parser.add_argument("--spacy_model", type=str, default="ru_core_news_sm",
+                        help='spaCy model for language detection, "blank:ru" for none')
+    parser.add_argument("--batch_size", type=int, default=256, help="sentences per nlp.pipe batch")
+    parser.add_argument("--no_quick_filter", action="store_true",
+                        help="send every sentence to spaCy, without the character statistics fast path")
+    parser.add_argument("--quick_min_letters", type=int, default=15,
+                        help="sentences with fewer letters go to spaCy")
+    parser.add_argument("--quick_accept_ratio", type=float, default=0.9,
+                        help="share of Cyrillic letters needed to accept a sentence without spaCy")
+    parser.add_argument("--quick_margin", type=float, default=0.3,
+                        help="trigram log-likelihood margin needed to decide without spaCy")
+    main(parser.parse_args())
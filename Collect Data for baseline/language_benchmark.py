@@ -0,0 +1,99 @@
+import argparse
+import json
+import time
+from multiprocessing import Pool
+import get_json
+
+nlp_full = None  # the whole spaCy model, loaded before the pools are forked, as get_json used to do
+
+
+def old_detect_language(sentence):
+    return nlp_full(sentence)._.language
+
+
+def old_clean_hits(hits: list, processes: int):
+    """
+    Language filtering as it was: two new pools per query
+    and the whole model for each sentence.
+    """
+    with Pool(processes) as clean_p:
+        hits_list = clean_p.map(get_json.f_get_sentences, hits)
+    with Pool(processes) as detect_p:
+        detect = detect_p.map(old_detect_language, hits_list)
+    clean_hits = [hits_list[idx] for idx in range(len(hits_list)) if detect[idx]["language"] == "ru"]
+    return clean_hits, len(clean_hits)
+
+
+def read_hits(file_path: str, n_hits: int) -> list:
+    """
+    Make Elasticsearch-like hits from the sentences of a jsonl file.
+    """
+    sentences = []
+    with open(file_path, "r", encoding="utf-8") as f_in:
+        for line in f_in:
+            if len(line.strip()) > 0:
+                j_dict = json.loads(line)
+                content = j_dict.get("content", j_dict.get("text", "")).replace("\\n", "\n")
+                sentences += [s.strip() for s in content.replace("\n", ".").split(".") if len(s.split()) >= 3]
+    return [{"fields": {"sentence": [sentences[i % len(sentences)]]}} for i in range(n_hits)]
+
+
+def agreement(language_filter: get_json.LanguageFilter, quick_filter: get_json.QuickLanguageFilter,
+              sentences: list) -> dict:
+    """
+    Compare the decisions of the quick filter with those of the spaCy
+    detector on distinct sentences: how many it decides, how often
+    it agrees on them (Russian or not) and how fast it is.
+    """
+    sentences = list(dict.fromkeys(sentences))
+    detected = language_filter.detect(sentences)
+    t1 = time.perf_counter()
+    quick = [quick_filter.classify(sentence) for sentence in sentences]
+    quick_rate = len(sentences) / (time.perf_counter() - t1)
+    decided = [(language, detected_language) for language, detected_language in zip(quick, detected)
+               if language is not None]
+    n_agree = sum(1 for language, detected_language in decided if (language == "ru") == (detected_language == "ru"))
+    return {"sentences": len(sentences), "decided": len(decided) / len(sentences),
+            "agreement": n_agree / max(1, len(decided)), "quick_sentences_per_sec": quick_rate}
+
+
+def measure(clean, hits: list, hits_per_query: int) -> float:
+    t1 = time.perf_counter()
+    for i in range(0, len(hits), hits_per_query):
+        clean(hits[i:i + hits_per_query])
+    return len(hits) / (time.perf_counter() - t1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sentences/sec of the language filter of get_json "
+                                                 "with the way it used to be done.")
+    parser.add_argument("--file", type=str,
+                        default="../Index for Other versions of Elastic/Index Oscar for elastic 7/test/oscar_sample.jsonl")
+    parser.add_argument("--hits", type=int, default=3000, help="number of sentences")
+    parser.add_argument("--hits_per_query", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=24)
+    parser.add_argument("--spacy_model", type=str, default="ru_core_news_sm")
+    parser.add_argument("--batch_size", type=int, default=256)
+    parser.add_argument("--quick_margin", type=float, default=0.3)
+    parser.add_argument("--agreement", action="store_true",
+                        help="only compare the character statistics filter with the spaCy detector")
+    args = parser.parse_args()
+    benchmark_hits = read_hits(args.file, args.hits)
+    if args.agreement:
+        with get_json.LanguageFilter(args.processes, args.spacy_model, args.batch_size) as language_filter:
+            result = agreement(language_filter, get_json.QuickLanguageFilter(margin=args.quick_margin),
+                               [get_json.f_get_sentences(hit) for hit in benchmark_hits])
+        print(f"{result['sentences']} sentences, {result['decided']:.1%} decided by character statistics, "
+              f"{result['agreement']:.2%} of them as the spaCy detector does, "
+              f"{result['quick_sentences_per_sec']:.0f} sentences/sec")
+    else:
+        nlp_full = get_json.load_language_detector(args.spacy_model, exclude=[])
+        before = measure(lambda h: old_clean_hits(h, args.processes), benchmark_hits, args.hits_per_query)
+        print(f"Before (new pools per query, whole model): {before:.0f} sentences/sec")
+        with get_json.LanguageFilter(args.processes, args.spacy_model, args.batch_size) as language_filter:
+            language_filter.clean_hits(benchmark_hits[:args.processes])  # workers load the model
+            after = measure(language_filter.clean_hits, benchmark_hits, args.hits_per_query)
+            language_filter.quick_filter = get_json.QuickLanguageFilter(margin=args.quick_margin)
+            quick = measure(language_filter.clean_hits, benchmark_hits, args.hits_per_query)
+        print(f"After (persistent pool, nlp.pipe, parser and NER excluded): {after:.0f} sentences/sec")
+        print(f"With the character statistics fast path: {quick:.0f} sentences/sec")
@@ -0,0 +1,44 @@
+import argparse
+import gzip
+import json
+import time
+from ES_Wrapper.es_wrapper import EsWrapper
+from ES_Wrapper.text_cleaner import TextCleaner
+
+
+def read_contents(file_path: str, repeat: int) -> list:
+    """
+    Read raw document contents from a .jsonl or .jsonl.gz file.
+    """
+    open_func = gzip.open if file_path.endswith('.gz') else open
+    with open_func(file_path, 'rt', encoding='utf-8') as j_file:
+        contents = [json.loads(j_line)['content'] for j_line in j_file]
+    return contents * repeat
+
+
+def run_cleaner(clean, contents: list, n_bytes: int) -> tuple:
+    t1 = time.perf_counter()
+    results = [clean(content) for content in contents]
+    t2 = time.perf_counter()
+    return n_bytes / (t2 - t1) / 1024 / 1024, results
+
+
+def benchmark(file_path: str, repeat: int):
+    cleaner = TextCleaner(EsWrapper.load_settings('../ES_Wrapper/settings.json'))
+    contents = read_contents(file_path, repeat)
+    n_bytes = sum(len(content.encode('utf-8')) for content in contents)
+    speed_stepwise, results_stepwise = run_cleaner(cleaner.clean_text_stepwise, contents, n_bytes)
+    speed_fused, results_fused = run_cleaner(cleaner.clean_text, contents, n_bytes)
+    if results_stepwise != results_fused:
+        print('Cleaners produced different texts!')
+    print(f'{len(contents)} documents, {n_bytes / 1024 / 1024:.1f} MB')
+    print(f'step-by-step: {speed_stepwise:.1f} MB/s')
+    print(f'fused:        {speed_fused:.1f} MB/s ({speed_fused / speed_stepwise:.1f}x)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure TextCleaner throughput.')
+    parser.add_argument('--file', type=str, default='../test/oscar_sample.jsonl', help='.jsonl or .jsonl.gz file')
+    parser.add_argument('--repeat', type=int, default=2000, help='how many times to repeat the documents')
+    args = parser.parse_args()
+    benchmark(args.file, args.repeat)
@@ -0,0 +1,112 @@
+import argparse
+import gzip
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from elasticsearch import Elasticsearch
+from elasticsearch.client import IndicesClient
+from Indexer.indexer import Indexer
+from Indexer.sentence_cache import SentenceCache, prepare_dir
+from UnitTest.fake_es import FakeElasticsearch
+
+
+def make_corpus(data_dir: str, source_path: str, n_docs: int):
+    """
+    Write a gzip json lines file with n_docs documents
+    taken from the source file in a loop.
+    """
+    with open(source_path, 'r', encoding='utf-8') as f_in:
+        j_lines = [j_line for j_line in f_in if len(j_line.strip()) > 0]
+    with gzip.open(os.path.join(data_dir, 'corpus.jsonl.gz'), 'wt', encoding='utf-8') as f_out:
+        for i in range(n_docs):
+            f_out.write(j_lines[i % len(j_lines)])
+
+
+def run(data_dir: str, settings: dict, bulk_delay: float, cache_dir: str = None, reject_every: int = 0) -> tuple:
+    """
+    Index the corpus into a fresh fake Elasticsearch, reading
+    the prepared shards if cache_dir is given.
+    Return the time spent and the indexed sentences.
+    """
+    fake_es = FakeElasticsearch(bulk_delay=bulk_delay, reject_every=reject_every).start()
+    indexer = Indexer(overwrite_index=True, data_dir=data_dir)
+    indexer.settings.update(settings)
+    indexer.pipeline.__init__(indexer, indexer.settings)
+    indexer.cache = SentenceCache(cache_dir, data_dir) if cache_dir is not None else None
+    indexer.checkpoint.__init__(os.path.join(data_dir, 'checkpoint.jsonl'))
+    indexer.settings['elastic_url'] = fake_es.url  # the async mode connects through the settings
+    indexer.es = Elasticsearch([fake_es.url])
+    indexer.es_ic = IndicesClient(indexer.es)
+    t1 = time.perf_counter()
+    indexer.load_corpus()
+    t2 = time.perf_counter()
+    fake_es.stop()
+    if reject_every > 0:
+        print(f'  {fake_es.n_rejected} items rejected, {indexer.batcher.report()}')
+    return t2 - t1, fake_es.docs(indexer.name + '.sentences')
+
+
+def run_in_process(results, data_dir: str, settings: dict, bulk_delay: float, reject_every: int):
+    time_spent, sentences = run(data_dir, settings, bulk_delay, reject_every=reject_every)
+    # peak resident memory of the indexing process itself, without the worker processes
+    results.put((time_spent, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, sentences))
+
+
+def measure(data_dir: str, settings: dict, bulk_delay: float, reject_every: int = 0) -> tuple:
+    """
+    Index the corpus in a fresh process, so that the peak memory of
+    different modes can be compared. Return the time spent, the peak
+    memory in MB and the indexed sentences.
+    """
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run_in_process,
+                                      args=(results, data_dir, settings, bulk_delay, reject_every))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def benchmark(n_docs: int, bulk_delay: float, max_workers: int, reject_every: int = 0):
+    with tempfile.TemporaryDirectory() as data_dir:
+        make_corpus(data_dir, '../test/oscar_sample.jsonl', n_docs)
+        time_spent, memory, threads_sentences = measure(data_dir, {'indexing_mode': 'threads'}, bulk_delay)
+        print(f'threads: {n_docs / time_spent:.0f} docs/sec, {memory:.0f} MB')
+        if reject_every > 0:
+            for mode in ('threads', 'async'):
+                time_spent, memory, sentences = measure(data_dir, {'indexing_mode': mode, 'num_workers': max_workers},
+                                                        bulk_delay, reject_every)
+                print(f'{mode}, every {reject_every}th item rejected: {n_docs / time_spent:.0f} docs/sec, '
+                      f'same IDs as without rejections: {sentences == threads_sentences}')
+        for max_in_flight in (4, 16):
+            time_spent, memory, sentences = measure(data_dir, {'indexing_mode': 'async', 'num_workers': max_workers,
+                                                               'max_in_flight': max_in_flight}, bulk_delay)
+            print(f'async, {max_in_flight} requests in flight: {n_docs / time_spent:.0f} docs/sec, {memory:.0f} MB, '
+                  f'same IDs as with threads: {sentences == threads_sentences}')
+        reference = None
+        for num_workers in range(1, max_workers + 1):
+            time_spent, sentences = run(data_dir, {'indexing_mode': 'processes', 'num_workers': num_workers},
+                                        bulk_delay)
+            deterministic = reference is None or sentences == reference
+            reference = sentences if reference is None else reference
+            print(f'processes, {num_workers} workers: {n_docs / time_spent:.0f} docs/sec, '
+                  f'same IDs as with 1 worker: {deterministic}')
+        cache_dir = os.path.join(data_dir, 'Cache')
+        t1 = time.perf_counter()
+        prepare_dir(cache_dir, data_dir, max_workers)
+        print(f'prepare stage: {n_docs / (time.perf_counter() - t1):.0f} docs/sec')
+        time_spent, sentences = run(data_dir, {}, bulk_delay, cache_dir=cache_dir)
+        print(f'from sentence cache: {n_docs / time_spent:.0f} docs/sec, '
+              f'same IDs as without cache: {sentences == reference}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare indexing modes against a local fake Elasticsearch.')
+    parser.add_argument('--docs', type=int, default=20000, help='number of documents in the test corpus')
+    parser.add_argument('--bulk_delay', type=float, default=0.005, help='seconds the fake spends on each _bulk')
+    parser.add_argument('--max_workers', type=int, default=os.cpu_count() or 1, help='maximal number of workers')
+    parser.add_argument('--reject_every', type=int, default=0, help='the fake rejects every n-th bulk item with 429')
+    args = parser.parse_args()
+    benchmark(args.docs, args.bulk_delay, args.max_workers, args.reject_every)
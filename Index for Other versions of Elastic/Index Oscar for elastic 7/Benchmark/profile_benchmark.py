@@ -0,0 +1,60 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+from Indexer.indexer import Indexer
+from UnitTest.fake_es import FakeElasticsearch
+from Benchmark.pipeline_benchmark import make_corpus
+
+
+def run(data_dir: str, elastic_url: str, bulk_load: bool, settings: dict) -> tuple:
+    """
+    Index the corpus with the bulk loading or the serving index
+    settings. Return the documents and sentences per second, from
+    the creation of the indices until the data is searchable (for the
+    bulk profile, including the switch to the serving settings).
+    """
+    settings = dict(settings, elastic_url=elastic_url, bulk_load_profile=bulk_load,
+                    checkpoint_file=os.path.join(data_dir, 'checkpoint.jsonl'),
+                    metrics_file=os.path.join(data_dir, 'metrics.jsonl'))
+    x = Indexer(overwrite_index=True, data_dir=data_dir, settings=settings)
+    t1 = time.perf_counter()
+    x.load_corpus()
+    time_spent = time.perf_counter() - t1
+    x.delete_indices()
+    return x.ids.next_doc / time_spent, x.ids.next_sent / time_spent
+
+
+def benchmark(n_docs: int, elastic_url: str, settings: dict):
+    with tempfile.TemporaryDirectory() as data_dir:
+        make_corpus(data_dir, '../test/oscar_sample.jsonl', n_docs)
+        fake_es = None
+        if elastic_url is None:
+            # the fake ignores index settings: this only checks that the benchmark runs
+            fake_es = FakeElasticsearch(keep_docs=False).start()
+            elastic_url = fake_es.url
+        rates = {}
+        for profile, bulk_load in (('serving', False), ('bulk', True)):
+            rates[profile] = run(data_dir, elastic_url, bulk_load, settings)
+            logging.info(f'Rate until searchable with {profile} index settings: '
+                         f'{rates[profile][0]:.1f} documents/s, {rates[profile][1]:.1f} sentences/s')
+            print(f'{profile} index settings: {rates[profile][0]:.0f} docs/sec, {rates[profile][1]:.0f} sentences/sec')
+        if fake_es is not None:
+            fake_es.stop()
+        speedup = rates['bulk'][0] / rates['serving'][0]
+        logging.info(f'Bulk loading index settings: {speedup:.2f} times the ingestion rate with serving settings')
+        print(f'bulk / serving: {speedup:.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the ingestion rate with the bulk loading index settings '
+                                                 'and with the serving settings.')
+    parser.add_argument('--docs', type=int, default=20000, help='number of documents in the test corpus')
+    parser.add_argument('--elastic_url', type=str, default=None,
+                        help='host:port of a test Elasticsearch (default: a local fake, which ignores index settings)')
+    parser.add_argument('--corpus_name', type=str, default='profile_benchmark', help='name of the test indices')
+    parser.add_argument('--indexing_mode', type=str, default='processes')
+    args = parser.parse_args()
+    benchmark(args.docs, args.elastic_url, {'corpus_name': args.corpus_name, 'indexing_mode': args.indexing_mode,
+                                            'use_sentence_cache': False})
@@ -0,0 +1,78 @@
+import argparse
+import copy
+import time
+from ES_Wrapper.es_wrapper import EsWrapper
+from ES_Wrapper.sentence_splitter import Splitter
+from ES_Wrapper.tokenizer import Tokenizer
+
+
+def add_next_word_id_sentence_quadratic(splitter: Splitter, sent: dict):
+    """
+    Previous implementation of Splitter.add_next_word_id_sentence(),
+    which looks for a word to the right of every token.
+    """
+    if len(sent['words']) <= 0:
+        return
+    words = sent['words']
+    leading_punct = 0
+    max_word_num = 0
+    words_started = False
+    for i in range(len(words)):
+        if not words_started:
+            if words[i]['wtype'] != 'word':
+                leading_punct += 1
+            else:
+                words_started = True
+        if words[i]['wtype'] not in ['style_span']:
+            words[i]['next_word'] = i + 1
+        if words_started and not (all(words[j]['wtype'] != 'word' for j in range(i, len(words)))):
+            if words[i]['wtype'] == 'word' or splitter.rxPuncTransparent.search(words[i]['wf']) is None:
+                words[i]['sentence_index'] = i - leading_punct
+                max_word_num = i - leading_punct
+            else:
+                leading_punct += 1
+    if max_word_num > 0:
+        for i in range(len(words)):
+            if 'sentence_index' in words[i]:
+                words[i]['sentence_index_neg'] = max_word_num - words[i]['sentence_index']
+
+
+def pathological_text(n_tokens: int) -> str:
+    """
+    A table-like "sentence": a long run of separators between
+    two words, without sentence-final punctuation.
+    """
+    return 'слово ' + '| ' * (n_tokens - 2) + 'слово'
+
+
+def benchmark(n_tokens: int):
+    settings = EsWrapper.load_settings('../ES_Wrapper/settings.json')
+    tokenizer = Tokenizer(settings)
+    splitter = Splitter(settings)
+    text = pathological_text(n_tokens)
+    sent = {'words': tokenizer.tokenize(text)}
+    sent_linear, sent_quadratic = copy.deepcopy(sent), copy.deepcopy(sent)
+
+    t1 = time.perf_counter()
+    splitter.add_next_word_id_sentence(sent_linear)
+    t2 = time.perf_counter()
+    add_next_word_id_sentence_quadratic(splitter, sent_quadratic)
+    t3 = time.perf_counter()
+    if sent_linear != sent_quadratic:
+        print('Word numbering differs!')
+    print(f'{len(sent["words"])} tokens in one sentence')
+    print(f'linear:    {(t2 - t1) * 1000:.1f} ms')
+    print(f'quadratic: {(t3 - t2) * 1000:.1f} ms')
+
+    t1 = time.perf_counter()
+    sentences = splitter.split(tokenizer.tokenize(text), text)
+    t2 = time.perf_counter()
+    print(f'split() with max_sentence_tokens={splitter.maxSentenceTokens}: '
+          f'{len(sentences)} sentences in {(t2 - t1) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark word numbering on a pathological sentence.')
+    parser.add_argument('--tokens', type=int, default=10000, help='number of tokens in the sentence')
+    args = parser.parse_args()
+    benchmark(args.tokens)
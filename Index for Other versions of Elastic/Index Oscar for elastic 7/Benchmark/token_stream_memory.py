@@ -0,0 +1,64 @@
+import argparse
+import gzip
+import json
+import sys
+import tracemalloc
+from ES_Wrapper.es_wrapper import EsWrapper
+from ES_Wrapper.text_cleaner import TextCleaner
+from ES_Wrapper.tokenizer import Tokenizer
+
+
+def read_texts(file_path: str, limit: int):
+    """
+    Yield cleaned texts from a .jsonl or .jsonl.gz OSCAR shard.
+    """
+    cleaner = TextCleaner(EsWrapper.load_settings('../ES_Wrapper/settings.json'))
+    open_func = gzip.open if file_path.endswith('.gz') else open
+    with open_func(file_path, 'rt', encoding='utf-8') as j_file:
+        for n, j_line in enumerate(j_file):
+            if 0 < limit <= n:
+                return
+            yield cleaner.clean_text(json.loads(j_line)['content'])
+
+
+def measure(tokenize, text: str) -> tuple:
+    """
+    Return the number of memory blocks and bytes held
+    by the token representation of one document.
+    """
+    blocks_before = sys.getallocatedblocks()
+    bytes_before = tracemalloc.get_traced_memory()[0]
+    tokens = tokenize(text)
+    n_blocks = sys.getallocatedblocks() - blocks_before
+    n_bytes = tracemalloc.get_traced_memory()[0] - bytes_before
+    del tokens
+    return n_blocks, n_bytes
+
+
+def benchmark(file_path: str, limit: int):
+    tokenizer = Tokenizer(EsWrapper.load_settings('../ES_Wrapper/settings.json'))
+    totals = {'list': [0, 0], 'stream': [0, 0]}
+    n_docs = 0
+    tracemalloc.start()
+    for text in read_texts(file_path, limit):
+        n_docs += 1
+        for name, tokenize in (('list', tokenizer.tokenize), ('stream', tokenizer.tokenize_stream)):
+            n_blocks, n_bytes = measure(tokenize, text)
+            totals[name][0] += n_blocks
+            totals[name][1] += n_bytes
+    tracemalloc.stop()
+    if n_docs == 0:
+        print('No documents found.')
+        return
+    for name in totals:
+        print(f'{name:7}: {totals[name][0] / n_docs:.1f} blocks, {totals[name][1] / n_docs:.0f} bytes per document')
+    print(f'Reduction: {totals["list"][0] / max(totals["stream"][0], 1):.1f}x blocks, '
+          f'{totals["list"][1] / max(totals["stream"][1], 1):.1f}x bytes ({n_docs} documents)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure memory held by tokens: dictionaries vs TokenStream.')
+    parser.add_argument('--file', type=str, default='../test/test.jsonl', help='.jsonl or .jsonl.gz OSCAR shard')
+    parser.add_argument('--limit', type=int, default=0, help='maximal number of documents (0 = all)')
+    args = parser.parse_args()
+    benchmark(args.file, args.limit)
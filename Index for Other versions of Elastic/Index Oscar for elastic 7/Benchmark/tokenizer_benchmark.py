@@ -0,0 +1,54 @@
+import argparse
+import json
+import time
+from ES_Wrapper.es_wrapper import EsWrapper
+from ES_Wrapper.text_cleaner import TextCleaner
+from ES_Wrapper.tokenizer import Tokenizer
+
+
+def load_texts(file_path: str, repeat: int) -> list:
+    """
+    Read OSCAR-style json lines and return their cleaned texts,
+    repeated the given number of times.
+    """
+    settings = EsWrapper.load_settings('../ES_Wrapper/settings.json')
+    cleaner = TextCleaner(settings)
+    texts = []
+    with open(file_path, 'r', encoding='utf-8') as j_file:
+        for j_line in j_file:
+            texts.append(cleaner.clean_text(json.loads(j_line)['content']))
+    return texts * repeat
+
+
+def run_engine(tokenize, texts: list) -> tuple:
+    """
+    Tokenize all texts with the given function. Return the number
+    of tokens, the time spent and the tokens themselves.
+    """
+    t1 = time.perf_counter()
+    results = [tokenize(text) for text in texts]
+    t2 = time.perf_counter()
+    return sum(len(tokens) for tokens in results), t2 - t1, results
+
+
+def benchmark(file_path: str, repeat: int):
+    texts = load_texts(file_path, repeat)
+    tokenizer = Tokenizer(EsWrapper.load_settings('../ES_Wrapper/settings.json'))
+    if tokenizer.rxToken is None:
+        print('The regex engine is not available with the current settings.')
+        return
+    n_char, time_char, tokens_char = run_engine(tokenizer.tokenize_by_char, texts)
+    n_regex, time_regex, tokens_regex = run_engine(tokenizer.tokenize_regex, texts)
+    if tokens_char != tokens_regex:
+        print('Engines produced different tokens!')
+    print(f'{len(texts)} documents, {n_char} tokens')
+    print(f'char engine:  {n_char / time_char:.0f} tokens/sec')
+    print(f'regex engine: {n_regex / time_regex:.0f} tokens/sec ({time_char / time_regex:.1f}x)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare tokenizer engines on json lines documents.')
+    parser.add_argument('--file', type=str, default='../test/test.jsonl', help='jsonl file with OSCAR documents')
+    parser.add_argument('--repeat', type=int, default=2000, help='how many times to repeat the documents')
+    args = parser.parse_args()
+    benchmark(args.file, args.repeat)
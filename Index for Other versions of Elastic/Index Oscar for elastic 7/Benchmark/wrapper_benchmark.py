@@ -0,0 +1,162 @@
+import argparse
+import copy
+import json
+import random
+import sys
+import time
+import tracemalloc
+from ES_Wrapper.es_wrapper import EsWrapper
+
+STAGES = ('cleaner', 'tokenizer', 'splitter')
+
+PUNCTUATION = ['...', '!', '?!', '?..', '!!!', ';', ':', ' - ', ' — ', ', ', '(', ')', '«', '»', '"', '“', '”',
+               ' т.е. ', ' и т.д. ', ' 1.5 ', ' 12:30 ', ' 3,14 ', ' e-mail@mail.ru ', ' http://example.ru/a?b=c ']
+HTML_TAGS = ['<p>', '</p>', '<div class="text">', '</div>', '<span style="color: red">', '</span>',
+             '<a href="http://example.ru/">', '</a>', '<img src="a.png">', '&nbsp;', '&amp;', '&laquo;', '&raquo;',
+             '&#8212;', '<br>', '\\n', '\n', '\t']
+
+
+def read_documents(file_path: str) -> list:
+    with open(file_path, 'r', encoding='utf-8') as j_file:
+        return [json.loads(j_line) for j_line in j_file if len(j_line.strip()) > 0]
+
+
+def with_content(template: dict, content: str) -> dict:
+    j_dict = copy.deepcopy(template)
+    j_dict['content'] = content
+    return j_dict
+
+
+def make_corpora(file_path: str, n_docs: int, seed: int = 0) -> dict:
+    """
+    Build synthetic OSCAR-like corpora of n_docs documents each
+    from the sentences of the sample file: short and long documents,
+    texts full of punctuation, texts full of HTML and shuffled words
+    without sentence boundaries, plus the sampled documents themselves.
+    The same seed gives the same corpora. Long documents are fewer.
+    """
+    rand = random.Random(seed)
+    samples = read_documents(file_path)
+    words = ' '.join(j_dict['content'] for j_dict in samples).split()
+    sentences = []
+    for j_dict in samples:
+        sentences += [s.strip() + '.' for s in j_dict['content'].replace('\\n', '\n').split('.') if len(s.strip()) > 0]
+
+    def text(n_sentences: int, noise: list = None, noise_rate: float = 0.0) -> str:
+        tokens = []
+        for _ in range(n_sentences):
+            for word in rand.choice(sentences).split():
+                tokens.append(word)
+                if noise is not None and rand.random() < noise_rate:
+                    tokens.append(rand.choice(noise))
+        return ' '.join(tokens)
+
+    corpora = {
+        'sampled': [samples[i % len(samples)] for i in range(n_docs)],
+        'short': [with_content(rand.choice(samples), text(1)) for _ in range(n_docs)],
+        'long': [with_content(rand.choice(samples), text(300)) for _ in range(max(1, n_docs // 20))],
+        'punctuation': [with_content(rand.choice(samples), text(10, PUNCTUATION, 0.3)) for _ in range(n_docs)],
+        'html': [with_content(rand.choice(samples), text(10, HTML_TAGS, 0.3)) for _ in range(n_docs)],
+        'words': [with_content(rand.choice(samples), ' '.join(rand.choice(words) for _ in range(200)))
+                  for _ in range(n_docs)]
+    }
+    return corpora
+
+
+def time_corpus(es_wrapper: EsWrapper, docs: list, repeat: int) -> dict:
+    """
+    Run create_es_format on all documents repeat times and return
+    documents per second for each stage and for the whole wrapper
+    (the best of the repeats, which is the least noisy).
+    """
+    best = None
+    for _ in range(repeat):
+        stage_times = {}
+        t1 = time.perf_counter()
+        for j_dict in docs:
+            es_wrapper.create_es_format(j_dict, stage_times)
+        total = time.perf_counter() - t1
+        rates = {stage: len(docs) / stage_times[stage][0] for stage in STAGES}
+        rates['total'] = len(docs) / total
+        if best is None:
+            best = rates
+        else:
+            best = {stage: max(best[stage], rates[stage]) for stage in best}
+    return best
+
+
+def measure_allocations(es_wrapper: EsWrapper, docs: list) -> dict:
+    """
+    Return the memory blocks allocated and not freed per document
+    (a leak would show here) and the peak memory needed for one
+    document on average and at most, measured with tracemalloc.
+    """
+    tracemalloc.start()
+    peak_sum = 0
+    peak_max = 0
+    blocks_before = sys.getallocatedblocks()
+    for j_dict in docs:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        es_ready = es_wrapper.create_es_format(j_dict)
+        peak = tracemalloc.get_traced_memory()[1] - before
+        peak_sum += peak
+        peak_max = max(peak_max, peak)
+        del es_ready
+    n_blocks = sys.getallocatedblocks() - blocks_before
+    tracemalloc.stop()
+    return {'blocks_kept_per_doc': n_blocks / len(docs), 'peak_kb_mean': peak_sum / len(docs) / 1024,
+            'peak_kb_max': peak_max / 1024}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Return the (corpus, stage, rate, baseline rate) of all stages
+    that are slower than in the baseline by more than tolerance.
+    """
+    regressions = []
+    for corpus, result in results.items():
+        for stage, rate in result['docs_per_sec'].items():
+            old_rate = baseline.get(corpus, {}).get('docs_per_sec', {}).get(stage)
+            if old_rate is not None and rate < old_rate * (1 - tolerance):
+                regressions.append((corpus, stage, rate, old_rate))
+    return regressions
+
+
+def benchmark(file_path: str, n_docs: int, repeat: int) -> dict:
+    es_wrapper = EsWrapper()
+    results = {}
+    print(f'{"":12} {"documents per second":^39} | {"memory per document":^26}')
+    print(f'{"corpus":12} {"cleaner":>9} {"tokenizer":>9} {"splitter":>9} {"total":>9} | '
+          f'{"peak KB":>8} {"max KB":>8} {"blocks":>8}')
+    for corpus, docs in make_corpora(file_path, n_docs).items():
+        rates = time_corpus(es_wrapper, docs, repeat)
+        allocations = measure_allocations(es_wrapper, docs)
+        results[corpus] = {'docs': len(docs), 'docs_per_sec': rates, 'allocations': allocations}
+        print(f'{corpus:12} ' + ' '.join(f'{rates[stage]:9.0f}' for stage in STAGES + ('total',)) +
+              f' | {allocations["peak_kb_mean"]:8.1f} {allocations["peak_kb_max"]:8.1f} '
+              f'{allocations["blocks_kept_per_doc"]:8.2f}')
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the speed and memory of the ES_Wrapper stages '
+                                                 'on synthetic and sampled documents, without Elasticsearch.')
+    parser.add_argument('--file', type=str, default='../test/oscar_sample.jsonl', help='sample .jsonl file')
+    parser.add_argument('--docs', type=int, default=2000, help='number of documents in each corpus')
+    parser.add_argument('--repeat', type=int, default=3, help='how many times to time each corpus')
+    parser.add_argument('--save', type=str, default='', help='write the results to this json file')
+    parser.add_argument('--baseline', type=str, default='', help='compare with results saved earlier')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown against the baseline')
+    args = parser.parse_args()
+    benchmark_results = benchmark(args.file, args.docs, args.repeat)
+    if len(args.save) > 0:
+        with open(args.save, 'w', encoding='utf-8') as f_out:
+            json.dump(benchmark_results, f_out, indent=1)
+    if len(args.baseline) > 0:
+        with open(args.baseline, 'r', encoding='utf-8') as f_in:
+            found = compare(benchmark_results, json.load(f_in), args.tolerance)
+        for corpus_name, stage_name, new_rate, baseline_rate in found:
+            print(f'Regression: {stage_name} on {corpus_name} documents: {new_rate:.0f} docs/sec '
+                  f'instead of {baseline_rate:.0f}')
+        sys.exit(1 if len(found) > 0 else 0)
@@ -1,10 +1,12 @@
 import os
 import json
 import logging
+import time
 from dataclasses import dataclass
 from ES_Wrapper.text_cleaner import TextCleaner
 from ES_Wrapper.sentence_splitter import Splitter
 from ES_Wrapper.tokenizer import Tokenizer
+from ES_Wrapper.paths import project_path
 
 
 @dataclass(frozen=True)
@@ -22,10 +24,10 @@ class EsWrapper:
     __slots__ = ('settings', 'data_dir', 'cleaner', 'tokenizer', 'splitter')
 
     def __init__(self, settings_path: str = '../ES_Wrapper/settings.json', files_dir: str = '../Data'):
-        self.settings = self.load_settings(settings_path)
-        logging.basicConfig(filename=os.path.join("../Logs", "wrapper.log"), filemode="w",
+        self.settings = self.load_settings(project_path(settings_path))
+        logging.basicConfig(filename=project_path(os.path.join("../Logs", "wrapper.log")), filemode="w",
                             level=logging.INFO)
-        self.data_dir = files_dir
+        self.data_dir = project_path(files_dir)
         if not os.path.exists(self.data_dir):
             logging.error("No Data Directory Detected")
         self.cleaner = TextCleaner(self.settings)
@@ -54,11 +56,35 @@ class EsWrapper:
             sentences[index] = sentences[index]['text']
         return sentences
 
-    def create_es_format(self, j_dict: dict) -> RussianES:
+    @staticmethod
+    def add_stage_time(stage_times: dict, stage: str, seconds: float):
+        times = stage_times.setdefault(stage, [0.0, 0])
+        times[0] += seconds
+        times[1] += 1
+
+    def create_es_format(self, j_dict: dict, stage_times: dict = None) -> RussianES:
+        """
+        If stage_times is given, add the time spent by the cleaner,
+        the tokenizer and the splitter on this document to it
+        (stage -> [seconds, documents]).
+        """
+        t1 = time.perf_counter()
         text = self.cleaner.clean_text(j_dict['content'])
-        tokens = self.tokenizer.tokenize(text)
-        sentences = self.splitter.split(tokens, text)
-        sentences = self.remove_meta_from_sentences(sentences)  # Remove token info from sentences
+        t2 = time.perf_counter()
+        if self.settings.get('token_stream', False):
+            tokens = self.tokenizer.tokenize_stream(text)
+        else:
+            tokens = self.tokenizer.tokenize(text)
+        t3 = time.perf_counter()
+        if self.settings.get('index_word_meta', False):
+            sentences = self.splitter.split(tokens, text)
+            sentences = self.remove_meta_from_sentences(sentences)  # Remove token info from sentences
+        else:
+            sentences = self.splitter.split_text(tokens, text)  # Only sentence texts are indexed
+        if stage_times is not None:
+            self.add_stage_time(stage_times, 'cleaner', t2 - t1)
+            self.add_stage_time(stage_times, 'tokenizer', t3 - t2)
+            self.add_stage_time(stage_times, 'splitter', time.perf_counter() - t3)
         annotation = j_dict['metadata']['annotation']
         uri = j_dict['warc_headers']['warc-target-uri']
         return RussianES(text=text, sentences=sentences, tags=annotation, link=uri)
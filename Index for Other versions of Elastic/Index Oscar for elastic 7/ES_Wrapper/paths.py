@@ -0,0 +1,15 @@
+import os
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def project_path(path: str) -> str:
+    """
+    Resolve a path from the settings or a default path against the
+    project directory instead of the working directory. The paths
+    are written as seen from a subdirectory of the project, like
+    '../Logs', because the scripts used to be run from there.
+    """
+    if os.path.isabs(path):
+        return path
+    return os.path.normpath(os.path.join(ROOT_DIR, 'Indexer', path))
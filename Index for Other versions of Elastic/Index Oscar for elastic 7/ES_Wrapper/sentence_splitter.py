@@ -2,6 +2,9 @@ import re
 import copy
 import os
 import logging
+from array import array
+from ES_Wrapper.token_stream import TokenStream
+from ES_Wrapper.paths import project_path
 
 
 # noinspection PyBroadException
@@ -11,11 +14,11 @@ class Splitter:
     into sentences.
     """
 
-    __slots__ = ('settings', 'rxSentEnd', 'rxSentStart', 'rxPuncTransparent')
+    __slots__ = ('settings', 'rxSentEnd', 'rxSentStart', 'rxPuncTransparent', 'maxSentenceTokens', 'abbreviations')
 
     def __init__(self, settings: dict):
         self.settings = copy.deepcopy(settings)
-        logging.basicConfig(filename=os.path.join("../Logs", "splitter.log"), filemode="w",
+        logging.basicConfig(filename=project_path(os.path.join("../Logs", "splitter.log")), filemode="w",
                             level=logging.INFO)
         try:
             self.rxSentEnd = re.compile(self.settings['sent_end_punc'])
@@ -37,6 +40,10 @@ class Splitter:
                 self.rxPuncTransparent = re.compile('^ *$')
         else:
             self.rxPuncTransparent = re.compile('^ *$')
+        # Runaway "sentences" (lists, tables, spam without punctuation)
+        # are cut into pieces of at most this many tokens, 0 = no limit.
+        self.maxSentenceTokens = self.settings.get('max_sentence_tokens', 0)
+        self.abbreviations = frozenset(self.settings['abbreviations'])
 
     @staticmethod
     def join_sentences(sentence_l: dict, sentence_r: dict, absolute_offsets: bool = False):
@@ -116,6 +123,38 @@ class Splitter:
             w['off_start'] -= start_offset
             w['off_end'] -= start_offset
 
+    def limit_sentence_length(self, sentences: list, text: str) -> list:
+        """
+        Cut sentences that are longer than maxSentenceTokens tokens
+        into several sentences. Offsets must still be absolute.
+        """
+        if self.maxSentenceTokens <= 0:
+            return sentences
+        limited = []
+        for s in sentences:
+            if len(s['words']) <= self.maxSentenceTokens:
+                limited.append(s)
+                continue
+            logging.debug(f"Cutting a sentence of {len(s['words'])} tokens")
+            for part_start in range(0, len(s['words']), self.maxSentenceTokens):
+                part = {'words': s['words'][part_start:part_start + self.maxSentenceTokens]}
+                part['text'] = text[part['words'][0]['off_start']:part['words'][-1]['off_end']]
+                limited.append(part)
+        return limited
+
+    def limit_bounds_length(self, bounds: list) -> list:
+        """
+        Same as limit_sentence_length(), but for the token
+        number pairs returned by sentence_bounds().
+        """
+        if self.maxSentenceTokens <= 0:
+            return bounds
+        limited = []
+        for sent_start, sent_end in bounds:
+            for part_start in range(sent_start, sent_end, self.maxSentenceTokens):
+                limited.append((part_start, min(part_start + self.maxSentenceTokens, sent_end)))
+        return limited
+
     def recalculate_offsets(self, sentences: list):
         """
         Recalculate offsets so that they always start at the
@@ -133,6 +172,12 @@ class Splitter:
         if len(sent['words']) <= 0:
             return
         words = sent['words']
+        # Position of the last word: punctuation after it gets no sentence_index
+        last_word = -1
+        for i in range(len(words) - 1, -1, -1):
+            if words[i]['wtype'] == 'word':
+                last_word = i
+                break
         # Forward numbering and next word ID (LTR)
         leading_punct = 0
         max_word_num = 0
@@ -145,7 +190,7 @@ class Splitter:
                     words_started = True
             if words[i]['wtype'] not in ['style_span']:
                 words[i]['next_word'] = i + 1
-            if words_started and not (all(words[j]['wtype'] != 'word' for j in range(i, len(words)))):
+            if words_started and i <= last_word:
                 if words[i]['wtype'] == 'word' or self.rxPuncTransparent.search(words[i]['wf']) is None:
                     words[i]['sentence_index'] = i - leading_punct
                     max_word_num = i - leading_punct
@@ -166,14 +211,100 @@ class Splitter:
         for sent in sentences:
             self.add_next_word_id_sentence(sent)
 
-    def split(self, tokens: list, text: str) -> list:
+    @staticmethod
+    def next_word_index(word_flags) -> array:
+        """
+        For every token number i, find the number of the nearest
+        wordform to the right of i, including i itself, or -1 if
+        there is none. word_flags[i] tells if token i is a word.
+        Computed in one backward pass, so that sentence boundary
+        detection does not scan forward at every punctuation mark.
+        The array has one extra -1 at the end for convenience.
+        """
+        next_words = array('i', [-1]) * (len(word_flags) + 1)
+        for i in range(len(word_flags) - 1, -1, -1):
+            if word_flags[i]:
+                next_words[i] = i
+            else:
+                next_words[i] = next_words[i + 1]
+        return next_words
+
+    def sentence_bounds(self, tokens: TokenStream) -> list:
+        """
+        Find sentence boundaries in a TokenStream without creating
+        token dictionaries. Return a list of (first, last + 1) token
+        numbers. Sentences that consist of punctuation only are
+        attached to the previous sentence, as in append_sentence(),
+        and runaway sentences are cut, as in limit_sentence_length().
+        """
+        bounds = []
+        n_tokens = len(tokens)
+        next_words = self.next_word_index([wtype == TokenStream.WORD for wtype in tokens.wtypes])
+        sent_start = 0
+        for i in range(n_tokens):
+            if tokens.wtypes[i] == TokenStream.PUNCT:
+                wf = tokens.wf(i)
+                if not (i == n_tokens - 1
+                        or (self.settings['newline_ends_sent'] and wf == '\\n')
+                        or (self.rxSentEnd.search(wf) is not None
+                            and i > 0
+                            and tokens.wf(i - 1) not in self.abbreviations
+                            and self.rxSentStart.search(tokens.wf(next_words[i + 1])
+                                                        if next_words[i + 1] >= 0 else '') is not None)):
+                    continue
+            elif i < n_tokens - 1:
+                continue
+            if len(bounds) > 0 and all(tokens.wtypes[j] == TokenStream.PUNCT for j in range(sent_start, i + 1)):
+                bounds[-1] = (bounds[-1][0], i + 1)
+            else:
+                bounds.append((sent_start, i + 1))
+            sent_start = i + 1
+        return self.limit_bounds_length(bounds)
+
+    def split_stream(self, tokens: TokenStream, text: str) -> list:
+        """
+        Same as split(), but for a TokenStream. Token dictionaries
+        are only created for the words of the resulting sentences.
+        """
+        sentences = []
+        for sent_start, sent_end in self.sentence_bounds(tokens):
+            sentences.append({'words': [tokens.token(i) for i in range(sent_start, sent_end)],
+                              'text': text[tokens.off_starts[sent_start]:tokens.off_ends[sent_end - 1]]})
+        self.recalculate_offsets(sentences)
+        self.add_next_word_id(sentences)
+        return sentences
+
+    def sentence_offsets(self, tokens, text: str) -> list:
+        """
+        Return (start, end) character offsets of the sentences,
+        without any per-word bookkeeping. tokens can be either
+        a list of token dictionaries or a TokenStream.
+        """
+        if not isinstance(tokens, TokenStream):
+            tokens = TokenStream.from_tokens(tokens, text)
+        return [(tokens.off_starts[sent_start], tokens.off_ends[sent_end - 1])
+                for sent_start, sent_end in self.sentence_bounds(tokens)]
+
+    def split_text(self, tokens, text: str) -> list:
+        """
+        Split the text into sentences and return their texts only.
+        The boundaries are the same as in split(), but no token
+        dictionaries, offsets or word numbers are created.
+        """
+        return [text[start:end] for start, end in self.sentence_offsets(tokens, text)]
+
+    def split(self, tokens, text: str) -> list:
         """
         Split the text into sentences by packing tokens into
-        separate sentence JSON objects.
+        separate sentence JSON objects. tokens can be either
+        a list of token dictionaries or a TokenStream.
         Return the resulting list of sentences.
         """
+        if isinstance(tokens, TokenStream):
+            return self.split_stream(tokens, text)
         sentences = []
         cur_sentence = {'words': []}
+        next_words = self.next_word_index([token['wtype'] == 'word' for token in tokens])
         for i in range(len(tokens)):
             wf = tokens[i]['wf']
             cur_sentence['words'].append(tokens[i])
@@ -182,13 +313,15 @@ class Splitter:
                         or (self.settings['newline_ends_sent'] and wf == '\\n')
                         or (self.rxSentEnd.search(wf) is not None
                             and i > 0
-                            and tokens[i - 1]['wf'] not in self.settings['abbreviations']
-                            and self.rxSentStart.search(self.next_word(tokens, i + 1)) is not None)):
+                            and tokens[i - 1]['wf'] not in self.abbreviations
+                            and self.rxSentStart.search(tokens[next_words[i + 1]]['wf']
+                                                        if next_words[i + 1] >= 0 else '') is not None)):
                     self.append_sentence(sentences, cur_sentence, text)
                     cur_sentence = {'words': []}
                     continue
             elif i == len(tokens) - 1:
                 self.append_sentence(sentences, cur_sentence, text)
+        sentences = self.limit_sentence_length(sentences, text)
         self.recalculate_offsets(sentences)
         self.add_next_word_id(sentences)
         return sentences
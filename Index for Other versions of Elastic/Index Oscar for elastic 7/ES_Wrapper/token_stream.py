@@ -0,0 +1,91 @@
+import copy
+from array import array
+
+
+class TokenStream:
+    """
+    Compact array-backed list of tokens of one text.
+    Offsets are stored in two integer arrays and token types
+    in a byte array. Wordforms are not stored at all: they are
+    slices of the source text, unless a special token overrides them.
+    """
+
+    WORD = 0
+    PUNCT = 1
+
+    __slots__ = ('text', 'off_starts', 'off_ends', 'wtypes', 'wtype_names', 'wf_overrides', 'extra')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.off_starts = array('i')
+        self.off_ends = array('i')
+        self.wtypes = bytearray()
+        self.wtype_names = ['word', 'punct']  # index in this list = code in self.wtypes
+        self.wf_overrides = {}  # token number -> wordform that differs from the text slice
+        self.extra = {}  # token number -> other keys of a special token
+
+    def __len__(self) -> int:
+        return len(self.wtypes)
+
+    def wtype_code(self, wtype: str) -> int:
+        """
+        Return the byte code of a token type, registering
+        the type if it has not been seen before.
+        """
+        if wtype == 'word':
+            return TokenStream.WORD
+        if wtype == 'punct':
+            return TokenStream.PUNCT
+        try:
+            return self.wtype_names.index(wtype)
+        except ValueError:
+            self.wtype_names.append(wtype)
+            return len(self.wtype_names) - 1
+
+    def append(self, wtype_code: int, off_start: int, off_end: int, wf: str = None, extra: dict = None):
+        """
+        Add one token to the end of the stream. wf has to be
+        provided only if it differs from the slice of the text.
+        """
+        if wf is not None and wf != self.text[off_start:off_end]:
+            self.wf_overrides[len(self.wtypes)] = wf
+        if extra is not None and len(extra) > 0:
+            self.extra[len(self.wtypes)] = extra
+        self.wtypes.append(wtype_code)
+        self.off_starts.append(off_start)
+        self.off_ends.append(off_end)
+
+    def wf(self, i: int) -> str:
+        if i in self.wf_overrides:
+            return self.wf_overrides[i]
+        return self.text[self.off_starts[i]:self.off_ends[i]]
+
+    def wtype(self, i: int) -> str:
+        return self.wtype_names[self.wtypes[i]]
+
+    def token(self, i: int) -> dict:
+        """
+        Return the i-th token as a dictionary in the format
+        produced by Tokenizer.tokenize().
+        """
+        token = copy.deepcopy(self.extra[i]) if i in self.extra else {}
+        token['wtype'] = self.wtype(i)
+        token['wf'] = self.wf(i)
+        token['off_start'] = self.off_starts[i]
+        token['off_end'] = self.off_ends[i]
+        return token
+
+    def to_tokens(self) -> list:
+        return [self.token(i) for i in range(len(self))]
+
+    @classmethod
+    def from_tokens(cls, tokens: list, text: str):
+        """
+        Pack a list of token dictionaries into a TokenStream.
+        """
+        stream = cls(text)
+        for token in tokens:
+            extra = {k: v for k, v in token.items() if k not in ('wtype', 'wf', 'off_start', 'off_end')}
+            stream.append(stream.wtype_code(token['wtype']), token['off_start'], token['off_end'],
+                          wf=token['wf'], extra=extra)
+        return stream
@@ -2,6 +2,8 @@ import re
 import os
 import copy
 import logging
+from ES_Wrapper.token_stream import TokenStream
+from ES_Wrapper.paths import project_path
 
 
 # noinspection PyBroadException
@@ -11,18 +13,23 @@ class Tokenizer:
     """
 
     rxPunc = re.compile('[^\\w ]')
+    rxBackReference = re.compile('\\\\[1-9]')
 
-    __slots__ = ('settings', 'tokenSplitRegexes', 'specialTokenRegexes')
+    __slots__ = ('settings', 'tokenSplitRegexes', 'specialTokenRegexes', 'rxToken', 'specialTokenGroups')
 
     def __init__(self, settings: dict):
         self.settings = copy.deepcopy(settings)
-        logging.basicConfig(filename=os.path.join("../Logs", "tokenizer.log"), filemode="w", level=logging.INFO)
+        logging.basicConfig(filename=project_path(os.path.join("../Logs", "tokenizer.log")), filemode="w", level=logging.INFO)
         if 'non_word_internal_punct' not in self.settings:
             self.settings['non_word_internal_punct'] = ['\n', '\\n']
         self.tokenSplitRegexes = []
         self.specialTokenRegexes = []
+        self.rxToken = None
+        self.specialTokenGroups = {}
         self.add_split_token_regexes()
         self.add_special_token_regexes()
+        if self.settings.get('tokenizer_engine', 'regex') == 'regex':
+            self.compile_token_regex()
 
     def add_split_token_regexes(self):
         """
@@ -54,6 +61,46 @@ class Tokenizer:
             except:
                 print('Error when compiling a regex: ' + str_rx)
 
+    def compile_token_regex(self):
+        """
+        Combine special tokens, newlines, words and punctuation into
+        one regex, so that the text can be tokenized in a single pass.
+        If the settings cannot be expressed this way, self.rxToken
+        stays None and the character-by-character engine is used.
+        """
+        if any(len(c) == 1 and c not in ' \n' and self.rxPunc.search(c) is None
+               for c in self.settings['non_word_internal_punct']):
+            logging.warning('Word characters in non_word_internal_punct, using the char tokenizer engine.')
+            return
+        special_parts = []
+        special_lookahead = []
+        for i_rx in range(len(self.specialTokenRegexes)):
+            str_rx = self.specialTokenRegexes[i_rx]['regex'].pattern
+            if self.rxBackReference.search(str_rx) is not None:
+                logging.warning('Back references in special tokens, using the char tokenizer engine.')
+                return
+            # Spaces and newlines are never checked against special tokens
+            special_parts.append('(?P<s' + str(i_rx) + '>(?![ \\n])' + str_rx + ')')
+            special_lookahead.append('(?:' + str_rx + ')')
+            self.specialTokenGroups['s' + str(i_rx)] = self.specialTokenRegexes[i_rx]['token']
+        if len(special_parts) > 0:
+            # Special tokens can start in the middle of a word, so every
+            # character of a word or a punctuation run is checked against them.
+            not_special = '(?!' + '|'.join(special_lookahead) + ')'
+            str_word = '(?:' + not_special + '\\w)+'
+            str_punc = '(?:' + not_special + '[^\\w \\n])+'
+        else:
+            str_word = '\\w+'
+            str_punc = '[^\\w \\n]+'
+        try:
+            self.rxToken = re.compile('|'.join(special_parts + ['(?P<nl>\\n)',
+                                                                '(?P<word>' + str_word + ')',
+                                                                '(?P<punct>' + str_punc + ')']))
+        except:
+            logging.error('Error when combining token regexes, using the char tokenizer engine.')
+            self.rxToken = None
+            self.specialTokenGroups = {}
+
     @staticmethod
     def join_tokens(token_l: dict, token_r: dict):
         """
@@ -63,15 +110,20 @@ class Tokenizer:
         token_l['off_end'] = token_r['off_end']
         token_l['wtype'] = 'word'
 
-    def join_hyphens(self, tokens: list) -> list:
+    def join_hyphens(self, tokens: list, copy_tokens: bool = True) -> list:
         """
         Take the list of tokens and join token segments like W-W.
+        If copy_tokens == False, the tokens are joined in place,
+        which is only safe if nobody else holds them.
         """
         if len(tokens) <= 0:
             return tokens
         joined_tokens = []
         for i in range(len(tokens)):
-            token = copy.deepcopy(tokens[i])
+            if copy_tokens:
+                token = copy.deepcopy(tokens[i])
+            else:
+                token = tokens[i]
             if len(joined_tokens) <= 0:
                 joined_tokens.append(token)
                 continue
@@ -120,6 +172,134 @@ class Tokenizer:
         tokens.append(token)
 
     def tokenize(self, text: str) -> list:
+        """
+        Split the text into a list of token dictionaries, using
+        the engine chosen in the settings ("regex" or "char").
+        """
+        if self.rxToken is not None:
+            return self.tokenize_regex(text)
+        return self.tokenize_by_char(text)
+
+    def tokenize_regex(self, text: str) -> list:
+        """
+        Single-pass tokenizer engine. Produces the same tokens
+        as tokenize_by_char(), but lets one combined regex find
+        token boundaries instead of looking at each character.
+        """
+        tokens = []
+        split_words = len(self.tokenSplitRegexes) > 0
+        for m in self.rxToken.finditer(text):
+            kind = m.lastgroup
+            if kind == 'word':
+                token = {'off_start': m.start(), 'wf': m.group(), 'wtype': 'word', 'off_end': m.end()}
+                if split_words:
+                    self.add_token(tokens, token)
+                else:
+                    tokens.append(token)
+            elif kind == 'punct':
+                tokens.append({'off_start': m.start(), 'wf': m.group(), 'wtype': 'punct', 'off_end': m.end()})
+            elif kind == 'nl':
+                tokens.append({'wtype': 'punct', 'off_start': m.start(), 'off_end': m.end(), 'wf': '\\n'})
+            else:
+                token = copy.deepcopy(self.specialTokenGroups[kind])
+                if 'wtype' not in token:
+                    token['wtype'] = 'word'
+                if 'wf' not in token:
+                    token['wf'] = m.group()
+                token['off_start'] = m.start()
+                token['off_end'] = m.end()
+                self.add_token(tokens, token)
+        return self.join_hyphens(tokens, copy_tokens=False)
+
+    def split_stream_token(self, stream: TokenStream, off_start: int, off_end: int, wf: str, extra: dict = None):
+        """
+        Add one new word to the stream, splitting it into several
+        parts if the settings require it (same as add_token()).
+        """
+        for r in self.tokenSplitRegexes:
+            m = r.search(wf)
+            if m is not None:
+                for iGroup in range(1, 1 + len(m.groups())):
+                    group = m.group(iGroup)
+                    group_start, group_end = m.span(iGroup)
+                    if group is not None and len(group) > 0 and group_start >= 0 and group_end >= 0:
+                        stream.append(TokenStream.WORD, off_start + group_start, off_start + group_end,
+                                      wf=group, extra=extra)
+                return
+        stream.append(TokenStream.WORD, off_start, off_end, wf=wf, extra=extra)
+
+    def join_hyphens_stream(self, tokens: TokenStream) -> TokenStream:
+        """
+        Same as join_hyphens(), but for a TokenStream.
+        Return a new stream with token segments like W-W joined.
+        """
+        joined = TokenStream(tokens.text)
+        joined.wtype_names = tokens.wtype_names
+        non_word_internal_punct = self.settings['non_word_internal_punct']
+        n_tokens = len(tokens)
+        for i in range(n_tokens):
+            last = len(joined) - 1
+            wtype = tokens.wtypes[i]
+            if last >= 0 and (
+                    (wtype == TokenStream.WORD
+                     and joined.wtypes[last] == TokenStream.WORD
+                     and joined.off_ends[last] == tokens.off_starts[i]
+                     and (len(self.tokenSplitRegexes) <= 0
+                          or joined.wf(last).endswith('-')))
+                    or (i < n_tokens - 1
+                        and wtype == TokenStream.PUNCT
+                        and joined.wtypes[last] == TokenStream.WORD
+                        and tokens.wtypes[i + 1] == TokenStream.WORD
+                        and tokens.off_starts[i] == joined.off_ends[last]
+                        and tokens.off_ends[i] == tokens.off_starts[i + 1]
+                        and tokens.wf(i) not in non_word_internal_punct
+                        and all(c not in non_word_internal_punct for c in tokens.wf(i)))):
+                if last in joined.wf_overrides or i in tokens.wf_overrides:
+                    joined.wf_overrides[last] = joined.wf(last) + tokens.wf(i)
+                joined.off_ends[last] = tokens.off_ends[i]
+                joined.wtypes[last] = TokenStream.WORD
+            else:
+                joined.append(wtype, tokens.off_starts[i], tokens.off_ends[i],
+                              wf=tokens.wf_overrides.get(i), extra=tokens.extra.get(i))
+        return joined
+
+    def tokenize_stream(self, text: str) -> TokenStream:
+        """
+        Tokenize the text into a compact TokenStream instead of
+        a list of dictionaries. The tokens are the same as those
+        returned by tokenize().
+        """
+        if self.rxToken is None:
+            return TokenStream.from_tokens(self.tokenize_by_char(text), text)
+        tokens = TokenStream(text)
+        split_words = len(self.tokenSplitRegexes) > 0
+        for m in self.rxToken.finditer(text):
+            kind = m.lastgroup
+            if kind == 'word':
+                if split_words:
+                    self.split_stream_token(tokens, m.start(), m.end(), m.group())
+                else:
+                    tokens.append(TokenStream.WORD, m.start(), m.end())
+            elif kind == 'punct':
+                tokens.append(TokenStream.PUNCT, m.start(), m.end())
+            elif kind == 'nl':
+                tokens.append(TokenStream.PUNCT, m.start(), m.end(), wf='\\n')
+            else:
+                special = self.specialTokenGroups[kind]
+                wtype = special.get('wtype', 'word')
+                wf = special.get('wf', m.group())
+                extra = {k: v for k, v in special.items() if k not in ('wtype', 'wf')}
+                if wtype == 'word' and split_words:
+                    self.split_stream_token(tokens, m.start(), m.end(), wf, extra=extra)
+                else:
+                    tokens.append(tokens.wtype_code(wtype), m.start(), m.end(), wf=wf, extra=extra)
+        return self.join_hyphens_stream(tokens)
+
+    def tokenize_by_char(self, text: str) -> list:
+        """
+        Original tokenizer engine that walks the text one
+        character at a time.
+        """
         tokens = []
         cur_token = {}
         i = -1
@@ -0,0 +1,200 @@
+import asyncio
+import gzip
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_streaming_bulk
+from ES_Wrapper.es_wrapper import EsWrapper
+from Indexer.pipeline import wrap_batch
+
+es_wrapper = None  # one wrapper per worker process, created by init_worker
+
+
+def init_worker():
+    global es_wrapper
+    es_wrapper = EsWrapper()
+
+
+def wrap_batch_in_worker(j_lines: list) -> tuple:
+    stage_times = {}
+    docs = wrap_batch(es_wrapper, j_lines, stage_times)
+    return docs, stage_times
+
+
+class AsyncIngestion:
+    """
+    Index a gzip file with a single event loop instead of a thread
+    per request: batches of lines are read and decompressed in a reader
+    thread, one batch ahead, and parsed in a process pool, IDs are
+    assigned in the order of the file, and max_in_flight sender tasks
+    send the actions with async_streaming_bulk, so that at most
+    max_in_flight bulk requests are waiting for Elasticsearch (fewer
+    if the bulk controller of the indexer says so).
+    """
+    __slots__ = ('indexer', 'num_workers', 'max_in_flight', 'queue_size', 'lines_per_task')
+
+    def __init__(self, indexer, settings: dict):
+        self.indexer = indexer
+        self.num_workers = settings.get('num_workers', 0)
+        if self.num_workers <= 0:
+            self.num_workers = max(1, (os.cpu_count() or 2) - 1)
+        self.max_in_flight = settings.get('max_in_flight', 8)
+        self.queue_size = settings.get('queue_size', 64)  # maximal number of batches being parsed or sent
+        self.lines_per_task = settings.get('lines_per_task', 100)
+
+    def read_batches(self, file_name: str, skip_lines: int = 0):
+        """
+        Yield batches of lines_per_task json lines. The gzip file is
+        read outside the event loop, by next_batch.
+        """
+        j_lines = []
+        with gzip.open(file_name, "rt", encoding='UTF-8') as j_file:
+            for line_num, j_line in enumerate(self.indexer.metrics.timed(j_file, 'reader')):
+                if line_num < skip_lines:
+                    continue
+                j_lines.append(j_line)
+                if len(j_lines) >= self.lines_per_task:
+                    yield j_lines
+                    j_lines = []
+        if len(j_lines) > 0:
+            yield j_lines
+
+    @staticmethod
+    def next_batch(loop: asyncio.AbstractEventLoop, batches) -> asyncio.Future:
+        """
+        Start reading the next batch of lines (None at the end of
+        the file) in the default thread pool of the event loop.
+        """
+        return loop.run_in_executor(None, next, batches, None)
+
+    async def send_chunk(self, client: AsyncElasticsearch, chunk: list, slot_free: asyncio.Condition) -> int:
+        """
+        Send one chunk of actions when the bulk controller allows
+        another request, then its rejected actions again after
+        a backoff, the same way as BulkBatcher.send_chunk.
+        Return the number of actions that failed.
+        """
+        batcher = self.indexer.batcher
+        controller = batcher.controller
+        for attempt in range(controller.max_retries + 1):
+            async with slot_free:
+                await slot_free.wait_for(controller.try_acquire)
+            t1 = time.perf_counter()
+            try:
+                results = [result async for result in async_streaming_bulk(
+                    client, chunk, chunk_size=len(chunk), max_chunk_bytes=batcher.max_bytes, raise_on_error=False,
+                    raise_on_exception=False, request_timeout=batcher.request_timeout)]
+            except Exception as err:
+                logging.error(f'Bulk error: {err}')
+                self.indexer.metrics.observe_bulk(len(chunk), time.perf_counter() - t1, n_failed=len(chunk))
+                return len(chunk)
+            finally:
+                controller.release()
+                async with slot_free:
+                    slot_free.notify_all()
+            latency = time.perf_counter() - t1
+            rejected, failed = controller.split_failures(chunk, results)
+            controller.observe(len(chunk), latency, len(rejected))
+            self.indexer.metrics.observe_bulk(len(chunk), latency, len(rejected), len(failed))
+            if len(failed) > 0:
+                logging.error(f'Bulk error: {len(failed)} actions failed, e.g. {failed[0]}')
+            if len(rejected) <= 0 or attempt >= controller.max_retries:
+                if len(rejected) > 0:
+                    logging.error(f'Bulk error: {len(rejected)} actions still rejected after {attempt} retries')
+                return len(failed) + len(rejected)
+            chunk = rejected
+            await asyncio.sleep(controller.backoff(attempt))
+
+    async def send_batches(self, client: AsyncElasticsearch, send_queue: asyncio.Queue,
+                           slot_free: asyncio.Condition):
+        """
+        Sender task: send lists of actions, in chunks of the current
+        chunk size, until a stop signal is received.
+        """
+        batcher = self.indexer.batcher
+        while True:
+            actions = await send_queue.get()
+            if actions is None:
+                send_queue.task_done()
+                break
+            t1 = time.perf_counter()
+            n_errors = 0
+            pos = 0
+            while pos < len(actions):
+                chunk = actions[pos:pos + batcher.controller.chunk_size]
+                pos += len(chunk)
+                n_errors += await self.send_chunk(client, chunk, slot_free)
+            batcher.record(len(actions), n_errors, time.perf_counter() - t1)
+            send_queue.task_done()
+            self.indexer.metrics.set_queue('send', send_queue.qsize())
+
+    async def sequence(self, pool: ProcessPoolExecutor, file_name: str, progress=None, skip_lines: int = 0):
+        """
+        Submit batches of lines to the process pool, keeping at most
+        queue_size of them in flight, take the results in the order of
+        the file, assign IDs and pass the actions to the sender tasks.
+        Every checkpoint_every lines, wait until everything is sent
+        and write a checkpoint.
+        """
+        indexer = self.indexer
+        metrics = indexer.metrics
+        checkpoint_every = indexer.settings.get('checkpoint_every', 10000)
+        loop = asyncio.get_running_loop()
+        # timeouts of bulk requests are retried by the bulk controller
+        client = AsyncElasticsearch(maxsize=self.max_in_flight, timeout=100, max_retries=3, retry_on_timeout=False,
+                                    **indexer.backend.connection_args(indexer.settings))
+        send_queue = asyncio.Queue(self.queue_size)
+        slot_free = asyncio.Condition()
+        senders = [asyncio.create_task(self.send_batches(client, send_queue, slot_free))
+                   for _ in range(self.max_in_flight)]
+        parsing = deque()  # (future, number of lines) in the order of the file
+        batches = self.read_batches(file_name, skip_lines)
+        reading = self.next_batch(loop, batches)
+        n_lines = skip_lines
+        last_checkpoint = skip_lines
+        try:
+            while True:
+                while len(parsing) < self.queue_size:
+                    j_lines = await reading  # stays None once the file is read
+                    if j_lines is None:
+                        break
+                    reading = self.next_batch(loop, batches)
+                    parsing.append((loop.run_in_executor(pool, wrap_batch_in_worker, j_lines), len(j_lines)))
+                if len(parsing) <= 0:
+                    break
+                metrics.set_queue('parsing', len(parsing))
+                future, batch_lines = parsing.popleft()
+                docs, stage_times = await future
+                metrics.add_stage_times(stage_times)
+                t1 = time.perf_counter()
+                actions = indexer.pipeline.make_actions(docs)
+                metrics.add_time('sequencer', time.perf_counter() - t1, len(docs))
+                await send_queue.put(actions)
+                metrics.set_queue('send', send_queue.qsize())
+                n_lines += batch_lines
+                if n_lines - last_checkpoint >= checkpoint_every:
+                    await send_queue.join()
+                    indexer.save_checkpoint(file_name, n_lines)
+                    last_checkpoint = n_lines
+                if progress is not None:
+                    progress.set_postfix(doc=indexer.ids.next_doc, sentences=indexer.ids.next_sent,
+                                         words=indexer.ids.total_num_words)
+                    progress.update(len(docs))
+            for _ in senders:
+                await send_queue.put(None)
+            await asyncio.gather(*senders)
+        finally:
+            # the reader thread must not be running the generator when it is closed
+            await asyncio.wait([reading])
+            batches.close()
+            await client.close()
+
+    def index_file(self, file_name: str, progress=None, skip_lines: int = 0):
+        """
+        Index one file and wait until everything is sent.
+        """
+        with ProcessPoolExecutor(self.num_workers, initializer=init_worker) as pool:
+            asyncio.run(self.sequence(pool, file_name, progress=progress, skip_lines=skip_lines))
@@ -0,0 +1,92 @@
+import logging
+from elasticsearch import Elasticsearch
+
+
+class Es7Backend:
+    """
+    What the indexer needs to know about an Elasticsearch version:
+    how to connect, how mappings and bulk actions look and what
+    is stored in the documents index. Elasticsearch 7 has no
+    mapping types, and sentence IDs are shuffled (IdPermutation).
+    """
+    version = 7
+    docSentIds = False  # whether documents store the range of their sentence IDs
+    permuteSentenceIds = True  # default of "permute_sentence_ids"
+
+    __slots__ = ()
+
+    @staticmethod
+    def connection_args(settings: dict) -> dict:
+        """
+        Return the hosts and credentials of a client for "elastic_url"
+        (host:port), with "elastic_creds" (user:password) if given,
+        or an empty dictionary for localhost:9200. Used for both
+        the synchronous and the async client.
+        """
+        if len(settings.get('elastic_url', '')) <= 0:
+            return {}
+        es_host, es_port = settings['elastic_url'].split(":")
+        http_auth = None
+        if len(settings.get('elastic_creds', '')) > 0:
+            http_auth = tuple(settings['elastic_creds'].split(':', 1))
+        return {'hosts': [{'host': es_host, 'port': int(es_port)}], 'http_auth': http_auth}
+
+    def connect(self, settings: dict) -> Elasticsearch:
+        """
+        Connect to "elastic_url" (host:port), with "elastic_creds"
+        (user:password) if given, or to localhost:9200.
+        """
+        connection_args = self.connection_args(settings)
+        if len(connection_args) <= 0:
+            logging.info("default connection to Elastic Search")
+            return Elasticsearch()
+        # timeouts of bulk requests are retried with backoff by the bulk controller, not by the client
+        return Elasticsearch(maxsize=0, timeout=100, max_retries=3, retry_on_timeout=False, **connection_args)
+
+    def mapping(self, mapping: dict, doc_type: str) -> dict:
+        """
+        Adapt a typeless mapping made by PrepareData to this version.
+        """
+        return mapping
+
+    def action(self, index: str, doc_type: str, doc_id: int, source: dict) -> dict:
+        return {'_index': index, '_id': doc_id, '_source': source}
+
+
+class Es6Backend(Es7Backend):
+    """
+    Elasticsearch 6: the mappings and the bulk actions are typed
+    ("doc" and "sent"), each document also stores the range of its
+    sentence IDs, and sentence IDs are sequential, as the Elasticsearch 6
+    indexer has always written them.
+    """
+    version = 6
+    docSentIds = True
+    permuteSentenceIds = False
+
+    __slots__ = ()
+
+    def mapping(self, mapping: dict, doc_type: str) -> dict:
+        properties = dict(mapping['mappings']['properties'])
+        if doc_type == 'doc':
+            properties['sents_ids'] = {'type': 'integer'}
+        typed_mapping = dict(mapping)
+        typed_mapping['mappings'] = {doc_type: {'properties': properties}}
+        if '_meta' in mapping['mappings']:
+            typed_mapping['mappings'][doc_type]['_meta'] = mapping['mappings']['_meta']
+        return typed_mapping
+
+    def action(self, index: str, doc_type: str, doc_id: int, source: dict) -> dict:
+        return {'_index': index, '_type': doc_type, '_id': doc_id, '_source': source}
+
+
+BACKENDS = {6: Es6Backend, 7: Es7Backend}
+
+
+def get_backend(version: int) -> Es7Backend:
+    """
+    Return the backend for an Elasticsearch major version.
+    """
+    if int(version) not in BACKENDS:
+        raise ValueError(f'Elasticsearch {version} is not supported, use one of {sorted(BACKENDS)}')
+    return BACKENDS[int(version)]()
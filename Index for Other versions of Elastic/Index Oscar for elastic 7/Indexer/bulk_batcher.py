@@ -0,0 +1,140 @@
+import json
+import logging
+import threading
+import time
+from elasticsearch.helpers import streaming_bulk
+from Indexer.bulk_controller import BulkController
+from Indexer.metrics import Metrics
+
+
+class BulkBatcher:
+    """
+    Collects bulk actions (sentences and document metadata) of many
+    documents and sends them together, as soon as a chunk of actions
+    (initially max_actions) or about max_bytes bytes of sources have
+    accumulated. Small documents therefore do not cost an HTTP round
+    trip each. Can be shared by several threads. The time spent on
+    each request is logged.
+    Requests are split into chunks and throttled by a BulkController;
+    without one, chunk size and concurrency are fixed and nothing
+    is retried.
+    """
+    __slots__ = ('es', 'max_actions', 'max_bytes', 'request_timeout', 'controller', 'metrics', 'actions', 'n_bytes',
+                 'lock', 'n_flushes', 'n_actions', 'n_errors', 'total_time', 'max_time')
+
+    def __init__(self, es, max_actions: int = 500, max_bytes: int = 5242880, request_timeout: int = 60,
+                 controller: BulkController = None, metrics: Metrics = None):
+        self.es = es
+        self.max_actions = max_actions
+        self.max_bytes = max_bytes
+        self.request_timeout = request_timeout
+        if controller is None:
+            controller = BulkController({'adaptive_bulk': False, 'bulk_chunk_size': max_actions,
+                                         'bulk_max_concurrency': 1 << 30, 'bulk_max_retries': 0})
+        self.controller = controller
+        self.metrics = metrics  # every request is recorded there, if given
+        self.actions = []
+        self.n_bytes = 0  # approximate size of the actions collected so far
+        self.lock = threading.Lock()
+        self.n_flushes = 0
+        self.n_actions = 0
+        self.n_errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def add(self, action: dict):
+        self.add_many([action])
+
+    def add_many(self, actions):
+        """
+        Add several actions at once and send the batch if it is full.
+        """
+        n_bytes = 0
+        actions = list(actions)
+        for action in actions:
+            # 2 bytes per character is an upper bound for Cyrillic texts
+            n_bytes += 2 * len(json.dumps(action['_source'], ensure_ascii=False)) + 100
+        with self.lock:
+            self.actions += actions
+            self.n_bytes += n_bytes
+            if len(self.actions) < self.controller.chunk_size and self.n_bytes < self.max_bytes:
+                return
+            actions, self.actions, self.n_bytes = self.actions, [], 0
+        self.send(actions)
+
+    def flush(self):
+        """
+        Send everything collected so far.
+        """
+        with self.lock:
+            actions, self.actions, self.n_bytes = self.actions, [], 0
+        if len(actions) > 0:
+            self.send(actions)
+
+    def send(self, actions: list):
+        """
+        Send a list of actions right away, in chunks of the current
+        chunk size, and record how long it took.
+        """
+        t1 = time.perf_counter()
+        n_errors = 0
+        pos = 0
+        while pos < len(actions):
+            chunk = actions[pos:pos + self.controller.chunk_size]
+            pos += len(chunk)
+            n_errors += self.send_chunk(chunk)
+        self.record(len(actions), n_errors, time.perf_counter() - t1)
+
+    def send_chunk(self, chunk: list) -> int:
+        """
+        Send one chunk of actions, then its rejected actions again
+        after a backoff, until all are accepted or there are no retries
+        left. Return the number of actions that failed.
+        """
+        for attempt in range(self.controller.max_retries + 1):
+            with self.controller:
+                t1 = time.perf_counter()
+                try:
+                    results = list(streaming_bulk(self.es, chunk, chunk_size=len(chunk),
+                                                  max_chunk_bytes=self.max_bytes, raise_on_error=False,
+                                                  raise_on_exception=False, request_timeout=self.request_timeout))
+                except Exception as err:
+                    logging.error(f'Bulk error: {err}')
+                    if self.metrics is not None:
+                        self.metrics.observe_bulk(len(chunk), time.perf_counter() - t1, n_failed=len(chunk))
+                    return len(chunk)
+                latency = time.perf_counter() - t1
+            rejected, failed = self.controller.split_failures(chunk, results)
+            self.controller.observe(len(chunk), latency, len(rejected))
+            if self.metrics is not None:
+                self.metrics.observe_bulk(len(chunk), latency, len(rejected), len(failed))
+            if len(failed) > 0:
+                logging.error(f'Bulk error: {len(failed)} actions failed, e.g. {failed[0]}')
+            if len(rejected) <= 0 or attempt >= self.controller.max_retries:
+                if len(rejected) > 0:
+                    logging.error(f'Bulk error: {len(rejected)} actions still rejected after {attempt} retries')
+                return len(failed) + len(rejected)
+            chunk = rejected
+            time.sleep(self.controller.backoff(attempt))
+
+    def record(self, n_actions: int, n_errors: int, time_spent: float):
+        """
+        Add a request to the statistics, also for requests
+        sent by other means than send().
+        """
+        logging.info(f'Bulk of {n_actions} actions sent in {time_spent:.3f} s')
+        with self.lock:
+            self.n_flushes += 1
+            self.n_actions += n_actions
+            self.n_errors += n_errors
+            self.total_time += time_spent
+            self.max_time = max(self.max_time, time_spent)
+
+    def report(self) -> str:
+        """
+        Return a summary of all requests sent so far.
+        """
+        mean_time = self.total_time / self.n_flushes if self.n_flushes > 0 else 0.0
+        return (f'{self.n_flushes} bulk requests, {self.n_actions} actions, {self.n_errors} errors, '
+                f'{mean_time:.3f} s per request on average, {self.max_time:.3f} s at most; '
+                f'{self.controller.report()}')
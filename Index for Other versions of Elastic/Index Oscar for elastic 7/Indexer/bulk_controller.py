@@ -0,0 +1,138 @@
+import random
+import threading
+import time
+from elasticsearch.exceptions import ConnectionTimeout
+
+
+class BulkController:
+    """
+    Tunes the number of actions per bulk request and the number of
+    concurrent bulk requests the way TCP tunes its window: both grow
+    by a step while requests take less than half of target_latency and
+    are halved as soon as Elasticsearch rejects items (429,
+    es_rejected_execution_exception), a request times out, or takes
+    longer than target_latency. Rejected items, and only them, are
+    sent again after a jittered exponential backoff.
+    With "adaptive_bulk" switched off, chunk size and concurrency stay
+    fixed, but rejected items are still retried. Thread-safe.
+    """
+    __slots__ = ('adaptive', 'chunk_size', 'min_chunk_size', 'max_chunk_size', 'concurrency', 'max_concurrency',
+                 'target_latency', 'max_retries', 'initial_backoff', 'max_backoff', 'in_flight', 'condition',
+                 'last_decrease', 'rand', 'n_rejected', 'n_retries', 'n_decreases')
+
+    def __init__(self, settings: dict, seed=None):
+        self.adaptive = settings.get('adaptive_bulk', True)
+        self.chunk_size = settings.get('bulk_chunk_size', 500)
+        self.min_chunk_size = min(self.chunk_size, settings.get('bulk_min_chunk_size', 50))
+        self.max_chunk_size = max(self.chunk_size, settings.get('bulk_max_chunk_size', 2000))
+        self.max_concurrency = settings.get('bulk_max_concurrency', 16)
+        self.concurrency = max(1, self.max_concurrency // 2) if self.adaptive else self.max_concurrency
+        self.target_latency = settings.get('bulk_target_latency', 1.0)  # seconds per request
+        self.max_retries = settings.get('bulk_max_retries', 8)
+        self.initial_backoff = settings.get('bulk_initial_backoff', 0.5)  # seconds
+        self.max_backoff = settings.get('bulk_max_backoff', 60.0)
+        self.in_flight = 0
+        self.condition = threading.Condition()
+        self.last_decrease = 0.0
+        self.rand = random.Random(seed)
+        self.n_rejected = 0
+        self.n_retries = 0
+        self.n_decreases = 0
+
+    def try_acquire(self) -> bool:
+        """
+        Take a request slot if fewer than concurrency
+        requests are in flight.
+        """
+        with self.condition:
+            if self.in_flight >= self.concurrency:
+                return False
+            self.in_flight += 1
+            return True
+
+    def acquire(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.in_flight < self.concurrency)
+            self.in_flight += 1
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    @staticmethod
+    def is_rejected(item: dict) -> bool:
+        """
+        Check if a failed item returned by streaming_bulk is worth
+        sending again: it was rejected because the cluster was overloaded.
+        """
+        op_type, info = next(iter(item.items()))
+        if info.get('status') == 429 or isinstance(info.get('exception'), ConnectionTimeout):
+            return True
+        error = info.get('error')
+        return isinstance(error, dict) and error.get('type') == 'es_rejected_execution_exception'
+
+    def split_failures(self, chunk: list, results: list) -> tuple:
+        """
+        Given the actions of a request and the (ok, item) pairs returned
+        for them by streaming_bulk, return the actions to send again and
+        the items that failed for good.
+        """
+        rejected = []
+        failed = []
+        for action, (ok, item) in zip(chunk, results):
+            if ok:
+                continue
+            if self.is_rejected(item):
+                rejected.append(action)
+            else:
+                failed.append(item)
+        return rejected, failed
+
+    def observe(self, n_actions: int, latency: float, n_rejected: int):
+        """
+        Adjust chunk size and concurrency after a request with
+        n_actions actions that took latency seconds and
+        had n_rejected items rejected.
+        """
+        with self.condition:
+            self.n_rejected += n_rejected
+            if not self.adaptive:
+                return
+            if n_rejected > 0 or latency > self.target_latency:
+                now = time.monotonic()
+                if now - latency < self.last_decrease:
+                    # the request was sent before the last decrease, which has already dealt with the overload
+                    return
+                # multiplicative decrease
+                self.last_decrease = now
+                self.chunk_size = max(self.min_chunk_size, self.chunk_size // 2)
+                self.concurrency = max(1, self.concurrency // 2)
+                self.n_decreases += 1
+            elif latency < self.target_latency / 2 and n_actions >= self.chunk_size:
+                # additive increase, only after full chunks: small ones say nothing about the limit
+                self.chunk_size = min(self.max_chunk_size, self.chunk_size + self.min_chunk_size)
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+                self.condition.notify_all()
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Return the number of seconds to wait before retry number
+        attempt (0-based): uniformly distributed ("full jitter") up to
+        an exponentially growing limit, so that the senders do not
+        come back all at once.
+        """
+        with self.condition:
+            self.n_retries += 1
+            return self.rand.uniform(0, min(self.max_backoff, self.initial_backoff * 2 ** attempt))
+
+    def report(self) -> str:
+        return (f'chunk size {self.chunk_size}, concurrency {self.concurrency}, {self.n_rejected} items rejected, '
+                f'{self.n_retries} retries, {self.n_decreases} slowdowns')
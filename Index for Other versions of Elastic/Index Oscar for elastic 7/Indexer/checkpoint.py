@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+
+
+class Checkpoint:
+    """
+    Append-only journal of the indexing progress. The first line
+    stores the seed of the sentence ID shuffling, every next line
+    is written when all documents up to a certain line of a source
+    file have been sent to Elasticsearch, together with the document
+    and sentence ID counters at that moment. Indexing can then be
+    resumed from the last record with exactly the same IDs.
+    """
+    __slots__ = ('path', 'seed', 'files_done', 'file_name', 'n_lines', 'next_doc', 'next_sent', 'total_num_words')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.seed = None
+        self.files_done = set()
+        self.file_name = None  # file that was being indexed, None if the last one was completed
+        self.n_lines = 0  # number of lines of that file already indexed
+        self.next_doc = 0
+        self.next_sent = 0
+        self.total_num_words = 0
+
+    def start(self, seed=None):
+        """
+        Start a new journal, removing the old one.
+        """
+        self.__init__(self.path)
+        self.seed = seed
+        with open(self.path, 'w', encoding='utf-8') as f_out:
+            f_out.write(json.dumps({'seed': seed}) + '\n')
+
+    def load(self) -> bool:
+        """
+        Read the journal. Return False if there is nothing to resume.
+        """
+        self.__init__(self.path)
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'r', encoding='utf-8') as f_in:
+            lines = f_in.readlines()
+        if len(lines) <= 0:
+            return False
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(f'Incomplete checkpoint record ignored: {line}')  # the process died while writing
+                continue
+            if 'seed' in record:
+                self.seed = record['seed']
+                continue
+            self.next_doc, self.next_sent, self.total_num_words = record['doc'], record['sent'], record['words']
+            if record['done']:
+                self.files_done.add(record['file'])
+                self.file_name, self.n_lines = None, 0
+            else:
+                self.file_name, self.n_lines = record['file'], record['lines']
+        logging.info(f'Resuming after {len(self.files_done)} files and {self.n_lines} lines of {self.file_name}: '
+                     f'{self.next_doc} documents, {self.next_sent} sentences')
+        return True
+
+    def lines_done(self, file_name: str) -> int:
+        """
+        Return the number of lines of the file that can be skipped.
+        """
+        return self.n_lines if file_name == self.file_name else 0
+
+    def save(self, file_name: str, n_lines: int, next_doc: int, next_sent: int, total_num_words: int,
+             done: bool = False):
+        """
+        Record that the first n_lines lines of the file (or the whole
+        file, if done is True) have been indexed. Must only be called
+        when nothing before this point is waiting to be sent.
+        """
+        record = {'file': file_name, 'lines': n_lines, 'done': done,
+                  'doc': next_doc, 'sent': next_sent, 'words': total_num_words}
+        with open(self.path, 'a', encoding='utf-8') as f_out:
+            f_out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f_out.flush()
+            os.fsync(f_out.fileno())
+        if done:
+            self.files_done.add(file_name)
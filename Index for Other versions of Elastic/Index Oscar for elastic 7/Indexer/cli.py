@@ -0,0 +1,59 @@
+import argparse
+import logging
+import os
+from Indexer.backends import BACKENDS
+from Indexer.indexer import Indexer
+from Indexer.sentence_cache import prepare_dir
+from ES_Wrapper.paths import project_path
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Index corpus in Elasticsearch 6.x or 7.x.')
+    parser.add_argument('--es_version', type=int, choices=sorted(BACKENDS), default=None,
+                        help='major version of Elasticsearch (default: "es_version" in the settings, or 7)')
+    parser.add_argument('--settings', type=str, default=None,
+                        help='settings file (default: Indexer/settings.json)')
+    parser.add_argument('--data_dir', type=str, default=None, help='directory with the source gzip files '
+                                                                   '(default: Data)')
+    parser.add_argument('--elastic_url', type=str, default=None, help='host:port of Elasticsearch')
+    parser.add_argument('--elastic_creds', type=str, default=None, help='user:password for Elasticsearch')
+    parser.add_argument('-y', '--overwrite', nargs='?', const=True, default=None,
+                        help='overwrite existing database without asking first')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue an interrupted run from the last checkpoint')
+    parser.add_argument('--prepare', action='store_true',
+                        help='clean, tokenize and split the corpus into the sentence cache before indexing')
+    parser.add_argument('--force_merge_segments', type=int, default=None,
+                        help='merge the sentences index to this number of segments after indexing, 0 = do not merge')
+    parser.add_argument('--delete', action='store_true', help='only delete the indices of the corpus')
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None):
+    """
+    Command line entry point. Paths given on the command line are
+    relative to the working directory, the defaults to the project.
+    """
+    args = parse_args(argv)
+    settings = {}
+    for key in ('es_version', 'elastic_url', 'elastic_creds', 'force_merge_segments'):
+        if getattr(args, key) is not None:
+            settings[key] = getattr(args, key)
+    x = Indexer(overwrite_index=args.overwrite is not None,
+                data_dir=os.path.abspath(args.data_dir) if args.data_dir is not None else '../Data',
+                settings_path=os.path.abspath(args.settings) if args.settings is not None
+                else '../Indexer/settings.json',
+                settings=settings)
+    if not x.ping_es():
+        logging.critical("Problem with es connection")
+        print("No connection with Elastic Search, check if it's launched on your system!")
+        return
+    if args.delete:
+        if x.delete_indices():
+            print(f'Indices of the corpus "{x.name}" deleted.')
+        return
+    if args.prepare:
+        prepare_dir(project_path(x.settings.get('sentence_cache_dir', '../Cache')), x.data_dir,
+                    x.settings.get('num_workers', 0))
+    logging.info(f"Start indexing corpus in Elasticsearch {x.backend.version}")
+    x.load_corpus(resume=args.resume)
@@ -0,0 +1,72 @@
+import threading
+
+
+class IdAllocator:
+    """
+    Hands out document IDs and contiguous ranges of sentence IDs.
+    Source lines are numbered in the order of the source files, and each
+    line reserves its IDs only after all lines before it have done so.
+    Workers can therefore process lines in any order and in parallel,
+    while the resulting IDs are exactly those of a sequential run.
+    A line that could not be processed gets no document ID, in every
+    indexing mode.
+    """
+    __slots__ = ('next_doc', 'next_sent', 'next_line', 'total_num_words', 'lock', 'waiting')
+
+    def __init__(self, next_doc: int = 0, next_sent: int = 0):
+        self.next_doc = next_doc  # ID of the next document to be reserved
+        self.next_sent = next_sent  # first free sentence ID
+        self.next_line = 0  # number of the next line whose turn it is, counted from the creation
+        self.total_num_words = 0
+        self.lock = threading.Lock()
+        self.waiting = {}  # line number -> event set when it is this line's turn
+
+    def wait_turn(self, line_num: int):
+        """
+        Wait until all lines with smaller numbers have taken their turn.
+        """
+        with self.lock:
+            turn = None
+            if line_num != self.next_line:
+                turn = self.waiting.setdefault(line_num, threading.Event())
+        if turn is not None:
+            turn.wait()
+
+    def reserve(self, line_num: int, n_sents: int, n_words: int = 0) -> tuple:
+        """
+        Wait until all lines with smaller numbers have reserved
+        their IDs (or skipped), then reserve a document ID and n_sents
+        sentence IDs for this line. Return (document ID, first sentence ID).
+        """
+        self.wait_turn(line_num)
+        with self.lock:
+            self.waiting.pop(line_num, None)
+            return self.reserve_next(n_sents, n_words)
+
+    def skip(self, line_num: int):
+        """
+        Let the lines after a line that could not be processed proceed,
+        without reserving any ID for it. Otherwise they wait forever.
+        """
+        self.wait_turn(line_num)
+        with self.lock:
+            self.waiting.pop(line_num, None)
+            self.next_turn()
+
+    def reserve_next(self, n_sents: int, n_words: int = 0) -> tuple:
+        """
+        Reserve IDs for the next line without waiting for its turn.
+        Only for callers that see the lines in order anyway (and
+        for reserve(), which calls it holding the lock).
+        """
+        doc_id, first_sent_id = self.next_doc, self.next_sent
+        self.next_doc += 1
+        self.next_sent += n_sents
+        self.total_num_words += n_words
+        self.next_turn()
+        return doc_id, first_sent_id
+
+    def next_turn(self):
+        self.next_line += 1
+        if self.next_line in self.waiting:
+            self.waiting[self.next_line].set()
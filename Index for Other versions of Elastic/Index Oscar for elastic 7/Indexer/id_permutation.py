@@ -0,0 +1,52 @@
+import random
+
+
+class IdPermutation:
+    """
+    Seeded pseudo-random permutation of the numbers 0..size-1 that
+    keeps 0 in place. Numbers are permuted by a 4-round Feistel network
+    over the smallest sufficient number of bits, walking the cycle
+    until the result falls inside the range. Nothing is stored but
+    the round keys, so every process with the same seed computes
+    the same permutation.
+    """
+    ROUNDS = 4
+
+    __slots__ = ('size', 'half_bits', 'half_mask', 'keys')
+
+    def __init__(self, seed: int = 0, size: int = 1000000):
+        self.size = size
+        n_bits = max(2, (size - 2).bit_length())
+        self.half_bits = (n_bits + 1) // 2
+        self.half_mask = (1 << self.half_bits) - 1
+        rand = random.Random(seed)
+        self.keys = [rand.getrandbits(32) for _ in range(IdPermutation.ROUNDS)]
+
+    def feistel(self, x: int) -> int:
+        left, right = x >> self.half_bits, x & self.half_mask
+        for key in self.keys:
+            # top bits of a multiplicative hash of the right half
+            left, right = right, left ^ ((((right ^ key) * 0x9E3779B1) & 0xFFFFFFFF) >> (32 - self.half_bits))
+        return (left << self.half_bits) | right
+
+    def permute(self, x: int) -> int:
+        """
+        Return the image of x, 0 <= x < size.
+        """
+        if x <= 0:
+            return x
+        # 1..size-1 are permuted as 0..size-2
+        x = self.feistel(x - 1)
+        while x >= self.size - 1:
+            x = self.feistel(x)
+        return x + 1
+
+    def randomize_id(self, real_id: int) -> int:
+        """
+        Return the sentence ID stored in Elasticsearch for a sequential
+        ID: the numbers within each block of size are permuted.
+        """
+        if real_id < 0:
+            return real_id
+        id_start, id_end = real_id // self.size, real_id % self.size
+        return id_start * self.size + self.permute(id_end)
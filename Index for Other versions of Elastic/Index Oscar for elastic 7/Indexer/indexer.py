@@ -1,13 +1,20 @@
 import logging
 
-import elasticsearch
-from elasticsearch import Elasticsearch
 from elasticsearch.client import IndicesClient
-from elasticsearch.helpers import bulk
-from elasticsearch.exceptions import RequestError
 from Indexer.prepare_data import PrepareData
+from Indexer.pipeline import IndexingPipeline, PipelineError
+from Indexer.async_ingestion import AsyncIngestion
+from Indexer.backends import get_backend
+from Indexer.id_allocator import IdAllocator
+from Indexer.id_permutation import IdPermutation
+from Indexer.bulk_batcher import BulkBatcher
+from Indexer.bulk_controller import BulkController
+from Indexer.checkpoint import Checkpoint
+from Indexer.metrics import Metrics
+from Indexer.sentence_cache import SentenceCache
 from ES_Wrapper.es_wrapper import EsWrapper
-from concurrent.futures import ThreadPoolExecutor
+from ES_Wrapper.paths import project_path
+from concurrent.futures import ThreadPoolExecutor, wait
 from tqdm import tqdm
 import urllib3
 import json
@@ -15,7 +22,8 @@ import gzip
 import os
 import re
 import random
-import argparse
+import threading
+import time
 
 
 tq = tqdm(total=0)
@@ -26,52 +34,56 @@ class Indexer:
     Contains methods for loading ES_Wrapped json sentences into ES Database
     """
     rxBadFileName = re.compile('[^\\w_.-]*', flags=re.DOTALL)
-    __slots__ = ('total_num_words', 'corpusSizeInBytes', 'filenames', 'data_dir', 'docMapping', 'sentMapping',
-                 'overwrite', 'settings', 'name', 'pd', 'es_wrapper', 'es', 'es_ic', 'shuffled_ids', 'sID', 'dID',
-                 'numSents')
+    __slots__ = ('corpusSizeInBytes', 'filenames', 'data_dir', 'docMapping', 'sentMapping',
+                 'overwrite', 'settings', 'name', 'pd', 'es_wrapper', 'backend', 'es', 'es_ic', 'permute_ids',
+                 'id_permutation', 'ids', 'pipeline', 'batcher', 'checkpoint', 'cache', 'metrics', 'file_errors',
+                 'failed_file')
     http = urllib3.PoolManager(maxsize=50)
 
-    def __init__(self, overwrite_index: bool = False, data_dir: str = '../Data'):
-        self.total_num_words = 0
+    def __init__(self, overwrite_index: bool = False, data_dir: str = '../Data',
+                 settings_path: str = '../Indexer/settings.json', settings: dict = None):
         self.corpusSizeInBytes = 0
         self.filenames = []
-        self.data_dir = data_dir
+        self.data_dir = project_path(data_dir)
         self.docMapping = None
         self.sentMapping = None
         self.overwrite = overwrite_index  # whether to overwrite an existing index without asking
-        with open('../Indexer/settings.json', 'r', encoding='utf-8') as fSettings:
+        with open(project_path(settings_path), 'r', encoding='utf-8') as fSettings:
             self.settings = json.load(fSettings)
+        if settings is not None:
+            self.settings.update(settings)  # e.g. from the command line
         self.name = self.settings['corpus_name'].lower()  # index must be lower case
         es_logger = logging.getLogger('elasticsearch')
         es_logger.setLevel(logging.WARNING)
         # urllib3_log = logging.getLogger("urllib3")
         # urllib3_log.setLevel(logging.CRITICAL)
-        logging.basicConfig(filename=os.path.join("../Logs", "indexer.log"), filemode="w", level=logging.INFO)
+        logging.basicConfig(filename=project_path(os.path.join("../Logs", "indexer.log")), filemode="w",
+                            level=logging.INFO)
 
         self.pd = PrepareData(self.settings)
         self.es_wrapper = EsWrapper()
+        # mapping types, bulk actions and connection setup of the Elasticsearch version
+        self.backend = get_backend(self.settings.get('es_version', 7))
         # Initialize Elasticsearch connection
-        self.es = None
-        if 'elastic_url' in self.settings and len(self.settings['elastic_url']) > 0:
-            es_url = self.settings['elastic_url'].split(":")
-            es_host = es_url[0]
-            es_port = es_url[1]
-            # Connect to a non-default URL or supply username and password
-            self.es = elasticsearch.Elasticsearch(host=es_host, port=es_port, maxsize=0, timeout=100, max_retries=10, retry_on_timeout=True)
-            # self.es = Elasticsearch([self.settings['elastic_url']], )
-        else:
-            self.es = Elasticsearch()
-            logging.info("default connection to Elastic Search")
+        self.es = self.backend.connect(self.settings)
 
         self.es_ic = IndicesClient(self.es)
 
-        self.shuffled_ids = [i for i in range(1, 1000000)]
-        random.shuffle(self.shuffled_ids)
-        self.shuffled_ids.insert(0, 0)  # id=0 is special and should not change
+        # sentence ID shuffling, the same in every run with the same seed;
+        # off by default for Elasticsearch 6, whose sentence IDs are sequential
+        self.permute_ids = self.settings.get('permute_sentence_ids', self.backend.permuteSentenceIds)
+        self.id_permutation = IdPermutation(self.settings.get('id_seed', 0))
 
-        self.sID = 0  # current sentence ID
-        self.dID = 0  # current document ID
-        self.numSents = 0  # number of sentences in current document
+        self.ids = IdAllocator()  # document and sentence IDs, total number of words
+        self.pipeline = IndexingPipeline(self, self.settings)
+        self.batcher = None  # created when indexing starts
+        self.checkpoint = Checkpoint(project_path(self.settings.get('checkpoint_file', '../Logs/checkpoint.jsonl')))
+        self.cache = None  # pre-split sentences written by the prepare stage
+        self.metrics = Metrics(self.settings)  # per-stage timings, written to metrics_file while indexing
+        self.file_errors = 0  # failed bulk actions before the current file
+        self.failed_file = None  # file with failed bulk actions or stages where indexing stopped
+        if self.settings.get('use_sentence_cache', True):
+            self.cache = SentenceCache(project_path(self.settings.get('sentence_cache_dir', '../Cache')), self.data_dir)
 
     def ping_es(self) -> bool:
         return self.es.ping()
@@ -101,74 +113,119 @@ class Indexer:
     def create_indices(self):
         """
         Create empty elasticsearch indices for corpus data, using
-        mappings provided by PrepareData.
+        mappings provided by PrepareData, adapted to the version
+        of Elasticsearch by the backend.
         """
-        self.sentMapping = self.pd.generate_sentences_mapping(corpus_size_in_bytes=self.corpusSizeInBytes)
-        self.docMapping = self.pd.generate_docs_mapping()
+        bulk_load = self.settings.get('bulk_load_profile', True)
+        sent_mapping = self.pd.generate_sentences_mapping(corpus_size_in_bytes=self.corpusSizeInBytes,
+                                                          bulk_load=bulk_load)
+        doc_mapping = self.pd.generate_docs_mapping(bulk_load=bulk_load)
+        for mapping in (sent_mapping, doc_mapping):
+            mapping['mappings']['_meta'] = self.id_meta()
+        self.sentMapping = self.backend.mapping(sent_mapping, 'sent')
+        self.docMapping = self.backend.mapping(doc_mapping, 'doc')
         self.es_ic.create(index=self.name + '.docs',
                           body=self.docMapping)
         self.es_ic.create(index=self.name + '.sentences',
                           body=self.sentMapping)
 
+    def apply_serving_settings(self):
+        """
+        Replace the bulk ingestion settings of the indices with
+        the settings for searching, make the indexed data visible
+        and optionally merge the segments of the sentences index.
+        """
+        t1 = time.time()
+        serving_settings = self.pd.generate_serving_settings()
+        for index in (self.name + '.docs', self.name + '.sentences'):
+            self.es_ic.put_settings(index=index, body={'index': serving_settings})
+            self.es_ic.refresh(index=index)
+        n_segments = self.settings.get('force_merge_segments', 0)  # 0 = do not merge
+        if n_segments > 0:
+            self.es_ic.forcemerge(index=self.name + '.sentences', max_num_segments=n_segments,
+                                  request_timeout=3600)
+        merged = f'merged to {n_segments} segments' if n_segments > 0 else 'not merged'
+        logging.info(f'Serving settings {serving_settings} applied in {time.time() - t1:.1f} s, sentences {merged}')
+
+    def id_meta(self) -> dict:
+        """
+        Return the metadata (_meta of the mappings) needed to find
+        the sentences of a document: whether sentence IDs are
+        sequential or permuted, with which seed and block size, and
+        what the documents store in sents_ids, if anything.
+        """
+        meta = {'sentence_ids': 'sequential'}
+        if self.permute_ids:
+            meta = {'sentence_ids': 'permuted', 'id_seed': self.settings.get('id_seed', 0),
+                    'id_block_size': self.id_permutation.size}
+        if self.backend.docSentIds:
+            meta['sents_ids'] = 'list' if self.permute_ids else 'range'
+        return meta
+
+    @staticmethod
+    def doc_sentence_ids(sents_ids: list, meta: dict) -> list:
+        """
+        Return the IDs of the sentences of a document, in document
+        order, given its sents_ids field and the _meta of the docs
+        mapping (see id_meta): a [first ID, number of sentences] range
+        of sequential IDs, or the list of the IDs.
+        """
+        if meta.get('sents_ids') == 'range':
+            first_id, n_sents = sents_ids
+            return list(range(first_id, first_id + n_sents))
+        return list(sents_ids)
+
     def randomize_id(self, real_id: int):
         """
         Return a (relatively) randomized sentence ID. This randomization
         is needed in context-aware word queries where the sentences
         are iterated in the order determined by their IDs.
+        Without "permute_sentence_ids", return the sequential ID.
         """
-        if real_id < 0:
+        if not self.permute_ids:
             return real_id
-        id_start, id_end = real_id // 1000000, real_id % 1000000
-        return id_start * 1000000 + self.shuffled_ids[id_end]
+        return self.id_permutation.randomize_id(real_id)
 
-    def iterate_json_line_sentences(self, sentences: list):
-        self.numSents = 0
-        prev_last = False
+    def iterate_json_line_sentences(self, sentences: list, doc_id: int, first_sent_id: int):
+        """
+        Yield bulk actions for the sentences of one document.
+        Sentence IDs are first_sent_id, first_sent_id + 1, etc.,
+        as reserved in self.ids, so no shared counters are changed here.
+        """
         for i in range(len(sentences)):
-            sent = {}
-            b_last = (i == len(sentences) - 1)
-            sent_total_num_words = len(sentences[i].split())
-            self.total_num_words += sent_total_num_words
-            sent['n_words'] = sent_total_num_words
-            if prev_last:
-                prev_last = False
-            elif self.numSents > 0:
-                sent['prev_id'] = self.randomize_id(self.sID - 1)
-            if not b_last and 'last' not in sent:
-                sent['next_id'] = self.randomize_id(self.sID + 1)
-            else:
-                prev_last = True
-            sent['doc_id'] = self.dID
+            sent = {'n_words': len(sentences[i].split())}
+            if i > 0:
+                sent['prev_id'] = self.randomize_id(first_sent_id + i - 1)
+            if i < len(sentences) - 1:
+                sent['next_id'] = self.randomize_id(first_sent_id + i + 1)
+            sent['doc_id'] = doc_id
             sent['sentence'] = sentences[i]
-            # self.es.index(index=self.name + '.sentences',
-            #               id=self.sID,
-            #               body=sent)
-            cur_action = {'_index': self.name + '.sentences',
-                          '_id': self.randomize_id(self.sID),
-                          '_source': sent}
+            cur_action = self.backend.action(self.name + '.sentences', 'sent',
+                                             self.randomize_id(first_sent_id + i), sent)
             yield cur_action
-            # if self.sID % 500 == 0:
-            #     logging.info('Indexing sentence', self.sID, ',', self.total_num_words, 'words so far.')
-            #     tq.set_postfix(doc=self.dID, sentences=self.sID, words=self.total_num_words)
-            #     tq.update()
-            self.numSents += 1
-            self.sID += 1
-
-    def index_line(self, tags: list, link: str):
+
+    def doc_action(self, tags: list, link: str, doc_id: int, first_sent_id: int, n_sents: int) -> dict:
+        """
+        Return the bulk action for the metadata of a document.
+        With sequential sentence IDs, only the first one and their
+        number are stored in sents_ids; with permuted IDs, sents_ids
+        is the list of the IDs of the sentences, in document order.
+        """
+        meta = {'tags': tags, 'link': link, 'n_sents': n_sents}
+        if self.backend.docSentIds:
+            if self.permute_ids:
+                meta['sents_ids'] = [self.randomize_id(first_sent_id + i) for i in range(n_sents)]
+            else:
+                meta['sents_ids'] = [first_sent_id, n_sents]
+        return self.backend.action(self.name + '.docs', 'doc', doc_id, meta)
+
+    def index_line(self, tags: list, link: str, doc_id: int, first_sent_id: int, n_sents: int):
         """
         Store the metadata of the source json_line.
         """
-        if self.dID % 1000 == 0 and self.dID != 0:
-            logging.info(f'Indexing document {self.dID}')
-        meta = {'tags': tags, 'link': link, 'n_sents': self.numSents}
-        self.numSents = 0
-        try:
-            self.es.index(index=self.name + '.docs',
-                          id=self.dID,
-                          body=meta)
-        except RequestError as err:
-            logging.error('Metadata error: {0}'.format(err))
-        self.dID += 1
+        if doc_id % 1000 == 0 and doc_id != 0:
+            logging.info(f'Indexing document {doc_id}')
+        self.batcher.add(self.doc_action(tags, link, doc_id, first_sent_id, n_sents))
 
     def analyze_dir(self):
         """
@@ -186,47 +243,135 @@ class Indexer:
                     self.filenames.append((file_name_full, file_size))
         logging.info(f"Corpus size in Bytes = {self.corpusSizeInBytes}")
 
-    def index_thread_line(self, j_line):
-        tq.set_postfix(doc=self.dID, sentences=self.sID, words=self.total_num_words)
+    def index_thread_line(self, line_num: int, j_line: str):
+        """
+        Index one json line in a worker thread. line_num is the number
+        of the line in the whole run, which determines the order of
+        the IDs; a line that cannot be processed gets no document ID.
+        """
+        stage_times = {}
+        try:
+            es_ready = self.es_wrapper.create_es_format(json.loads(j_line), stage_times)
+        except Exception as err:
+            logging.error(f'Could not process line {line_num}: {err}')
+            self.ids.skip(line_num)  # let the following lines proceed
+            return
+        finally:
+            self.metrics.add_stage_times(stage_times)
+        n_words = sum(len(sentence.split()) for sentence in es_ready.sentences)
+        doc_id, first_sent_id = self.ids.reserve(line_num, len(es_ready.sentences), n_words)
+        tq.set_postfix(doc=doc_id, sentences=first_sent_id, words=self.ids.total_num_words)
         tq.update()
-        es_ready = self.es_wrapper.create_es_format(json.loads(j_line))
-        bulk(self.es, self.iterate_json_line_sentences(es_ready.sentences), chunk_size=200,
-             request_timeout=60)
-        self.index_line(tags=es_ready.tags, link=es_ready.link)
+        self.batcher.add_many(self.iterate_json_line_sentences(es_ready.sentences, doc_id, first_sent_id))
+        self.index_line(tags=es_ready.tags, link=es_ready.link, doc_id=doc_id, first_sent_id=first_sent_id,
+                        n_sents=len(es_ready.sentences))
+
+    def index_file_threads(self, file_name: str, skip_lines: int = 0):
+        """
+        Index one gzip file with a pool of threads. The file is read
+        line by line, and at most lines_in_flight lines are waiting
+        or being indexed at any moment: when the limit is reached,
+        reading stops until earlier lines are done. Every checkpoint_every
+        lines, wait until all previous lines are sent and write a checkpoint.
+        """
+        max_lines = self.settings.get('lines_in_flight', 500)
+        checkpoint_every = self.settings.get('checkpoint_every', 10000)
+        in_flight = threading.BoundedSemaphore(max_lines)
+        first_line = self.ids.next_line
+        futures = []
+
+        def line_done(future):
+            in_flight.release()
+            self.metrics.change_queue('lines_in_flight', -1)
+            if future.exception() is not None:
+                logging.error(f'Bulk error: {future.exception()}')
+
+        with gzip.open(file_name, "rt", encoding='UTF-8') as j_file, \
+                ThreadPoolExecutor(max_workers=max_lines) as executor:
+            for line_num, j_line in enumerate(self.metrics.timed(j_file, 'reader')):
+                if line_num < skip_lines:
+                    continue
+                in_flight.acquire()
+                self.metrics.change_queue('lines_in_flight', 1)
+                futures.append(executor.submit(self.index_thread_line, first_line + line_num - skip_lines, j_line))
+                futures[-1].add_done_callback(line_done)
+                if (line_num + 1) % checkpoint_every == 0:
+                    wait(futures)
+                    futures = []
+                    self.batcher.flush()
+                    self.save_checkpoint(file_name, line_num + 1)
+
+    def save_checkpoint(self, file_name: str, n_lines: int, done: bool = False):
+        """
+        Journal that the first n_lines lines of the file (or the whole
+        file) are indexed, unless some bulk actions of the file have
+        failed: --resume then indexes it again from its last checkpoint
+        without errors, with the same IDs.
+        """
+        if self.batcher.n_errors > self.file_errors:
+            return
+        self.checkpoint.save(file_name, n_lines, self.ids.next_doc, self.ids.next_sent, self.ids.total_num_words,
+                             done=done)
 
     def index_dir(self):
         """
         Index all files from the Data directory, sorted by their size
-        in decreasing order. Use a previously collected list of filenames
-        and file sizes. Such sorting helps prevent memory errors
-        when indexing large corpora, as the default behavior is to load
-        the whole file is into memory, and there is more free memory
-        in the beginning of the process. If MemoryError occurs, the
-        iterative JSON parser is used, which works much slower.
+        in decreasing order. Files are never loaded into memory as a whole:
+        both indexing modes read them line by line and only keep a bounded
+        number of lines (or batches of lines) in memory, so the memory
+        footprint does not depend on the size of the files.
+        Files (and lines) recorded as done in the checkpoint are skipped.
+        Files prepared in advance are read from the sentence cache.
+        In the "async" mode, requests are sent from an event loop
+        rather than from threads.
+        If some bulk actions of a file fail, or a stage of the processes
+        pipeline fails, the file is not marked as done and indexing stops
+        there, since the following files would get other IDs when it is
+        indexed again.
         """
         if len(self.filenames) <= 0:
             logging.error('There are no files in this corpus.')
             return
+        self.batcher = BulkBatcher(self.es, max_actions=self.settings.get('bulk_chunk_size', 500),
+                                   max_bytes=self.settings.get('bulk_max_bytes', 5242880),
+                                   controller=BulkController(self.settings), metrics=self.metrics)
+        indexing_mode = self.settings.get('indexing_mode', 'threads')
+        async_ingestion = AsyncIngestion(self, self.settings) if indexing_mode == 'async' else None
         n = 0
         for file_name, file_size in sorted(self.filenames, key=lambda p: -p[1]):
             logging.info(file_name)
             n += 1
             tq.desc = f"{os.path.basename(file_name)} {n}/{len(self.filenames)}"
             tq.update()
+            if file_name in self.checkpoint.files_done:
+                continue
             if 'sample_size' in self.settings and 0 < self.settings['sample_size'] < 1:
                 # Only take a random sample of the source files (for test purposes)
                 if random.random() > self.settings['sample_size']:
                     continue
-            with gzip.open(file_name, "rt", encoding='UTF-8') as j_file:  # Index json lines 1 by 1
-                # for j_line in j_file:
-                #     es_ready = self.es_wrapper.create_es_format(json.loads(j_line))
-                #     bulk(self.es, self.iterate_json_line_sentences(es_ready.sentences, tq=tq), chunk_size=200,
-                #          request_timeout=60)
-                #     self.index_line(tags=es_ready.tags, link=es_ready.link, tq=tq)
-                #     tq.set_postfix(doc=self.dID, sentences=self.sID, words=self.total_num_words)
-                #     tq.update()
-                with ThreadPoolExecutor(max_workers=2000) as executor:
-                    executor.map(self.index_thread_line, j_file.readlines())
+            skip_lines = self.checkpoint.lines_done(file_name)
+            self.file_errors = self.batcher.n_errors
+            try:
+                if self.cache is not None and self.cache.is_valid(file_name):
+                    self.pipeline.index_shard(file_name, self.cache, progress=tq, skip_lines=skip_lines)
+                elif indexing_mode == 'processes':
+                    self.pipeline.index_file(file_name, progress=tq, skip_lines=skip_lines)
+                elif indexing_mode == 'async':
+                    async_ingestion.index_file(file_name, progress=tq, skip_lines=skip_lines)
+                else:
+                    self.index_file_threads(file_name, skip_lines=skip_lines)
+                    self.batcher.flush()
+            except PipelineError as err:
+                self.failed_file = file_name
+                logging.error(f'{err}: indexing of {file_name} stopped; run with --resume to index the file again')
+                break
+            if self.batcher.n_errors > self.file_errors:
+                self.failed_file = file_name
+                logging.error(f'{self.batcher.n_errors - self.file_errors} bulk actions of {file_name} failed, '
+                              f'indexing stopped; run with --resume to index the file again')
+                break
+            self.save_checkpoint(file_name, 0, done=True)
+        logging.info(self.batcher.report())
         tq.desc = "finished"
         tq.update()
 
@@ -241,34 +386,55 @@ class Indexer:
             t2 = time.time()
             total_time = t2 - t1
             time_format = datetime.timedelta(seconds=total_time)
-            logging.info(f'Corpus indexed in {time_format}: {self.dID} documents, {self.sID} sentences, {self.total_num_words} words')
-            print(f'Corpus indexed in {time_format} | {self.dID} documents, {self.sID} sentences, {self.total_num_words} words')
+            if self.failed_file is not None:
+                print(f'Indexing stopped after {time_format}: {self.failed_file} could not be indexed '
+                      f'(see Logs/indexer.log), run with --resume to index it again')
+                return
+            logging.info(f'Corpus indexed in {time_format}: {self.ids.next_doc} documents, '
+                         f'{self.ids.next_sent} sentences, {self.ids.total_num_words} words')
+            print(f'Corpus indexed in {time_format} | {self.ids.next_doc} documents, '
+                  f'{self.ids.next_sent} sentences, {self.ids.total_num_words} words')
         return __wrapper
 
     @_benchmark
-    def load_corpus(self):
+    def load_corpus(self, resume: bool = False):
         """
         Drop the current database, if any, and load the entire corpus.
+        If resume is True and there is a checkpoint journal, continue
+        an interrupted run instead, keeping what is already indexed.
         """
-        indices_deleted = self.delete_indices()
-        if not indices_deleted:
-            return
-        self.analyze_dir()
-        self.create_indices()
-        self.index_dir()
+        if resume and self.checkpoint.load():
+            if self.checkpoint.seed is not None:
+                self.id_permutation = IdPermutation(self.checkpoint.seed)
+            self.ids = IdAllocator(self.checkpoint.next_doc, self.checkpoint.next_sent)
+            self.ids.total_num_words = self.checkpoint.total_num_words
+            self.analyze_dir()
+        else:
+            if resume:
+                logging.warning('No checkpoint found, indexing the corpus from the beginning.')
+            indices_deleted = self.delete_indices()
+            if not indices_deleted:
+                return
+            self.checkpoint.start(self.settings.get('id_seed', 0))
+            self.analyze_dir()
+            self.create_indices()
+        t1 = time.time()
+        self.failed_file = None
+        first_doc, first_sent = self.ids.next_doc, self.ids.next_sent
+        self.metrics.start(new_file=not resume)
+        try:
+            self.index_dir()
+        finally:
+            self.metrics.stop()
+        total_time = max(time.time() - t1, 1e-6)
+        profile = 'bulk' if self.settings.get('bulk_load_profile', True) else 'serving'
+        logging.info(f'Ingestion rate with {profile} index settings: '
+                     f'{(self.ids.next_doc - first_doc) / total_time:.1f} documents/s, '
+                     f'{(self.ids.next_sent - first_sent) / total_time:.1f} sentences/s')
+        if self.settings.get('bulk_load_profile', True):
+            self.apply_serving_settings()
 
 
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='Index corpus in Elasticsearch 7.x.')
-    parser.add_argument('-y', help='overwrite existing database without asking first')
-    args = parser.parse_args()
-    overwrite = False
-    if args.y is not None:
-        overwrite = True
-    x = Indexer(overwrite)
-    if x.ping_es() is True:
-        logging.info("Start indexing corpus")
-        x.load_corpus()
-    else:
-        logging.critical("Problem with es connection")
-        print("No connection with Elastic Search, check if it's launched on your system!")
+    from Indexer.cli import main
+    main()
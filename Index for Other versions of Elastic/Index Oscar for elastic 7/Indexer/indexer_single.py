@@ -5,6 +5,7 @@ from elasticsearch.client import IndicesClient
 from elasticsearch.helpers import bulk
 from elasticsearch.exceptions import RequestError
 from Indexer.prepare_data import PrepareData
+from Indexer.id_permutation import IdPermutation
 from ES_Wrapper.es_wrapper import EsWrapper
 from tqdm import tqdm
 import urllib3
@@ -25,7 +26,7 @@ class Indexer:
     """
     rxBadFileName = re.compile('[^\\w_.-]*', flags=re.DOTALL)
     __slots__ = ('total_num_words', 'corpusSizeInBytes', 'filenames', 'data_dir', 'docMapping', 'sentMapping',
-                 'overwrite', 'settings', 'name', 'pd', 'es_wrapper', 'es', 'es_ic', 'shuffled_ids', 'sID', 'dID',
+                 'overwrite', 'settings', 'name', 'pd', 'es_wrapper', 'es', 'es_ic', 'id_permutation', 'sID', 'dID',
                  'numSents')
     http = urllib3.PoolManager(maxsize=50)
 
@@ -63,9 +64,7 @@ class Indexer:
 
         self.es_ic = IndicesClient(self.es)
 
-        self.shuffled_ids = [i for i in range(1, 1000000)]
-        random.shuffle(self.shuffled_ids)
-        self.shuffled_ids.insert(0, 0)  # id=0 is special and should not change
+        self.id_permutation = IdPermutation(self.settings.get('id_seed', 0))  # id=0 is special and does not change
 
         self.sID = 0  # current sentence ID
         self.dID = 0  # current document ID
@@ -117,7 +116,7 @@ class Indexer:
         if real_id < 0:
             return real_id
         id_start, id_end = real_id // 1000000, real_id % 1000000
-        return id_start * 1000000 + self.shuffled_ids[id_end]
+        return id_start * 1000000 + self.id_permutation.permute(id_end)
 
     def iterate_json_line_sentences(self, sentences: list):
         self.numSents = 0
@@ -0,0 +1,213 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ES_Wrapper.paths import project_path
+
+
+class Metrics:
+    """
+    Counters of the indexing run, shared by all threads: time spent
+    and items processed by each stage (reader, cleaner, tokenizer,
+    splitter, sequencer, bulk), queue depths, a histogram of bulk
+    request latencies and the numbers of rejected and failed items.
+    While indexing, a snapshot is appended to a JSON lines file every
+    metrics_interval seconds; if metrics_port is set, the current values
+    are also served in the Prometheus text format.
+    Stages that run in worker processes report their times in the
+    results they send back (see add_stage_times).
+    """
+    latencyBuckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    __slots__ = ('file_name', 'interval', 'port', 'lock', 'stages', 'queues', 'bulk_buckets', 'bulk_requests',
+                 'bulk_seconds', 'bulk_actions', 'bulk_rejected', 'bulk_failed', 'start_time', 'stop_event',
+                 'writer', 'server')
+
+    def __init__(self, settings: dict):
+        self.file_name = project_path(settings.get('metrics_file', '../Logs/metrics.jsonl'))
+        self.interval = settings.get('metrics_interval', 10.0)  # seconds between two snapshots in the file
+        self.port = settings.get('metrics_port', 0)  # 0 = no Prometheus endpoint
+        self.lock = threading.Lock()
+        self.stages = {}  # stage -> [seconds, items]
+        self.queues = {}  # queue -> number of waiting batches or lines
+        self.bulk_buckets = [0] * (len(Metrics.latencyBuckets) + 1)  # the last one is +Inf
+        self.bulk_requests = 0
+        self.bulk_seconds = 0.0
+        self.bulk_actions = 0
+        self.bulk_rejected = 0
+        self.bulk_failed = 0
+        self.start_time = time.time()
+        self.stop_event = threading.Event()
+        self.writer = None
+        self.server = None
+
+    def add_time(self, stage: str, seconds: float, n_items: int = 0):
+        with self.lock:
+            times = self.stages.setdefault(stage, [0.0, 0])
+            times[0] += seconds
+            times[1] += n_items
+
+    def add_stage_times(self, stage_times: dict):
+        """
+        Add times collected elsewhere, e.g. in a worker process,
+        as a dictionary stage -> [seconds, items].
+        """
+        with self.lock:
+            for stage, (seconds, n_items) in stage_times.items():
+                times = self.stages.setdefault(stage, [0.0, 0])
+                times[0] += seconds
+                times[1] += n_items
+
+    def set_queue(self, queue_name: str, depth: int):
+        self.queues[queue_name] = depth
+
+    def change_queue(self, queue_name: str, delta: int):
+        with self.lock:
+            self.queues[queue_name] = self.queues.get(queue_name, 0) + delta
+
+    def observe_bulk(self, n_actions: int, latency: float, n_rejected: int = 0, n_failed: int = 0):
+        """
+        Record one bulk request.
+        """
+        bucket = 0
+        while bucket < len(Metrics.latencyBuckets) and latency > Metrics.latencyBuckets[bucket]:
+            bucket += 1
+        with self.lock:
+            self.bulk_buckets[bucket] += 1
+            self.bulk_requests += 1
+            self.bulk_seconds += latency
+            self.bulk_actions += n_actions
+            self.bulk_rejected += n_rejected
+            self.bulk_failed += n_failed
+            times = self.stages.setdefault('bulk', [0.0, 0])
+            times[0] += latency
+            times[1] += n_actions
+
+    def timed(self, items, stage: str, report_every: int = 1000):
+        """
+        Iterate over items, adding the time spent in producing them
+        (e.g. reading and decompressing lines) to the stage.
+        """
+        seconds = 0.0
+        n_items = 0
+        iterator = iter(items)
+        while True:
+            t1 = time.perf_counter()
+            item = next(iterator, None)
+            seconds += time.perf_counter() - t1
+            if item is None:
+                break
+            n_items += 1
+            if n_items >= report_every:
+                self.add_time(stage, seconds, n_items)
+                seconds = 0.0
+                n_items = 0
+            yield item
+        self.add_time(stage, seconds, n_items)
+
+    def snapshot(self) -> dict:
+        """
+        Return the current values. items_per_sec of a stage is the
+        number of items it processes per second of its own work,
+        so the stage with the lowest value limits the run (unless
+        it runs in several workers).
+        """
+        with self.lock:
+            stages = {stage: {'seconds': round(seconds, 3), 'items': n_items,
+                              'items_per_sec': round(n_items / seconds, 1) if seconds > 0 else None}
+                      for stage, (seconds, n_items) in self.stages.items()}
+            buckets = {}
+            n_requests = 0
+            for le, count in zip(list(Metrics.latencyBuckets) + ['+Inf'], self.bulk_buckets):
+                n_requests += count
+                buckets[str(le)] = n_requests  # cumulative, as in Prometheus
+            return {'time': round(time.time(), 3), 'elapsed': round(time.time() - self.start_time, 3),
+                    'stages': stages, 'queues': dict(self.queues),
+                    'bulk': {'requests': self.bulk_requests, 'actions': self.bulk_actions,
+                             'rejected': self.bulk_rejected, 'failed': self.bulk_failed,
+                             'latency_sum': round(self.bulk_seconds, 3), 'latency_buckets': buckets}}
+
+    def write(self):
+        with open(self.file_name, 'a', encoding='utf-8') as f_out:
+            f_out.write(json.dumps(self.snapshot()) + '\n')
+
+    def write_periodically(self):
+        while not self.stop_event.wait(self.interval):
+            self.write()
+
+    def prometheus(self) -> str:
+        """
+        Return the current values in the Prometheus text format.
+        """
+        snapshot = self.snapshot()
+        lines = ['# TYPE indexer_stage_seconds_total counter']
+        for stage, values in snapshot['stages'].items():
+            lines.append(f'indexer_stage_seconds_total{{stage="{stage}"}} {values["seconds"]}')
+        lines.append('# TYPE indexer_stage_items_total counter')
+        for stage, values in snapshot['stages'].items():
+            lines.append(f'indexer_stage_items_total{{stage="{stage}"}} {values["items"]}')
+        lines.append('# TYPE indexer_queue_depth gauge')
+        for queue_name, depth in snapshot['queues'].items():
+            lines.append(f'indexer_queue_depth{{queue="{queue_name}"}} {depth}')
+        bulk = snapshot['bulk']
+        lines.append('# TYPE indexer_bulk_latency_seconds histogram')
+        for le, count in bulk['latency_buckets'].items():
+            lines.append(f'indexer_bulk_latency_seconds_bucket{{le="{le}"}} {count}')
+        lines.append(f'indexer_bulk_latency_seconds_sum {bulk["latency_sum"]}')
+        lines.append(f'indexer_bulk_latency_seconds_count {bulk["requests"]}')
+        for name in ('actions', 'rejected', 'failed'):
+            lines.append(f'# TYPE indexer_bulk_{name}_total counter')
+            lines.append(f'indexer_bulk_{name}_total {bulk[name]}')
+        return '\n'.join(lines) + '\n'
+
+    def make_handler(self):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                data = metrics.prometheus().encode('utf-8')
+                self.send_response(200 if self.path.split('?')[0] == '/metrics' else 404)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def start(self, new_file: bool = True):
+        """
+        Start writing snapshots and, if a port is given, serving them.
+        Unless new_file is False (a resumed run), the file is emptied.
+        """
+        if new_file:
+            open(self.file_name, 'w', encoding='utf-8').close()
+        self.start_time = time.time()
+        self.stop_event.clear()
+        self.writer = threading.Thread(target=self.write_periodically, daemon=True)
+        self.writer.start()
+        if self.port > 0:
+            try:
+                self.server = ThreadingHTTPServer(('', self.port), self.make_handler())
+                self.server.daemon_threads = True
+                threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            except OSError as err:
+                logging.error(f'Could not serve metrics on port {self.port}: {err}')
+                self.server = None
+
+    def stop(self):
+        """
+        Stop the writer and the endpoint and write the final snapshot.
+        """
+        self.stop_event.set()
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        self.write()
@@ -0,0 +1,281 @@
+import gzip
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from ES_Wrapper.es_wrapper import EsWrapper
+
+
+class PipelineError(Exception):
+    """
+    A stage of the processes pipeline failed: the file is not indexed
+    completely and must not be journaled as done.
+    """
+
+
+def put_until_stopped(out_queue, item, stop: threading.Event) -> bool:
+    """
+    Put an item into a bounded queue, giving up if stop is set
+    while the queue is full (nobody is reading it any more).
+    """
+    while not stop.is_set():
+        try:
+            out_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def wrap_batch(es_wrapper: EsWrapper, j_lines: list, stage_times: dict = None) -> list:
+    """
+    Turn a batch of raw json lines into a list of
+    (sentences, tags, link) tuples, one tuple per document.
+    Lines that could not be processed produce no tuple.
+    The time spent by each stage is added to stage_times.
+    """
+    docs = []
+    for j_line in j_lines:
+        try:
+            es_ready = es_wrapper.create_es_format(json.loads(j_line), stage_times)
+        except Exception as err:
+            logging.error(f'Could not process a json line: {err}')
+            continue
+        docs.append((es_ready.sentences, es_ready.tags, es_ready.link))
+    return docs
+
+
+def wrap_lines(task_queue, result_queue):
+    """
+    Worker process: wrap batches of json lines from the task queue.
+    The number of source lines is passed on with each batch, since
+    it can differ from the number of documents, and so are the times
+    spent by each stage. An error that stops the worker is passed
+    on as a PipelineError, and the stop signal is always sent.
+    """
+    try:
+        es_wrapper = EsWrapper()
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            batch_num, j_lines = task
+            stage_times = {}
+            docs = wrap_batch(es_wrapper, j_lines, stage_times)
+            result_queue.put((batch_num, docs, len(j_lines), stage_times))
+    except Exception as err:
+        result_queue.put(PipelineError(f'worker process {os.getpid()} failed: {err!r}'))
+    finally:
+        result_queue.put(None)
+
+
+class IndexingPipeline:
+    """
+    Index a gzip file in several stages connected by bounded queues:
+    a reader thread, worker processes that clean, tokenize and split
+    the documents, the sequencer (main thread) that assigns sentence
+    and document IDs in the order of the source file, and bulk sender
+    threads.
+    """
+    __slots__ = ('indexer', 'num_workers', 'num_senders', 'queue_size', 'lines_per_task', 'result_timeout')
+
+    def __init__(self, indexer, settings: dict):
+        self.indexer = indexer
+        self.num_workers = settings.get('num_workers', 0)
+        if self.num_workers <= 0:
+            self.num_workers = max(1, (os.cpu_count() or 2) - 1)
+        self.num_senders = settings.get('num_senders', 4)
+        self.queue_size = settings.get('queue_size', 64)  # maximal number of batches waiting in each queue
+        self.lines_per_task = settings.get('lines_per_task', 100)
+        self.result_timeout = 1.0  # seconds between checks that the worker processes are alive
+
+    def read_file(self, file_name: str, task_queue, result_queue, stop: threading.Event, skip_lines: int = 0):
+        """
+        Reader stage: put numbered batches of json lines into the task
+        queue, then one stop signal for each worker. A read error is
+        passed to the sequencer through the result queue. Gives up when
+        stop is set.
+        """
+        try:
+            batch_num = 0
+            j_lines = []
+            with gzip.open(file_name, "rt", encoding='UTF-8') as j_file:
+                for line_num, j_line in enumerate(self.indexer.metrics.timed(j_file, 'reader')):
+                    if line_num < skip_lines:
+                        continue
+                    j_lines.append(j_line)
+                    if len(j_lines) >= self.lines_per_task:
+                        if not put_until_stopped(task_queue, (batch_num, j_lines), stop):
+                            return
+                        batch_num += 1
+                        j_lines = []
+            if len(j_lines) > 0:
+                put_until_stopped(task_queue, (batch_num, j_lines), stop)
+        except Exception as err:
+            put_until_stopped(result_queue, PipelineError(f'reading {file_name} failed: {err!r}'), stop)
+        finally:
+            for i in range(self.num_workers):
+                put_until_stopped(task_queue, None, stop)
+
+    def make_actions(self, docs: list) -> list:
+        """
+        Sequencer stage: create bulk actions for the sentences and
+        the metadata of a batch of documents. Must be called for the
+        batches in their original order, so that IDs are deterministic.
+        """
+        actions = []
+        for sentences, tags, link in docs:
+            n_words = sum(len(sentence.split()) for sentence in sentences)
+            doc_id, first_sent_id = self.indexer.ids.reserve_next(len(sentences), n_words)
+            actions += self.indexer.iterate_json_line_sentences(sentences, doc_id, first_sent_id)
+            actions.append(self.indexer.doc_action(tags, link, doc_id, first_sent_id, len(sentences)))
+        return actions
+
+    def send_batches(self, send_queue, failures: queue.Queue, stop: threading.Event):
+        """
+        Sender stage: send bulk actions to Elasticsearch until
+        a stop signal is received. Each batch already contains the
+        actions of lines_per_task documents. Errors are passed to the
+        sequencer through the failures queue; once stop is set, the
+        remaining batches are dropped.
+        """
+        while True:
+            actions = send_queue.get()
+            try:
+                if actions is None:
+                    break
+                if not stop.is_set():
+                    self.indexer.batcher.send(actions)
+            except Exception as err:
+                failures.put(PipelineError(f'sending bulk actions failed: {err!r}'))
+            finally:
+                send_queue.task_done()
+            self.indexer.metrics.set_queue('send', send_queue.qsize())
+
+    def ordered_results(self, result_queue, workers: list):
+        """
+        Yield (docs, number of source lines) pairs of the batches
+        returned by the workers in the order of the file, until
+        all workers have stopped. Raise a PipelineError if the reader
+        or a worker failed, or if a worker process died.
+        """
+        pending = {}
+        next_batch = 0
+        workers_running = self.num_workers
+        while workers_running > 0:
+            try:
+                result = result_queue.get(timeout=self.result_timeout)
+            except queue.Empty:
+                for process in workers:
+                    if process.exitcode is not None and process.exitcode != 0:
+                        raise PipelineError(f'worker process {process.pid} died with exit code {process.exitcode}')
+                continue
+            if result is None:
+                workers_running -= 1
+                continue
+            if isinstance(result, PipelineError):
+                raise result
+            pending[result[0]] = result[1:3]
+            self.indexer.metrics.add_stage_times(result[3])
+            self.indexer.metrics.set_queue('parsed', len(pending))
+            while next_batch in pending:
+                yield pending.pop(next_batch)
+                next_batch += 1
+        if len(pending) > 0:
+            raise PipelineError(f'batch {next_batch} was never returned by the workers')
+
+    def sequence(self, batches, file_name: str, progress=None, skip_lines: int = 0):
+        """
+        Sequencer stage, run in the main thread: assign IDs to batches
+        of documents, given in the order of the file as (docs, number
+        of source lines) pairs, and pass their actions to the sender
+        threads. Every checkpoint_every lines, wait until the senders
+        have sent everything and write a checkpoint. Return when all
+        batches are sent; raise a PipelineError if a sender failed,
+        without writing any further checkpoint.
+        """
+        checkpoint_every = self.indexer.settings.get('checkpoint_every', 10000)
+        send_queue = queue.Queue(self.queue_size)
+        failures = queue.Queue()
+        stop = threading.Event()
+        senders = [threading.Thread(target=self.send_batches, args=(send_queue, failures, stop), daemon=True)
+                   for _ in range(self.num_senders)]
+        for thread in senders:
+            thread.start()
+        n_lines = skip_lines
+        last_checkpoint = skip_lines
+        metrics = self.indexer.metrics
+        try:
+            for docs, batch_lines in batches:
+                t1 = time.perf_counter()
+                actions = self.make_actions(docs)
+                metrics.add_time('sequencer', time.perf_counter() - t1, len(docs))
+                send_queue.put(actions)
+                metrics.set_queue('send', send_queue.qsize())
+                n_lines += batch_lines
+                if not failures.empty():
+                    raise failures.get()
+                if n_lines - last_checkpoint >= checkpoint_every:
+                    send_queue.join()
+                    if not failures.empty():
+                        raise failures.get()
+                    self.indexer.save_checkpoint(file_name, n_lines)
+                    last_checkpoint = n_lines
+                if progress is not None:
+                    progress.set_postfix(doc=self.indexer.ids.next_doc, sentences=self.indexer.ids.next_sent,
+                                         words=self.indexer.ids.total_num_words)
+                    progress.update(len(docs))
+        except BaseException:
+            stop.set()  # the senders drop what is left in the queue
+            raise
+        finally:
+            for _ in senders:
+                send_queue.put(None)
+            for thread in senders:
+                thread.join()
+        if not failures.empty():
+            raise failures.get()
+
+    def index_file(self, file_name: str, progress=None, skip_lines: int = 0):
+        """
+        Run all stages for one file and wait until everything is sent.
+        If a stage fails, stop the others and raise a PipelineError.
+        """
+        task_queue = multiprocessing.Queue(self.queue_size)
+        result_queue = multiprocessing.Queue(self.queue_size)
+        stop = threading.Event()
+        workers = [multiprocessing.Process(target=wrap_lines, args=(task_queue, result_queue), daemon=True)
+                   for _ in range(self.num_workers)]
+        reader = threading.Thread(target=self.read_file,
+                                  args=(file_name, task_queue, result_queue, stop, skip_lines), daemon=True)
+        for process in workers:
+            process.start()
+        reader.start()
+        try:
+            self.sequence(self.ordered_results(result_queue, workers), file_name, progress=progress,
+                          skip_lines=skip_lines)
+        except BaseException:
+            stop.set()
+            for process in workers:
+                process.terminate()
+            # batches left in the queues are dropped instead of flushed at exit
+            task_queue.cancel_join_thread()
+            result_queue.cancel_join_thread()
+            raise
+        finally:
+            reader.join()
+            for process in workers:
+                process.join()
+
+    def index_shard(self, file_name: str, cache, progress=None, skip_lines: int = 0):
+        """
+        Index a file whose documents have already been cleaned, tokenized
+        and split by the prepare stage: no worker processes are needed,
+        the pre-split sentences are read from the cache shard.
+        """
+        batches = self.indexer.metrics.timed(cache.read_batches(file_name, self.lines_per_task, skip_lines),
+                                             'reader', report_every=1)
+        self.sequence(batches, file_name, progress=progress, skip_lines=skip_lines)
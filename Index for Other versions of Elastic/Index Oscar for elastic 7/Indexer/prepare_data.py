@@ -4,6 +4,7 @@ import gzip
 import os
 import re
 import logging
+from ES_Wrapper.paths import project_path
 
 
 class PrepareData:
@@ -21,7 +22,7 @@ class PrepareData:
         Load corpus-specific settings from settings.json.
         """
         self.settings = copy.deepcopy(settings)
-        logging.basicConfig(filename=os.path.join("../Logs", "prepare.log"), filemode="w", level=logging.INFO)
+        logging.basicConfig(filename=project_path(os.path.join("../Logs", "prepare.log")), filemode="w", level=logging.INFO)
         # self.docNormalizer = {
         #     'analysis': {
         #         'analyzer': {
@@ -40,7 +41,38 @@ class PrepareData:
         #     }
         # }
 
-    def generate_docs_mapping(self) -> dict:
+    def generate_bulk_settings(self) -> dict:
+        """
+        Return index settings for the time of bulk ingestion: no
+        refreshes, no replicas and asynchronous translog, which is
+        safe because the whole corpus can be reindexed after a crash.
+        """
+        return {
+            'refresh_interval': '-1',
+            'number_of_replicas': 0,
+            'translog': {
+                'durability': 'async',
+                'sync_interval': '30s'
+            }
+        }
+
+    def generate_serving_settings(self) -> dict:
+        """
+        Return index settings that replace the bulk ingestion
+        settings once the corpus has been loaded. Without
+        "serving_replicas", number_of_replicas is reset (null) to the
+        value the index would have had without the bulk profile:
+        the index template or the cluster default.
+        """
+        return {
+            'refresh_interval': self.settings.get('serving_refresh_interval', '30s'),
+            'number_of_replicas': self.settings.get('serving_replicas'),
+            'translog': {
+                'durability': 'request'
+            }
+        }
+
+    def generate_docs_mapping(self, bulk_load: bool = False) -> dict:
         """
         Return Elasticsearch mapping for the type "doc".
         Each element of docs index contains metadata about
@@ -60,10 +92,12 @@ class PrepareData:
                 'properties': docs_properties
             }
         }
+        if bulk_load:
+            mapping['settings'] = self.generate_bulk_settings()
         logging.debug("generated docs mapping")
         return mapping
 
-    def generate_sentences_mapping(self, corpus_size_in_bytes: int = 0) -> dict:
+    def generate_sentences_mapping(self, corpus_size_in_bytes: int = 0, bulk_load: bool = False) -> dict:
         """
             Return Elasticsearch mapping for the type "sentence", based
             on searchable features described in the corpus settings.
@@ -91,6 +125,8 @@ class PrepareData:
                 }
             }
         }
+        if bulk_load:
+            mapping['settings'].update(self.generate_bulk_settings())
         logging.debug("generated sentence mapping")
         return mapping
 
@@ -0,0 +1,167 @@
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import struct
+from multiprocessing import Pool
+from ES_Wrapper.es_wrapper import EsWrapper
+from ES_Wrapper.paths import project_path
+
+
+class SentenceCache:
+    """
+    On-disk cache of preprocessed documents. For each source gzip
+    file, the prepare stage writes a shard: a gzip stream of
+    length-prefixed JSON records, one per source line, holding
+    [sentences, tags, link] (or null if the line could not be
+    processed). The shards are stored in a subdirectory named after
+    the hash of the wrapper settings, so changing the cleaning,
+    tokenization or splitting settings invalidates the whole cache,
+    while changes in the index mappings do not.
+    """
+    lengthPrefix = struct.Struct('<I')
+
+    __slots__ = ('data_dir', 'settings_hash', 'shard_dir')
+
+    def __init__(self, cache_dir: str = '../Cache', data_dir: str = '../Data',
+                 settings_path: str = '../ES_Wrapper/settings.json'):
+        self.data_dir = project_path(data_dir)
+        with open(project_path(settings_path), 'rb') as f_settings:
+            self.settings_hash = hashlib.sha256(f_settings.read()).hexdigest()[:16]
+        self.shard_dir = os.path.join(project_path(cache_dir), self.settings_hash)
+
+    def shard_path(self, file_name: str) -> str:
+        rel_path = os.path.relpath(file_name, self.data_dir)
+        return os.path.join(self.shard_dir, rel_path.replace(os.sep, '__') + '.shard')
+
+    @staticmethod
+    def source_stamp(file_name: str) -> dict:
+        stat = os.stat(file_name)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def is_valid(self, file_name: str) -> bool:
+        """
+        Check if there is a complete shard for the current
+        version of the source file.
+        """
+        shard_path = self.shard_path(file_name)
+        if not os.path.exists(shard_path) or not os.path.exists(shard_path + '.json'):
+            return False
+        with open(shard_path + '.json', 'r', encoding='utf-8') as f_meta:
+            meta = json.load(f_meta)
+        return meta['source'] == self.source_stamp(file_name)
+
+    def write_shard(self, file_name: str, es_wrapper: EsWrapper) -> int:
+        """
+        Clean, tokenize and split all documents of a source file
+        and write them to its shard. Return the number of records.
+        """
+        os.makedirs(self.shard_dir, exist_ok=True)
+        shard_path = self.shard_path(file_name)
+        n_records = 0
+        with gzip.open(file_name, 'rt', encoding='UTF-8') as j_file, \
+                gzip.open(shard_path + '.tmp', 'wb', compresslevel=1) as f_out:
+            for j_line in j_file:
+                try:
+                    es_ready = es_wrapper.create_es_format(json.loads(j_line))
+                    record = [es_ready.sentences, es_ready.tags, es_ready.link]
+                except Exception as err:
+                    logging.error(f'Could not process line {n_records} of {file_name}: {err}')
+                    record = None  # keep one record per line, so that line numbers stay valid
+                data = json.dumps(record, ensure_ascii=False).encode('utf-8')
+                f_out.write(SentenceCache.lengthPrefix.pack(len(data)))
+                f_out.write(data)
+                n_records += 1
+        # The description is written last, so that an interrupted shard is never valid
+        os.replace(shard_path + '.tmp', shard_path)
+        with open(shard_path + '.json', 'w', encoding='utf-8') as f_meta:
+            json.dump({'source': self.source_stamp(file_name), 'records': n_records}, f_meta)
+        return n_records
+
+    def read_records(self, file_name: str):
+        """
+        Yield the records of the shard of a source file.
+        """
+        with gzip.open(self.shard_path(file_name), 'rb') as f_in:
+            while True:
+                length = f_in.read(SentenceCache.lengthPrefix.size)
+                if len(length) < SentenceCache.lengthPrefix.size:
+                    break
+                yield json.loads(f_in.read(SentenceCache.lengthPrefix.unpack(length)[0]))
+
+    def read_batches(self, file_name: str, batch_size: int, skip_lines: int = 0):
+        """
+        Yield (docs, number of source lines) pairs for batches of
+        batch_size lines, where docs is a list of (sentences, tags, link)
+        tuples, the format of pipeline.wrap_lines.
+        """
+        docs = []
+        n_lines = 0
+        for line_num, record in enumerate(self.read_records(file_name)):
+            if line_num < skip_lines:
+                continue
+            if record is not None:
+                docs.append(tuple(record))
+            n_lines += 1
+            if n_lines >= batch_size:
+                yield docs, n_lines
+                docs = []
+                n_lines = 0
+        if n_lines > 0:
+            yield docs, n_lines
+
+    def remove_stale(self):
+        """
+        Delete the shards made with other wrapper settings.
+        """
+        cache_dir = os.path.dirname(self.shard_dir)
+        if not os.path.exists(cache_dir):
+            return
+        for dir_name in os.listdir(cache_dir):
+            if dir_name != self.settings_hash:
+                shutil.rmtree(os.path.join(cache_dir, dir_name), ignore_errors=True)
+
+
+def prepare_file(args: tuple) -> tuple:
+    cache_dir, data_dir, file_name = args
+    cache = SentenceCache(cache_dir, data_dir)
+    if cache.is_valid(file_name):
+        return file_name, -1
+    return file_name, cache.write_shard(file_name, EsWrapper())
+
+
+def prepare_dir(cache_dir: str = '../Cache', data_dir: str = '../Data', num_processes: int = 0):
+    """
+    Prepare stage: write shards for all source files in the data
+    directory that do not have a valid one yet, one file per process.
+    """
+    cache = SentenceCache(cache_dir, data_dir)
+    cache.remove_stale()
+    file_names = []
+    for root, dirs, files in os.walk(cache.data_dir):
+        for file in files:
+            if ".gz" == os.path.splitext(file)[1]:
+                file_names.append(os.path.join(root, file))
+    with Pool(num_processes if num_processes > 0 else None) as pool:
+        for file_name, n_records in pool.imap_unordered(prepare_file,
+                                                        [(cache_dir, data_dir, f) for f in file_names]):
+            if n_records < 0:
+                logging.info(f'{file_name}: shard is up to date')
+            else:
+                logging.info(f'{file_name}: {n_records} documents prepared')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Clean, tokenize and split the corpus once for later indexing.')
+    parser.add_argument('--data_dir', type=str, default=None, help='directory with the source gzip files')
+    parser.add_argument('--cache_dir', type=str, default=None, help='where to store the shards')
+    parser.add_argument('--processes', type=int, default=0, help='number of processes, 0 = number of CPUs')
+    args = parser.parse_args()
+    logging.basicConfig(filename=project_path(os.path.join("../Logs", "prepare.log")), filemode="w",
+                        level=logging.INFO)
+    # paths given on the command line are relative to the working directory, defaults to the project
+    prepare_dir(os.path.abspath(args.cache_dir) if args.cache_dir is not None else '../Cache',
+                os.path.abspath(args.data_dir) if args.data_dir is not None else '../Data', args.processes)
@@ -0,0 +1,102 @@
+import base64
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from Indexer.async_ingestion import AsyncIngestion
+from Indexer.indexer import Indexer
+from UnitTest.fake_es import FakeElasticsearch, log_to_temp_dir, make_indexer, remove_temp_logs
+
+log_dir = None
+
+
+def setUpModule():
+    global log_dir
+    log_dir = log_to_temp_dir()
+
+
+def tearDownModule():
+    remove_temp_logs(log_dir)
+
+
+class AsyncIngestionTest(unittest.TestCase):
+    """
+    The async client connects where the settings say, like the
+    synchronous one, and files with failed actions are not journaled
+    as done.
+    """
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.checkpoint_file = os.path.join(self.data_dir, 'checkpoint.jsonl')
+        with open('../test/oscar_sample.jsonl', 'r', encoding='utf-8') as f_in:
+            j_lines = [j_line for j_line in f_in if len(j_line.strip()) > 0]
+        with gzip.open(os.path.join(self.data_dir, 'corpus.jsonl.gz'), 'wt', encoding='utf-8') as f_out:
+            for i in range(200):
+                f_out.write(j_lines[i % len(j_lines)])
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def run_indexer(self, fake_es: FakeElasticsearch, settings: dict, resume: bool = False) -> Indexer:
+        x = make_indexer(self.data_dir, fake_es.url, dict(settings, num_workers=2))
+        x.load_corpus(resume=resume)
+        return x
+
+    def journal(self) -> list:
+        with open(self.checkpoint_file, 'r', encoding='utf-8') as f_in:
+            return [json.loads(line) for line in f_in]
+
+    def test_connect_through_settings(self):
+        fake_es = FakeElasticsearch().start()
+        x = self.run_indexer(fake_es, {'indexing_mode': 'async', 'elastic_creds': 'user:secret'})
+        fake_es.stop()
+        self.assertIsNone(x.failed_file)
+        self.assertEqual(len(fake_es.docs('oscar.docs')), 200)
+        self.assertEqual(len(fake_es.docs('oscar.sentences')), x.ids.next_sent)
+        self.assertEqual(fake_es.auth, {'Basic ' + base64.b64encode(b'user:secret').decode('ascii')})
+        self.assertTrue(self.journal()[-1]['done'])
+
+    def test_reader_off_event_loop(self):
+        read_batches = AsyncIngestion.read_batches
+        reader_threads = set()
+
+        def record_thread(ingestion: AsyncIngestion, file_name: str, skip_lines: int = 0):
+            for j_lines in read_batches(ingestion, file_name, skip_lines):
+                reader_threads.add(threading.current_thread())
+                yield j_lines
+
+        fake_es = FakeElasticsearch().start()
+        with mock.patch.object(AsyncIngestion, 'read_batches', record_thread):
+            x = self.run_indexer(fake_es, {'indexing_mode': 'async', 'lines_per_task': 10})
+        fake_es.stop()
+        self.assertIsNone(x.failed_file)
+        self.assertEqual(len(fake_es.docs('oscar.docs')), 200)
+        self.assertGreater(len(reader_threads), 0)
+        self.assertNotIn(threading.current_thread(), reader_threads)  # the event loop runs in this thread
+
+    def test_failed_actions(self):
+        for mode in ['threads', 'processes', 'async']:
+            with self.subTest(mode=mode):
+                fake_es = FakeElasticsearch(reject_every=97).start()
+                settings = {'indexing_mode': mode, 'adaptive_bulk': False, 'bulk_max_retries': 0}
+                x = self.run_indexer(fake_es, settings)
+                self.assertGreater(x.batcher.n_errors, 0)
+                self.assertEqual(x.failed_file, os.path.join(self.data_dir, 'corpus.jsonl.gz'))
+                self.assertFalse(any(record.get('done', False) for record in self.journal()))
+                self.assertLess(len(fake_es.docs('oscar.sentences')), x.ids.next_sent)
+                # the file is indexed again, with the same IDs
+                fake_es.reject_every = 0
+                x = self.run_indexer(fake_es, settings, resume=True)
+                fake_es.stop()
+                self.assertIsNone(x.failed_file)
+                self.assertTrue(self.journal()[-1]['done'])
+                self.assertEqual(len(fake_es.docs('oscar.docs')), 200)
+                self.assertEqual(len(fake_es.docs('oscar.sentences')), x.ids.next_sent)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=[''], verbosity=2, exit=False)
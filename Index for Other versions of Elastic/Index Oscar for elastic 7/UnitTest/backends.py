@@ -0,0 +1,116 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from Indexer.backends import Es6Backend, Es7Backend, get_backend
+from Indexer.indexer import Indexer
+from UnitTest.fake_es import FakeElasticsearch, log_to_temp_dir, make_indexer, remove_temp_logs
+
+log_dir = None
+
+
+def setUpModule():
+    global log_dir
+    log_dir = log_to_temp_dir()
+
+
+def tearDownModule():
+    remove_temp_logs(log_dir)
+
+
+class BackendsTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        with open('../test/oscar_sample.jsonl', 'r', encoding='utf-8') as f_in:
+            j_lines = [j_line for j_line in f_in if len(j_line.strip()) > 0]
+        with gzip.open(os.path.join(self.data_dir, 'corpus.jsonl.gz'), 'wt', encoding='utf-8') as f_out:
+            for i in range(100):
+                f_out.write(j_lines[i % len(j_lines)])
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_get_backend(self):
+        self.assertIsInstance(get_backend(6), Es6Backend)
+        self.assertIsInstance(get_backend('7'), Es7Backend)
+        self.assertNotIsInstance(get_backend(7), Es6Backend)
+        self.assertRaises(ValueError, get_backend, 5)
+
+    def test_typed_mapping(self):
+        mapping = {'mappings': {'properties': {'n_sents': {'type': 'integer'}}}, 'settings': {'number_of_shards': 1}}
+        self.assertIs(Es7Backend().mapping(mapping, 'doc'), mapping)
+        typed_mapping = Es6Backend().mapping(mapping, 'doc')
+        self.assertEqual(typed_mapping['mappings'], {'doc': {'properties': {'n_sents': {'type': 'integer'},
+                                                                            'sents_ids': {'type': 'integer'}}}})
+        self.assertEqual(typed_mapping['settings'], mapping['settings'])
+        self.assertNotIn('sents_ids', mapping['mappings']['properties'])
+        mapping['mappings']['_meta'] = {'sentence_ids': 'sequential'}
+        self.assertEqual(Es6Backend().mapping(mapping, 'sent')['mappings']['sent']['_meta'],
+                         {'sentence_ids': 'sequential'})
+
+    def run_indexer(self, es_version: int, settings: dict = None) -> tuple:
+        fake_es = FakeElasticsearch().start()
+        settings = dict(settings or {}, es_version=es_version, indexing_mode='threads')
+        x = make_indexer(self.data_dir, fake_es.url, settings)
+        x.load_corpus()
+        fake_es.stop()
+        return x, fake_es.indices[x.name + '.docs'], fake_es.indices[x.name + '.sentences']
+
+    def test_es6_indexing(self):
+        x7, docs7, sentences7 = self.run_indexer(7)
+        x6, docs6, sentences6 = self.run_indexer(6)
+        self.assertEqual((docs7['types'], sentences7['types']), ({None}, {None}))
+        self.assertEqual((docs6['types'], sentences6['types']), ({'doc'}, {'sent'}))
+        self.assertIn('properties', docs7['mappings'])
+        self.assertIn('sents_ids', docs6['mappings']['doc']['properties'])
+        self.assertIn('sentence', sentences6['mappings']['sent']['properties'])
+        self.assertEqual(docs6['mappings']['doc']['_meta'], {'sentence_ids': 'sequential', 'sents_ids': 'range'})
+        self.assertEqual(sentences7['mappings']['_meta'], {'sentence_ids': 'permuted', 'id_seed': 0,
+                                                           'id_block_size': 1000000})
+        # the same sentences, with sequential IDs in Elasticsearch 6 and shuffled ones in Elasticsearch 7
+        self.assertEqual(set(sentences6['docs']), {str(i) for i in range(x6.ids.next_sent)})
+        self.assertEqual(len(sentences7['docs']), x6.ids.next_sent)
+        for sent_id, sentence in sentences6['docs'].items():
+            sentence7 = sentences7['docs'][str(x7.randomize_id(int(sent_id)))]
+            for key in ('sentence', 'doc_id', 'n_words'):
+                self.assertEqual(sentence[key], sentence7[key])
+        # documents with the range of their sentence IDs
+        self.assertEqual(len(docs6['docs']), 100)
+        n_sents = 0
+        for doc_id in sorted(docs6['docs'], key=int):
+            doc = docs6['docs'][doc_id]
+            sents_ids = doc.pop('sents_ids')
+            self.assertEqual(doc, docs7['docs'][doc_id])
+            self.assertEqual(sents_ids, [n_sents, doc['n_sents']])
+            sent_ids = Indexer.doc_sentence_ids(sents_ids, docs6['mappings']['doc']['_meta'])
+            self.assertEqual(sent_ids, list(range(n_sents, n_sents + doc['n_sents'])))
+            for i, sent_id in enumerate(sent_ids):
+                sentence = sentences6['docs'][str(sent_id)]
+                self.assertEqual(sentence['doc_id'], int(doc_id))
+                if i > 0:
+                    self.assertEqual(sentence['prev_id'], sent_ids[i - 1])
+            n_sents += doc['n_sents']
+
+    def test_es6_permuted_ids(self):
+        x7, docs7, sentences7 = self.run_indexer(7)
+        x6, docs6, sentences6 = self.run_indexer(6, {'permute_sentence_ids': True})
+        self.assertEqual(sentences6['docs'], sentences7['docs'])
+        self.assertEqual(sentences6['mappings']['sent']['_meta'], {'sentence_ids': 'permuted', 'id_seed': 0,
+                                                                   'id_block_size': 1000000, 'sents_ids': 'list'})
+        # sents_ids holds the stored IDs of the sentences, in document order
+        n_sents = 0
+        for doc_id in sorted(docs6['docs'], key=int):
+            doc = docs6['docs'][doc_id]
+            sent_ids = Indexer.doc_sentence_ids(doc['sents_ids'], docs6['mappings']['doc']['_meta'])
+            self.assertEqual(sent_ids, [x6.randomize_id(n_sents + i) for i in range(doc['n_sents'])])
+            for i, sent_id in enumerate(sent_ids):
+                sentence = sentences6['docs'][str(sent_id)]
+                self.assertEqual(sentence['doc_id'], int(doc_id))
+                if i > 0:
+                    self.assertEqual(sentence['prev_id'], sent_ids[i - 1])
+            n_sents += doc['n_sents']
+
+
+if __name__ == '__main__':
+    unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,47 @@
+import unittest
+from elasticsearch import Elasticsearch
+from Indexer.bulk_batcher import BulkBatcher
+from UnitTest.fake_es import FakeElasticsearch
+
+
+class BulkBatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.fake_es = FakeElasticsearch().start()
+        self.es = Elasticsearch([self.fake_es.url])
+
+    def tearDown(self):
+        self.fake_es.stop()
+
+    @staticmethod
+    def actions(n: int, sentence: str = 'Мама мыла раму.') -> list:
+        return [{'_index': 'test.sentences', '_id': i, '_source': {'sentence': sentence}} for i in range(n)]
+
+    def test_flush_by_count(self):
+        batcher = BulkBatcher(self.es, max_actions=9)
+        for i in range(5):
+            batcher.add_many(self.actions(3))
+        self.assertEqual(self.fake_es.n_bulk_requests, 1)
+        self.assertEqual(len(batcher.actions), 6)
+        batcher.flush()
+        self.assertEqual(self.fake_es.n_bulk_requests, 2)
+        self.assertEqual(self.fake_es.n_items, 15)
+        self.assertEqual((batcher.n_flushes, batcher.n_actions, batcher.n_errors), (2, 15, 0))
+
+    def test_flush_by_size(self):
+        batcher = BulkBatcher(self.es, max_actions=1000, max_bytes=10000)
+        for i in range(20):
+            batcher.add(self.actions(1, 'слово ' * 200)[0])
+        self.assertGreater(self.fake_es.n_bulk_requests, 1)
+        batcher.flush()
+        self.assertEqual(self.fake_es.n_items, 20)
+
+    def test_errors(self):
+        self.fake_es.reject_every = 4
+        batcher = BulkBatcher(self.es, max_actions=100)
+        batcher.add_many(self.actions(8))
+        batcher.flush()
+        self.assertEqual(batcher.n_errors, 2)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,127 @@
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from elasticsearch import Elasticsearch
+from Indexer.bulk_batcher import BulkBatcher
+from Indexer.bulk_controller import BulkController
+from UnitTest.fake_es import FakeElasticsearch, log_to_temp_dir, make_indexer, remove_temp_logs
+
+log_dir = None
+
+
+def setUpModule():
+    global log_dir
+    log_dir = log_to_temp_dir()
+
+
+def tearDownModule():
+    remove_temp_logs(log_dir)
+
+
+SETTINGS = {'bulk_chunk_size': 100, 'bulk_min_chunk_size': 10, 'bulk_max_chunk_size': 400,
+            'bulk_max_concurrency': 8, 'bulk_initial_backoff': 0.01, 'bulk_max_backoff': 0.1}
+
+
+class BulkControllerTest(unittest.TestCase):
+    def setUp(self):
+        self.fake_es = FakeElasticsearch().start()
+        self.es = Elasticsearch([self.fake_es.url])
+
+    def tearDown(self):
+        self.fake_es.stop()
+
+    @staticmethod
+    def actions(n: int) -> list:
+        return [{'_index': 'test.sentences', '_id': i, '_source': {'sentence': 'Мама мыла раму.'}} for i in range(n)]
+
+    def test_backoff(self):
+        controller = BulkController({'bulk_initial_backoff': 1.0, 'bulk_max_backoff': 10.0}, seed=1)
+        for attempt in range(8):
+            delays = [controller.backoff(attempt) for _ in range(100)]
+            self.assertTrue(all(0 <= delay <= min(10.0, 2 ** attempt) for delay in delays))
+            self.assertGreater(len(set(delays)), 90)  # jittered
+        self.assertGreater(max(controller.backoff(5) for _ in range(100)), 10.0 / 2)
+
+    def test_grow_when_fast(self):
+        controller = BulkController(SETTINGS)
+        batcher = BulkBatcher(self.es, max_actions=100, controller=controller)
+        batcher.send(self.actions(10000))
+        self.assertEqual(controller.chunk_size, 400)
+        self.assertEqual(controller.concurrency, 8)
+        self.assertEqual(self.fake_es.n_items, 10000)
+
+    def test_retry_rejected(self):
+        self.fake_es.reject_every = 7
+        controller = BulkController(SETTINGS)
+        batcher = BulkBatcher(self.es, max_actions=100, controller=controller)
+        batcher.send(self.actions(1000))
+        self.assertEqual(batcher.n_errors, 0)
+        self.assertEqual(len(self.fake_es.docs('test.sentences')), 1000)
+        self.assertEqual(controller.n_rejected, self.fake_es.n_rejected)
+        self.assertGreater(controller.n_retries, 0)
+        self.assertLess(controller.chunk_size, 100)
+        # only the rejected items are sent again
+        self.assertEqual(self.fake_es.n_items, 1000 + self.fake_es.n_rejected)
+
+    def test_give_up(self):
+        self.fake_es.reject_every = 1
+        batcher = BulkBatcher(self.es, controller=BulkController(dict(SETTINGS, bulk_max_retries=2)))
+        batcher.send(self.actions(30))
+        self.assertEqual(batcher.n_errors, 30)
+        self.assertEqual(self.fake_es.n_items, 90)
+
+    def test_concurrency_limit(self):
+        self.fake_es.bulk_delay = 0.02
+        self.fake_es.reject_every = 5
+        controller = BulkController(dict(SETTINGS, bulk_max_concurrency=4))
+        batcher = BulkBatcher(self.es, max_actions=100, controller=controller)
+        threads = [threading.Thread(target=batcher.send, args=(self.actions(200),)) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLessEqual(self.fake_es.max_active, 4)
+        self.assertLess(controller.concurrency, 4)
+        self.assertEqual(batcher.n_errors, 0)
+
+
+class RejectionsTest(unittest.TestCase):
+    """
+    An overloaded cluster that rejects some items must end up
+    with the same documents as a healthy one.
+    """
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        with open('../test/oscar_sample.jsonl', 'r', encoding='utf-8') as f_in:
+            j_lines = [j_line for j_line in f_in if len(j_line.strip()) > 0]
+        with gzip.open(os.path.join(self.data_dir, 'corpus.jsonl.gz'), 'wt', encoding='utf-8') as f_out:
+            for i in range(300):
+                f_out.write(j_lines[i % len(j_lines)])
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def run_indexer(self, settings: dict, reject_every: int) -> dict:
+        fake_es = FakeElasticsearch(reject_every=reject_every).start()
+        x = make_indexer(self.data_dir, fake_es.url, dict(SETTINGS, **settings))
+        x.load_corpus()
+        fake_es.stop()
+        self.assertEqual(x.batcher.n_errors, 0)
+        self.assertEqual(x.batcher.controller.n_rejected, fake_es.n_rejected)
+        return fake_es.indices
+
+    def test_rejections(self):
+        for mode in ['threads', 'processes', 'async']:
+            with self.subTest(mode=mode):
+                settings = {'indexing_mode': mode, 'num_workers': 2}
+                reference = self.run_indexer(settings, 0)
+                indices = self.run_indexer(settings, 50)
+                for index in ('oscar.docs', 'oscar.sentences'):
+                    self.assertEqual(indices[index]['docs'], reference[index]['docs'])
+
+
+if __name__ == '__main__':
+    unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,82 @@
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from UnitTest.fake_es import FakeElasticsearch
+
+RUN_INDEXER = """
+import logging
+import os
+import sys
+from UnitTest.fake_es import make_indexer
+
+data_dir, url, mode, resume = sys.argv[1:]
+logging.basicConfig(filename=os.path.join(data_dir, 'indexer.log'), level=logging.INFO)
+x = make_indexer(data_dir, url, {'indexing_mode': mode, 'num_workers': 2, 'lines_per_task': 10,
+                                 'checkpoint_every': 50})
+x.load_corpus(resume=resume == 'resume')
+"""
+
+
+class ResumeTest(unittest.TestCase):
+    """
+    Kill the indexer in the middle of a file, resume it and check
+    that the result is the same as after an uninterrupted run.
+    """
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.checkpoint_file = os.path.join(self.data_dir, 'checkpoint.jsonl')
+        with open('../test/oscar_sample.jsonl', 'r', encoding='utf-8') as f_in:
+            j_lines = [j_line for j_line in f_in if len(j_line.strip()) > 0]
+        with gzip.open(os.path.join(self.data_dir, 'corpus.jsonl.gz'), 'wt', encoding='utf-8') as f_out:
+            for i in range(600):
+                f_out.write(j_lines[i % len(j_lines)])
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def start_indexer(self, fake_es: FakeElasticsearch, mode: str, resume: bool = False):
+        return subprocess.Popen([sys.executable, '-c', RUN_INDEXER, self.data_dir, fake_es.url, mode,
+                                 'resume' if resume else 'new'],
+                                cwd='..', stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def journal(self) -> list:
+        if not os.path.exists(self.checkpoint_file):
+            return []
+        with open(self.checkpoint_file, 'r', encoding='utf-8') as f_in:
+            return [json.loads(line) for line in f_in if line.endswith('\n')]
+
+    def test_resume(self):
+        for mode in ['threads', 'processes', 'async']:
+            with self.subTest(mode=mode):
+                reference_es = FakeElasticsearch().start()
+                self.assertEqual(self.start_indexer(reference_es, mode).wait(120), 0)
+                reference_es.stop()
+                reference = reference_es.indices
+
+                os.remove(self.checkpoint_file)
+                fake_es = FakeElasticsearch(bulk_delay=0.02).start()
+                indexer = self.start_indexer(fake_es, mode)
+                while len(self.journal()) < 3 and indexer.poll() is None:
+                    time.sleep(0.01)
+                indexer.kill()
+                indexer.wait()
+                self.assertFalse(any(record.get('done', False) for record in self.journal()))
+                self.assertLess(len(fake_es.docs('oscar.docs')), 600)
+
+                fake_es.bulk_delay = 0.0
+                self.assertEqual(self.start_indexer(fake_es, mode, resume=True).wait(120), 0)
+                fake_es.stop()
+                self.assertTrue(self.journal()[-1]['done'])
+                self.assertEqual(len(fake_es.docs('oscar.docs')), 600)
+                for index in ('oscar.docs', 'oscar.sentences'):
+                    self.assertEqual(fake_es.docs(index), reference[index]['docs'])
+
+
+if __name__ == '__main__':
+    unittest.main(argv=[''], verbosity=2, exit=False)
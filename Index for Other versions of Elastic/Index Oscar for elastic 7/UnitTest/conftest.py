@@ -0,0 +1,14 @@
+import os
+import pytest
+
+# indexer.py needs a real Elasticsearch, fake_es.py holds the fakes
+collect_ignore = ['indexer.py', 'fake_es.py']
+
+
+@pytest.fixture(autouse=True)
+def test_dir(monkeypatch):
+    """
+    Run each test from UnitTest, like python <test>.py, so that
+    the relative paths of the tests ("../test/...") resolve.
+    """
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from Indexer.indexer import Indexer
+
+
+class FakeElasticsearch:
+    """
+    Local stand-in for an Elasticsearch 7 node, good enough for
+    the indexer: it answers ping, index management, single document
+    and _bulk requests and keeps indexed documents in memory, along
+    with the mappings and the mapping types of bulk actions (for
+    the Elasticsearch 6 backend) and the credentials it was sent.
+    Bulk requests can be slowed down or partially rejected with 429
+    to imitate an overloaded cluster.
+    """
+    rxDocPath = re.compile('^/([^/]+)/_doc/([^/?]+)')
+
+    def __init__(self, bulk_delay: float = 0.0, reject_every: int = 0, keep_docs: bool = True):
+        self.bulk_delay = bulk_delay  # seconds spent on each _bulk request
+        self.reject_every = reject_every  # reject every n-th bulk item with 429, 0 = never
+        self.keep_docs = keep_docs
+        self.indices = {}  # index name -> {'settings': dict, 'mappings': dict, 'docs': {id: source}, 'types': set}
+        self.n_bulk_requests = 0
+        self.n_items = 0
+        self.n_rejected = 0
+        self.n_active = 0  # bulk requests being processed
+        self.max_active = 0
+        self.auth = set()  # Authorization headers of the requests
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.make_handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        return f'127.0.0.1:{self.server.server_address[1]}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def docs(self, index: str) -> dict:
+        return self.indices.get(index, {}).get('docs', {})
+
+    def bulk(self, body: bytes) -> dict:
+        """
+        Process a _bulk request body and return the response.
+        """
+        with self.lock:
+            self.n_active += 1
+            self.max_active = max(self.max_active, self.n_active)
+        if self.bulk_delay > 0:
+            time.sleep(self.bulk_delay)
+        with self.lock:
+            self.n_active -= 1
+        lines = body.decode('utf-8').splitlines()
+        items = []
+        errors = False
+        i = 0
+        with self.lock:
+            self.n_bulk_requests += 1
+            while i < len(lines):
+                if len(lines[i].strip()) <= 0:
+                    i += 1
+                    continue
+                action = json.loads(lines[i])
+                op_type = next(iter(action))
+                meta = action[op_type]
+                source = json.loads(lines[i + 1]) if op_type != 'delete' else None
+                i += 1 if op_type == 'delete' else 2
+                self.n_items += 1
+                if self.reject_every > 0 and self.n_items % self.reject_every == 0:
+                    self.n_rejected += 1
+                    errors = True
+                    items.append({op_type: {'_index': meta['_index'], '_id': meta.get('_id'), 'status': 429,
+                                            'error': {'type': 'es_rejected_execution_exception',
+                                                      'reason': 'rejected execution'}}})
+                    continue
+                index = self.indices.setdefault(meta['_index'], {'settings': {}, 'docs': {}})
+                index.setdefault('types', set()).add(meta.get('_type'))
+                if self.keep_docs and source is not None:
+                    index['docs'][str(meta.get('_id'))] = source
+                items.append({op_type: {'_index': meta['_index'], '_id': meta.get('_id'),
+                                        'status': 201, 'result': 'created'}})
+        return {'took': 1, 'errors': errors, 'items': items}
+
+    def make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            wbufsize = -1  # send headers and body in one packet, or small requests wait for delayed ACKs
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status: int, body=None):
+                data = json.dumps(body if body is not None else {}).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('X-Elastic-Product', 'Elasticsearch')
+                self.send_header('Content-Length', str(len(data) if self.command != 'HEAD' else 0))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    try:
+                        self.wfile.write(data)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass  # the client has been killed
+
+            def read_body(self) -> bytes:
+                length = int(self.headers.get('Content-Length', 0))
+                return self.rfile.read(length) if length > 0 else b''
+
+            def route(self):
+                path = self.path.split('?')[0]
+                body = self.read_body()
+                fake.auth.add(self.headers.get('Authorization'))
+                if path == '/':
+                    return self.reply(200, {'version': {'number': '7.17.9', 'build_flavor': 'default'},
+                                            'tagline': 'You Know, for Search'})
+                if path.endswith('/_bulk'):
+                    return self.reply(200, fake.bulk(body))
+                m = fake.rxDocPath.search(path)
+                if m is not None and self.command in ('PUT', 'POST'):
+                    with fake.lock:
+                        index = fake.indices.setdefault(m.group(1), {'settings': {}, 'docs': {}})
+                        if fake.keep_docs:
+                            index['docs'][m.group(2)] = json.loads(body)
+                    return self.reply(201, {'_index': m.group(1), '_id': m.group(2), 'result': 'created'})
+                parts = path.strip('/').split('/')
+                name = parts[0]
+                if len(parts) == 1:
+                    if self.command == 'HEAD':
+                        return self.reply(200 if name in fake.indices else 404)
+                    if self.command == 'PUT':
+                        mapping = json.loads(body) if body else {}
+                        fake.indices[name] = {'settings': mapping.get('settings', {}),
+                                              'mappings': mapping.get('mappings', {}), 'docs': {}}
+                        return self.reply(200, {'acknowledged': True, 'index': name})
+                    if self.command == 'DELETE':
+                        fake.indices.pop(name, None)
+                        return self.reply(200, {'acknowledged': True})
+                if len(parts) == 2 and parts[1] == '_settings' and self.command == 'PUT':
+                    settings = json.loads(body).get('index', json.loads(body))
+                    index_settings = fake.indices.setdefault(name, {'settings': {}, 'docs': {}})['settings']
+                    index_settings.update(settings)
+                    for key in [key for key, value in settings.items() if value is None]:
+                        del index_settings[key]  # null resets a setting to its default
+                    return self.reply(200, {'acknowledged': True})
+                if len(parts) == 2 and parts[1] in ('_refresh', '_forcemerge', '_flush'):
+                    return self.reply(200, {'_shards': {'total': 1, 'successful': 1, 'failed': 0}})
+                return self.reply(404, {'error': 'not supported by the fake', 'status': 404})
+
+            do_GET = do_PUT = do_POST = do_DELETE = do_HEAD = route
+
+        return Handler
+
+
+def make_indexer(data_dir: str, elastic_url: str, settings: dict = None, work_dir: str = None) -> Indexer:
+    """
+    Return an Indexer of the corpus in data_dir connected to elastic_url
+    (usually a FakeElasticsearch), with settings overriding those of
+    Indexer/settings.json. The checkpoint journal and the metrics go to
+    work_dir (data_dir by default) instead of Logs, and the sentence
+    cache is off unless the settings turn it on.
+    """
+    work_dir = data_dir if work_dir is None else work_dir
+    isolated = {'use_sentence_cache': False,
+                'checkpoint_file': os.path.join(work_dir, 'checkpoint.jsonl'),
+                'metrics_file': os.path.join(work_dir, 'metrics.jsonl')}
+    isolated.update(settings or {})
+    isolated['elastic_url'] = elastic_url
+    return Indexer(overwrite_index=True, data_dir=data_dir, settings=isolated)
+
+
+def log_to_temp_dir() -> str:
+    """
+    Send the log of the indexers to a new temporary directory instead
+    of the tracked Logs/indexer.log and return the directory.
+    """
+    log_dir = tempfile.mkdtemp()
+    logging.basicConfig(filename=os.path.join(log_dir, 'indexer.log'), level=logging.INFO, force=True)
+    return log_dir
+
+
+def remove_temp_logs(log_dir: str):
+    for handler in logging.getLogger().handlers[:]:
+        logging.getLogger().removeHandler(handler)
+        handler.close()
+    shutil.rmtree(log_dir)
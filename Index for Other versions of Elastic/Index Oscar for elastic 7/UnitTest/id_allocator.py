@@ -0,0 +1,135 @@
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from elasticsearch import Elasticsearch
+from elasticsearch.client import IndicesClient
+from Indexer import indexer_single
+from Indexer.id_allocator import IdAllocator
+from Indexer.sentence_cache import prepare_dir
+from UnitTest.fake_es import FakeElasticsearch, log_to_temp_dir, make_indexer, remove_temp_logs
+
+log_dir = None
+
+
+def setUpModule():
+    global log_dir
+    log_dir = log_to_temp_dir()
+
+
+def tearDownModule():
+    remove_temp_logs(log_dir)
+
+
+class IdAllocatorTest(unittest.TestCase):
+    def test_reserve_in_any_order(self):
+        ids = IdAllocator()
+        n_sents = [3, 0, 5, 1, 2, 4, 7, 1]
+        results = {}
+
+        def reserve(doc_num: int):
+            results[doc_num] = ids.reserve(doc_num, n_sents[doc_num], n_words=10)
+
+        threads = [threading.Thread(target=reserve, args=(doc_num,)) for doc_num in reversed(range(len(n_sents)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        first_sent_id = 0
+        for doc_num in range(len(n_sents)):
+            self.assertEqual(results[doc_num], (doc_num, first_sent_id))
+            first_sent_id += n_sents[doc_num]
+        self.assertEqual((ids.next_doc, ids.next_sent), (len(n_sents), first_sent_id))
+        self.assertEqual(ids.total_num_words, 10 * len(n_sents))
+        self.assertEqual(ids.waiting, {})
+
+    def test_skip(self):
+        ids = IdAllocator()
+        results = {}
+
+        def reserve(line_num: int):
+            if line_num == 2:
+                ids.skip(line_num)
+            else:
+                results[line_num] = ids.reserve(line_num, 2)
+
+        threads = [threading.Thread(target=reserve, args=(line_num,)) for line_num in reversed(range(5))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, {0: (0, 0), 1: (1, 2), 3: (2, 4), 4: (3, 6)})
+        self.assertEqual((ids.next_doc, ids.next_sent, ids.next_line), (4, 8, 5))
+        self.assertEqual(ids.waiting, {})
+
+
+class SameIdsTest(unittest.TestCase):
+    """
+    Documents and sentences indexed by the parallel indexer must be
+    exactly those indexed by the sequential indexer_single.
+    """
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        with open('../test/oscar_sample.jsonl', 'r', encoding='utf-8') as f_in:
+            j_lines = [j_line for j_line in f_in if len(j_line.strip()) > 0]
+        with gzip.open(os.path.join(self.data_dir, 'corpus.jsonl.gz'), 'wt', encoding='utf-8') as f_out:
+            for i in range(300):
+                f_out.write(j_lines[i % len(j_lines)])
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def run_indexer(self, settings: dict = None, cache_dir: str = None) -> tuple:
+        """
+        Index the corpus with the parallel indexer and the given settings,
+        or with indexer_single if settings is None.
+        """
+        fake_es = FakeElasticsearch().start()
+        if settings is None:
+            # indexer_single reads Indexer/settings.json only and has no journal
+            x = indexer_single.Indexer(overwrite_index=True, data_dir=self.data_dir)
+            x.es = Elasticsearch([fake_es.url])
+            x.es_ic = IndicesClient(x.es)
+        else:
+            if cache_dir is not None:
+                settings = dict(settings, use_sentence_cache=True, sentence_cache_dir=cache_dir)
+            x = make_indexer(self.data_dir, fake_es.url, settings)
+        x.load_corpus()
+        fake_es.stop()
+        return fake_es.docs(x.name + '.sentences'), fake_es.docs(x.name + '.docs')
+
+    def test_same_ids(self):
+        sentences, docs = self.run_indexer()
+        self.assertEqual(len(docs), 300)
+        for mode in ['threads', 'processes', 'async']:
+            with self.subTest(mode=mode):
+                self.assertEqual(self.run_indexer({'indexing_mode': mode, 'num_workers': 2}),
+                                 (sentences, docs))
+
+    def test_malformed_line(self):
+        """
+        A line that is not valid JSON gets no document ID in any mode.
+        """
+        file_name = os.path.join(self.data_dir, 'corpus.jsonl.gz')
+        with gzip.open(file_name, 'rt', encoding='utf-8') as f_in:
+            j_lines = f_in.readlines()
+        j_lines[5] = '{"content": "broken\n'
+        with gzip.open(file_name, 'wt', encoding='utf-8') as f_out:
+            f_out.writelines(j_lines)
+        cache_dir = os.path.join(self.data_dir, 'cache')
+        prepare_dir(cache_dir, self.data_dir, 1)
+        reference = None
+        for mode in ['threads', 'processes', 'async', 'cache']:
+            with self.subTest(mode=mode):
+                settings = {'indexing_mode': mode if mode != 'cache' else 'processes', 'num_workers': 2}
+                sentences, docs = self.run_indexer(settings, cache_dir if mode == 'cache' else None)
+                self.assertEqual(sorted(int(doc_id) for doc_id in docs), list(range(299)))
+                if reference is None:
+                    reference = (sentences, docs)
+                self.assertEqual((sentences, docs), reference)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,41 @@
+import subprocess
+import sys
+import unittest
+from Indexer.id_permutation import IdPermutation
+
+
+class IdPermutationTest(unittest.TestCase):
+    def test_bijection(self):
+        for seed in (0, 12345):
+            permutation = IdPermutation(seed)
+            values = [permutation.permute(i) for i in range(1000000)]
+            self.assertEqual(sorted(values), list(range(1000000)))
+            self.assertEqual(values[0], 0)
+
+    def test_small_sizes(self):
+        for size in (2, 3, 10, 1000, 1025):
+            permutation = IdPermutation(7, size)
+            self.assertEqual(sorted(permutation.permute(i) for i in range(size)), list(range(size)))
+
+    def test_stable(self):
+        # The same IDs must be computed in any run and any process,
+        # otherwise indices built in several runs are inconsistent.
+        self.assertEqual([IdPermutation(0).permute(i) for i in range(6)], [0, 357083, 534423, 141209, 149877, 389313])
+        code = 'from Indexer.id_permutation import IdPermutation; print(IdPermutation(3).permute(777))'
+        output = subprocess.run([sys.executable, '-c', code], cwd='..', capture_output=True, text=True).stdout
+        self.assertEqual(int(output), IdPermutation(3).permute(777))
+        self.assertNotEqual([IdPermutation(1).permute(i) for i in range(1, 6)],
+                            [IdPermutation(2).permute(i) for i in range(1, 6)])
+
+    def test_randomize_id(self):
+        permutation = IdPermutation(5)
+        self.assertEqual(permutation.randomize_id(-1), -1)
+        self.assertEqual(permutation.randomize_id(3000000), 3000000)
+        self.assertEqual(permutation.randomize_id(2000007), 2000000 + permutation.permute(7))
+        self.assertEqual([permutation.randomize_id(i) for i in range(999998, 1000002)],
+                         [permutation.permute(999998), permutation.permute(999999), 1000000,
+                          1000000 + permutation.permute(1)])
+
+
+if __name__ == '__main__':
+    unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,88 @@
+import gzip
+import json
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+import urllib.request
+from Indexer.metrics import Metrics
+from UnitTest.fake_es import FakeElasticsearch, log_to_temp_dir, make_indexer, remove_temp_logs
+
+log_dir = None
+
+
+def setUpModule():
+    global log_dir
+    log_dir = log_to_temp_dir()
+
+
+def tearDownModule():
+    remove_temp_logs(log_dir)
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.metrics_file = os.path.join(self.data_dir, 'metrics.jsonl')
+        with open('../test/oscar_sample.jsonl', 'r', encoding='utf-8') as f_in:
+            j_lines = [j_line for j_line in f_in if len(j_line.strip()) > 0]
+        with gzip.open(os.path.join(self.data_dir, 'corpus.jsonl.gz'), 'wt', encoding='utf-8') as f_out:
+            for i in range(300):
+                f_out.write(j_lines[i % len(j_lines)])
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_histogram(self):
+        metrics = Metrics({'metrics_file': self.metrics_file})
+        for latency in (0.001, 0.02, 0.02, 0.7, 100.0):
+            metrics.observe_bulk(10, latency, n_rejected=1)
+        bulk = metrics.snapshot()['bulk']
+        self.assertEqual(bulk['latency_buckets']['0.005'], 1)
+        self.assertEqual(bulk['latency_buckets']['0.025'], 3)
+        self.assertEqual(bulk['latency_buckets']['1.0'], 4)
+        self.assertEqual(bulk['latency_buckets']['+Inf'], 5)
+        self.assertEqual((bulk['requests'], bulk['actions'], bulk['rejected']), (5, 50, 5))
+
+    def test_prometheus(self):
+        with socket.socket() as s:
+            s.bind(('', 0))
+            port = s.getsockname()[1]
+        metrics = Metrics({'metrics_file': self.metrics_file, 'metrics_port': port})
+        metrics.start()
+        metrics.add_time('cleaner', 0.5, 100)
+        metrics.set_queue('send', 3)
+        metrics.observe_bulk(10, 0.03)
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+            text = response.read().decode('utf-8')
+        metrics.stop()
+        self.assertIn('indexer_stage_items_total{stage="cleaner"} 100', text)
+        self.assertIn('indexer_queue_depth{queue="send"} 3', text)
+        self.assertIn('indexer_bulk_latency_seconds_bucket{le="0.05"} 1', text)
+        self.assertIn('indexer_bulk_latency_seconds_count 1', text)
+
+    def test_indexing_metrics(self):
+        for mode in ['threads', 'processes', 'async']:
+            with self.subTest(mode=mode):
+                fake_es = FakeElasticsearch(reject_every=50).start()
+                x = make_indexer(self.data_dir, fake_es.url, {'indexing_mode': mode, 'num_workers': 2,
+                                                              'bulk_initial_backoff': 0.01, 'metrics_interval': 0.05})
+                x.load_corpus()
+                fake_es.stop()
+                with open(self.metrics_file, 'r', encoding='utf-8') as f_in:
+                    snapshots = [json.loads(line) for line in f_in]
+                self.assertGreater(len(snapshots), 0)
+                stages = snapshots[-1]['stages']
+                self.assertEqual(stages['reader']['items'], 300)
+                for stage in ('cleaner', 'tokenizer', 'splitter'):
+                    self.assertEqual(stages[stage]['items'], 300)
+                    self.assertGreater(stages[stage]['seconds'], 0)
+                bulk = snapshots[-1]['bulk']
+                self.assertEqual(bulk['actions'], fake_es.n_items)
+                self.assertEqual(bulk['rejected'], fake_es.n_rejected)
+                self.assertEqual(bulk['latency_buckets']['+Inf'], fake_es.n_bulk_requests)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=[''], verbosity=2, exit=False)
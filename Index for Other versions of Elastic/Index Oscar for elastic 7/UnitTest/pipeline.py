@@ -0,0 +1,114 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from Indexer.bulk_batcher import BulkBatcher
+from Indexer.indexer import Indexer
+from UnitTest.fake_es import FakeElasticsearch, log_to_temp_dir, make_indexer, remove_temp_logs
+
+log_dir = None
+
+
+def setUpModule():
+    global log_dir
+    log_dir = log_to_temp_dir()
+
+
+def tearDownModule():
+    remove_temp_logs(log_dir)
+
+
+def die(es_wrapper, j_lines: list, stage_times: dict = None):
+    os._exit(1)  # like a worker killed by the OOM killer: no stop signal
+
+
+class PipelineErrorsTest(unittest.TestCase):
+    """
+    A failed stage of the processes pipeline stops the indexing of
+    the file instead of hanging, and the file is not journaled as done.
+    """
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.data_dir, 'corpus.jsonl.gz')
+        self.checkpoint_file = os.path.join(self.data_dir, 'checkpoint.jsonl')
+        with open('../test/oscar_sample.jsonl', 'r', encoding='utf-8') as f_in:
+            j_lines = [j_line for j_line in f_in if len(j_line.strip()) > 0]
+        with gzip.open(self.file_name, 'wt', encoding='utf-8') as f_out:
+            for i in range(300):
+                f_out.write(j_lines[i % len(j_lines)])
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def run_indexer(self, fake_es: FakeElasticsearch, resume: bool = False) -> Indexer:
+        x = make_indexer(self.data_dir, fake_es.url, {'indexing_mode': 'processes', 'num_workers': 2,
+                                                      'lines_per_task': 10, 'checkpoint_every': 50})
+        thread = threading.Thread(target=x.load_corpus, kwargs={'resume': resume}, daemon=True)
+        thread.start()
+        thread.join(60)
+        self.assertFalse(thread.is_alive(), 'the pipeline hangs')
+        return x
+
+    def journal(self) -> list:
+        if not os.path.exists(self.checkpoint_file):
+            return []
+        with open(self.checkpoint_file, 'r', encoding='utf-8') as f_in:
+            return [json.loads(line) for line in f_in]
+
+    def run_failing(self) -> Indexer:
+        fake_es = FakeElasticsearch().start()
+        x = self.run_indexer(fake_es)
+        fake_es.stop()
+        return x
+
+    def assert_failed(self, x: Indexer):
+        self.assertEqual(x.failed_file, self.file_name)
+        self.assertFalse(any(record.get('done', False) for record in self.journal()))
+
+    def test_worker_died(self):
+        with mock.patch('Indexer.pipeline.wrap_batch', die):
+            x = self.run_failing()
+        self.assert_failed(x)
+
+    def test_worker_error(self):
+        with mock.patch('Indexer.pipeline.EsWrapper', side_effect=RuntimeError('no settings')):
+            x = self.run_failing()
+        self.assert_failed(x)
+
+    def test_reader_error(self):
+        with open(self.file_name, 'rb') as f_in:
+            data = f_in.read()
+        with open(self.file_name, 'wb') as f_out:
+            f_out.write(data[:len(data) // 2])
+        x = self.run_failing()
+        self.assert_failed(x)
+
+    def test_sender_error(self):
+        send = BulkBatcher.send
+        n_calls = [0]
+
+        def fail_once(batcher, actions: list):
+            n_calls[0] += 1
+            if n_calls[0] == 7:
+                raise ConnectionError('connection lost')
+            send(batcher, actions)
+
+        fake_es = FakeElasticsearch().start()
+        with mock.patch.object(BulkBatcher, 'send', fail_once):
+            x = self.run_indexer(fake_es)
+        self.assert_failed(x)
+        # the checkpoints only cover batches sent before the failed one
+        self.assertLessEqual(max([record.get('lines', 0) for record in self.journal()]), 60)
+        x = self.run_indexer(fake_es, resume=True)
+        fake_es.stop()
+        self.assertIsNone(x.failed_file)
+        self.assertTrue(self.journal()[-1]['done'])
+        self.assertEqual(len(fake_es.docs('oscar.docs')), 300)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=[''], verbosity=2, exit=False)
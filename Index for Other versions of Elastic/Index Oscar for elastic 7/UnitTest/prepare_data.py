@@ -0,0 +1,63 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from Indexer.prepare_data import PrepareData
+from UnitTest.fake_es import FakeElasticsearch, log_to_temp_dir, make_indexer, remove_temp_logs
+
+log_dir = None
+
+
+def setUpModule():
+    global log_dir
+    log_dir = log_to_temp_dir()
+
+
+def tearDownModule():
+    remove_temp_logs(log_dir)
+
+
+class IndexSettingsTest(unittest.TestCase):
+    def setUp(self):
+        with open('../Indexer/settings.json', 'r', encoding='utf-8') as fSettings:
+            self.pd = PrepareData(json.load(fSettings))
+
+    def test_bulk_mapping(self):
+        mapping = self.pd.generate_sentences_mapping(bulk_load=True)
+        self.assertEqual(mapping['settings']['refresh_interval'], '-1')
+        self.assertEqual(mapping['settings']['number_of_replicas'], 0)
+        self.assertEqual(mapping['settings']['translog']['durability'], 'async')
+        self.assertEqual(mapping['settings']['max_regex_length'], 5000)
+        self.assertEqual(self.pd.generate_docs_mapping(bulk_load=True)['settings']['refresh_interval'], '-1')
+        self.assertNotIn('settings', self.pd.generate_docs_mapping())
+        self.assertEqual(self.pd.generate_sentences_mapping()['settings']['refresh_interval'], '30s')
+
+    def test_serving_replicas(self):
+        self.assertIsNone(self.pd.generate_serving_settings()['number_of_replicas'])
+        pd = PrepareData(dict(self.pd.settings, serving_replicas=2))
+        self.assertEqual(pd.generate_serving_settings()['number_of_replicas'], 2)
+
+    def test_serving_settings_restored(self):
+        data_dir = tempfile.mkdtemp()
+        shutil.copy('../test/oscar_sample.jsonl', os.path.join(data_dir, 'corpus.jsonl'))
+        with open(os.path.join(data_dir, 'corpus.jsonl'), 'rb') as f_in, \
+                gzip.open(os.path.join(data_dir, 'corpus.jsonl.gz'), 'wb') as f_out:
+            f_out.write(f_in.read())
+        fake_es = FakeElasticsearch().start()
+        x = make_indexer(data_dir, fake_es.url, {'indexing_mode': 'threads'})
+        x.load_corpus()
+        fake_es.stop()
+        shutil.rmtree(data_dir)
+        for index in (x.name + '.docs', x.name + '.sentences'):
+            settings = fake_es.indices[index]['settings']
+            self.assertEqual(settings['refresh_interval'], x.settings['serving_refresh_interval'])
+            # the replicas of the bulk profile are reset to the default, not forced
+            self.assertNotIn('number_of_replicas', settings)
+            self.assertEqual(settings['translog']['durability'], 'request')
+        self.assertEqual(len(fake_es.docs(x.name + '.docs')), 10)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,88 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from ES_Wrapper.es_wrapper import EsWrapper
+from Indexer.sentence_cache import SentenceCache, prepare_dir
+from UnitTest.fake_es import FakeElasticsearch, log_to_temp_dir, make_indexer, remove_temp_logs
+
+log_dir = None
+
+
+def setUpModule():
+    global log_dir
+    log_dir = log_to_temp_dir()
+
+
+def tearDownModule():
+    remove_temp_logs(log_dir)
+
+
+class SentenceCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.tmp_dir, 'Data')
+        self.cache_dir = os.path.join(self.tmp_dir, 'Cache')
+        os.makedirs(self.data_dir)
+        self.file_name = os.path.join(self.data_dir, 'corpus.jsonl.gz')
+        with open('../test/oscar_sample.jsonl', 'r', encoding='utf-8') as f_in:
+            self.j_lines = [j_line for j_line in f_in if len(j_line.strip()) > 0]
+        self.j_lines.insert(3, '{"content": "no metadata"}\n')
+        with gzip.open(self.file_name, 'wt', encoding='utf-8') as f_out:
+            for i in range(200):
+                f_out.write(self.j_lines[i % len(self.j_lines)])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_shard_records(self):
+        cache = SentenceCache(self.cache_dir, self.data_dir)
+        self.assertFalse(cache.is_valid(self.file_name))
+        prepare_dir(self.cache_dir, self.data_dir, 1)
+        self.assertTrue(cache.is_valid(self.file_name))
+        es_wrapper = EsWrapper()
+        records = list(cache.read_records(self.file_name))
+        self.assertEqual(len(records), 200)
+        for j_line, record in zip(self.j_lines, records):
+            if 'metadata' not in json.loads(j_line):
+                self.assertIsNone(record)
+                continue
+            es_ready = es_wrapper.create_es_format(json.loads(j_line))
+            self.assertEqual(record, [es_ready.sentences, es_ready.tags, es_ready.link])
+        batches = list(cache.read_batches(self.file_name, 30, skip_lines=50))
+        self.assertEqual([n_lines for docs, n_lines in batches], [30, 30, 30, 30, 30])
+        self.assertEqual(sum(len(docs) for docs, n_lines in batches), 150 - 150 // len(self.j_lines))
+
+    def test_invalidation(self):
+        prepare_dir(self.cache_dir, self.data_dir, 1)
+        settings_path = os.path.join(self.tmp_dir, 'settings.json')
+        with open('../ES_Wrapper/settings.json', 'r', encoding='utf-8-sig') as f_in:
+            settings = json.load(f_in)
+        with open(settings_path, 'w', encoding='utf-8') as f_out:
+            json.dump(settings, f_out)
+        self.assertTrue(SentenceCache(self.cache_dir, self.data_dir).is_valid(self.file_name))
+        self.assertFalse(SentenceCache(self.cache_dir, self.data_dir, settings_path).is_valid(self.file_name))
+        with gzip.open(self.file_name, 'at', encoding='utf-8') as f_out:
+            f_out.write(self.j_lines[0])
+        self.assertFalse(SentenceCache(self.cache_dir, self.data_dir).is_valid(self.file_name))
+
+    def run_indexer(self, use_cache: bool) -> dict:
+        fake_es = FakeElasticsearch().start()
+        x = make_indexer(self.data_dir, fake_es.url, {'indexing_mode': 'processes', 'use_sentence_cache': use_cache,
+                                                       'sentence_cache_dir': self.cache_dir}, work_dir=self.tmp_dir)
+        x.load_corpus()
+        fake_es.stop()
+        return fake_es.indices
+
+    def test_index_from_cache(self):
+        reference = self.run_indexer(use_cache=False)
+        prepare_dir(self.cache_dir, self.data_dir, 1)
+        indices = self.run_indexer(use_cache=True)
+        for index in ('oscar.docs', 'oscar.sentences'):
+            self.assertEqual(indices[index]['docs'], reference[index]['docs'])
+
+
+if __name__ == '__main__':
+    unittest.main(argv=[''], verbosity=2, exit=False)
@@ -0,0 +1,41 @@
+import json
+import unittest
+from ES_Wrapper.es_wrapper import EsWrapper
+
+
+class SplitterTest(unittest.TestCase):
+    def setUp(self):
+        self.es_wrapper = EsWrapper()
+        self.texts = []
+        for file_path in ["../test/test.jsonl", "../test/oscar_sample.jsonl"]:
+            with open(file_path, "r", encoding='UTF-8') as j_file:
+                for j_line in j_file:
+                    self.texts.append(self.es_wrapper.cleaner.clean_text(json.loads(j_line)['content']))
+
+    def full_split(self, text: str) -> list:
+        tokens = self.es_wrapper.tokenizer.tokenize(text)
+        return self.es_wrapper.remove_meta_from_sentences(self.es_wrapper.splitter.split(tokens, text))
+
+    def test_split_text_tokens(self):
+        for text in self.texts:
+            tokens = self.es_wrapper.tokenizer.tokenize(text)
+            self.assertEqual(self.es_wrapper.splitter.split_text(tokens, text), self.full_split(text))
+
+    def test_split_text_stream(self):
+        for text in self.texts:
+            tokens = self.es_wrapper.tokenizer.tokenize_stream(text)
+            self.assertEqual(self.es_wrapper.splitter.split_text(tokens, text), self.full_split(text))
+
+    def test_split_stream(self):
+        for text in self.texts:
+            self.assertEqual(self.es_wrapper.splitter.split(self.es_wrapper.tokenizer.tokenize_stream(text), text),
+                             self.es_wrapper.splitter.split(self.es_wrapper.tokenizer.tokenize(text), text))
+
+    def test_sentence_offsets(self):
+        text = self.texts[0]
+        offsets = self.es_wrapper.splitter.sentence_offsets(self.es_wrapper.tokenizer.tokenize_stream(text), text)
+        self.assertEqual(offsets, [(0, 48), (49, len(text))])
+
+
+if __name__ == '__main__':
+    unittest.main(argv=[''], verbosity=2, exit=False)
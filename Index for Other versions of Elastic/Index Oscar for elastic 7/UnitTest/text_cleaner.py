@@ -0,0 +1,40 @@
+import json
+import random
+import unittest
+from ES_Wrapper.es_wrapper import EsWrapper
+from ES_Wrapper.text_cleaner import TextCleaner
+
+
+class TextCleanerTest(unittest.TestCase):
+    def setUp(self):
+        self.settings = EsWrapper.load_settings('../ES_Wrapper/settings.json')
+        self.cleaner = TextCleaner(self.settings)
+
+    def test_golden_corpus(self):
+        # Expected outputs were produced by the step-by-step cleaner
+        with open("../test/cleaner_golden.jsonl", "r", encoding='UTF-8') as j_file:
+            for j_line in j_file:
+                golden = json.loads(j_line)
+                self.assertEqual(self.cleaner.clean_text(golden['text']), golden['clean'])
+
+    def test_fused_equals_stepwise(self):
+        pieces = ['a', 'Я', ' ', '  ', '\t', '\n', '\xa0 ', '&nbsp;', '&amp;', '<p>', '\\', '\\n', '\\r\\n',
+                  '…', '“', '”', '"', ',', '.', '!', '(', ')', '<', '>', '-', '@', '/']
+        rnd = random.Random(7)
+        for i in range(5000):
+            text = ''.join(rnd.choice(pieces) for _ in range(rnd.randint(0, 30)))
+            self.assertEqual(self.cleaner.clean_text(text), self.cleaner.clean_text_stepwise(text))
+
+    def test_unsafe_quote_marks(self):
+        cleaner = TextCleaner(dict(self.settings, left_quot_mark='…'))
+        self.assertIsNone(cleaner.charReplacements)
+        self.assertEqual(cleaner.clean_text('a “b” c'), 'a ...b» c')
+
+    def test_no_quote_conversion(self):
+        cleaner = TextCleaner(dict(self.settings, convert_quotes=False))
+        text = 'Он сказал: "Да" и “нет”…\\n'
+        self.assertEqual(cleaner.clean_text(text), cleaner.clean_text_stepwise(text))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=[''], verbosity=2, exit=False)